@@ -4,9 +4,9 @@ import logging
 import sys
 import traceback
 import pygame
-import threading
 import json
 import os
+import argparse
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
@@ -20,16 +20,36 @@ if sys.platform == "win32":
 
 # Import improved modules
 try:
-    from modules.config_loader import ConfigLoader
+    from modules.config_loader import ConfigLoader, VALID_GESTURES
+    from modules.clip_index import ClipIndex
     from modules.detector import EmoteDetector  # Updated to use your custom detector
-    from modules.video_player import VideoAudioPlayer, PlayerState
+    from modules.video_player import VideoAudioPlayer, PlayerState, ClipPlayback, AUDIO_BUFFER_SIZE
     from modules.virtualcam import VirtualCameraManager
+    from modules.compositor import EmoteCompositor
+    from modules.scheduler import TriggerScheduler
+    from modules.output_pacer import OutputPacer
+    from modules.sinks import (SinkFanout, VirtualCameraSink, NullSink, FileRecorderSink,
+                               SharedMemorySink)
+    from modules.overlays import OverlayStack, OverlayLayer, TextSprite, BadgeSprite, GradientSprite
+    from modules.reconnect import ReconnectSupervisor, SupervisorState
+    from modules.preview import PreviewRenderer
+    from modules.control import ControlMailbox, ControlServer, install_signal_handlers
+    from modules.pipeline import Pipeline, StageQueue
+    from modules.metrics import MetricsRegistry, MetricsExporter, TriggerLatencyTracker
+    from modules.prometheus import PrometheusServer, render_metrics
+    from modules.tracing import Tracer
+    from modules.memory import MemoryProfiler
+    from modules.resources import ResourceMonitor
+    from modules.log_setup import setup_queue_logging
+    from modules import benchmark
+    from modules import offline
 
     print("[✓] All modules imported successfully")
 except ImportError as e:
     print(f"[❌] Import error: {e}")
     print("Make sure all module files exist and are correct")
-    input("Press Enter to exit...")
+    if not {"--headless", "--benchmark", "--analyze"} & set(sys.argv):
+        input("Press Enter to exit...")
     sys.exit(1)
 
 
@@ -39,72 +59,107 @@ class SystemTrayManager:
     def __init__(self, app):
         self.app = app
         self.running = True
-        self.background_thread = None
+        self.stats_interval = 300  # 5 minutes
+        self._last_stats_time = 0.0
 
     def start_background_monitoring(self):
-        """Start background monitoring thread."""
-        self.background_thread = threading.Thread(target=self._background_worker, daemon=True)
-        self.background_thread.start()
+        """Start the resource monitor; its samples drive the periodic stats line."""
+        self._last_stats_time = time.time()
+        self.app.resource_monitor.start()
         print("[🔄] Background monitoring started")
 
-    def _background_worker(self):
-        """Background worker for system monitoring."""
-        last_stats_time = time.time()
-        stats_interval = 300  # 5 minutes
+    def on_sample(self, sample: dict):
+        """Called on the monitor thread after every resource sample."""
+        if self.running and time.time() - self._last_stats_time >= self.stats_interval:
+            self._last_stats_time = time.time()
+            self._log_background_stats(sample)
 
-        while self.running and self.app.running:
-            try:
-                current_time = time.time()
-
-                # Periodic stats logging
-                if current_time - last_stats_time > stats_interval:
-                    self._log_background_stats()
-                    last_stats_time = current_time
-
-                # Check virtual camera health
-                if self.app.virtual_camera and not self.app.virtual_camera.is_open:
-                    print("[⚠️] Virtual camera disconnected, attempting reconnect...")
-                    self.app._reconnect_virtual_camera()
-
-                time.sleep(10)  # Check every 10 seconds
-
-            except Exception as e:
-                print(f"[❌] Background monitoring error: {e}")
-                time.sleep(30)
-
-    def _log_background_stats(self):
+    def _log_background_stats(self, sample: dict):
         """Log background statistics."""
         if self.app.virtual_camera:
             fps = self.app._calculate_fps()
-            print(f"[📊] Background Stats - FPS: {fps:.1f}, Frames sent: {self.app.virtual_camera.frame_count}")
+            print(f"[📊] Background Stats - FPS: {fps:.1f} avg / {self.app._current_fps():.1f} now, "
+                  f"Frames sent: {self.app.virtual_camera.frame_count}, "
+                  f"Output: {self.app._format_output_stats()}, "
+                  f"CPU: {(sample.get('cpu_share') or 0) * 100:.0f}%, RSS: {sample.get('rss_mb', 0):.0f} MB")
 
     def stop(self):
         """Stop background monitoring."""
         self.running = False
+        self.app.resource_monitor.stop()
         print("[🛑] Background monitoring stopped")
 
 
 class ConfigurationManager:
     """Advanced configuration management with auto-save and validation."""
 
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, overrides: Optional[dict] = None):
         self.config_path = config_path
         self.settings_path = "settings.json"
         self.backup_path = "config_backup.yaml"
         self.default_settings = {
             "auto_start_camera": True,
+            "camera_source": 0,  # camera index, or a video file to replay a recording
             "minimize_to_tray": False,
             "detection_sensitivity": 1.0,
             "hold_time": 1.0,  # Reduced for your gestures
             "cooldown_time": 2.0,  # Reduced for better responsiveness
             "video_quality": "HD",
+            "virtual_camera_format": "auto",  # "auto"/"bgr" (native), "rgb", "i420", "nv12"
+            "virtual_camera_backends": ["obs", "unitycapture", "dshow"],  # add "stub" to run without a driver
+            "virtual_camera_backend": None,  # last backend that worked, tried first on the next start
+            "virtual_camera_probe_timeout": 3.0,  # seconds allowed per backend probe
+            "output_sinks": ["virtualcam"],  # any of "virtualcam", "null", "file", "shm"
+            "record_path": "recordings/emotestream.mp4",  # used by the "file" sink (.mp4/.avi or raw)
+            "shared_memory_name": "emotestream_output",  # used by the "shm" sink
             "auto_reconnect": True,
+            "reconnect_initial_delay": 0.5,  # Seconds before the first retry, doubled per failure
+            "reconnect_max_delay": 30.0,
+            "reconnect_outage_policy": "latest",  # "latest" (resume with the newest frame) or "drop"
             "debug_mode": False,
             "branding_enabled": True,
+            "control_api": True,  # Local JSON control API (trigger, stop, reload, stats, settings, events)
+            "control_socket": "emotestream.sock",  # Unix socket path; Windows uses control_port on localhost
+            "control_port": 47800,
+            "pipeline_queues": {},  # Overrides, e.g. {"frames": {"maxsize": 3, "policy": "block"}}
+            "metrics_window": 10.0,  # Seconds covered by the latency percentiles
+            "metrics_file": "logs/metrics.json",  # Periodic JSON stats dump (null disables)
+            "metrics_interval": 10.0,  # Seconds between dumps
+            "prometheus_port": None,  # e.g. 9464 serves http://127.0.0.1:9464/metrics (null disables)
+            "prometheus_host": "127.0.0.1",
+            "trace_enabled": False,  # Record pipeline spans for a Perfetto timeline ('t' or dump-trace writes it)
+            "trace_buffer": 65536,  # Spans kept (oldest are overwritten)
+            "trace_file": "logs/trace.json",  # Chrome trace-event JSON, also written on exit
+            "log_burst": 10,  # Records let through per call site every log_burst_period seconds (0 = no limit)
+            "log_burst_period": 10.0,
+            "monitor_interval": 5.0,  # Seconds between /proc CPU/memory samples
+            "alert_stage_cpu": 0.9,  # Alert when a pipeline thread uses more of a core than this (0 disables)
+            "alert_drop_rate": 0.1,  # Alert when more than this fraction of frames is dropped (0 disables)
+            "memory_profile": False,  # tracemalloc + RSS sampling for soak runs (slows allocations down)
+            "memory_interval": 60.0,  # Seconds between snapshots
+            "memory_window": 600.0,  # Growth over this many seconds is checked against memory_growth_mb
+            "memory_growth_mb": 50.0,
+            "memory_report": "logs/memory.txt",  # Per-stage/per-clip figures and top allocation sites
+            "memory_top": 25,
+            "clip_index": "cache/clips.sqlite",  # Clip metadata, re-probed only when a file changes (null: memory only)
+            "preview_fps": 15,  # Preview window refresh rate (rendered off the frame loop)
+            "preview_scale": 0.75,  # Preview size relative to the output frame
+            "emote_display_mode": "fullscreen",  # "fullscreen" or "overlay" (picture-in-picture)
+            "overlay_region": [0.62, 0.05, 0.35, 0.35],  # x, y, width, height (fraction of frame)
+            "overlay_opacity": 1.0,
+            "fade_in_time": 0.2,  # Seconds of crossfade from live feed into the clip
+            "fade_out_time": 0.3,  # Seconds of crossfade from the clip back to live
+            "scheduler_policy": "preempt",  # "drop", "queue" or "preempt"
+            "max_queued_emotes": 2,
             "last_run": None
         }
         self.settings = self.load_settings()
 
+        # Overrides apply to this run only; the saved file keeps the values they shadow
+        self.overrides = overrides or {}
+        self._shadowed = {key: self.settings.get(key) for key in self.overrides}
+        self.settings.update(self.overrides)
+
     def load_settings(self) -> dict:
         """Load user settings from JSON file."""
         try:
@@ -121,12 +176,23 @@ class ConfigurationManager:
             print(f"[⚠️] Error loading settings: {e}")
             return self.default_settings.copy()
 
+    def reload_settings(self, keep=()):
+        """Re-read settings.json. Run overrides are applied again; keys in keep hold their current values."""
+        kept = {key: self.settings[key] for key in keep if key in self.settings}
+        settings = self.load_settings()
+        self._shadowed = {key: settings.get(key) for key in self.overrides}
+        settings.update(self.overrides)
+        settings.update(kept)
+        self.settings = settings
+
     def save_settings(self):
         """Save current settings to JSON file."""
         try:
             self.settings["last_run"] = datetime.now().isoformat()
+            settings = dict(self.settings)
+            settings.update(self._shadowed)
             with open(self.settings_path, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+                json.dump(settings, f, indent=2)
         except Exception as e:
             print(f"[⚠️] Error saving settings: {e}")
 
@@ -301,13 +367,44 @@ def simple_detector_test():
 class EmoteStreamApp:
     """Enhanced EmoteStream application for YOUR custom gestures."""
 
-    def __init__(self, config_path: str = "emotes/emotes.yaml"):
-        # Enhanced configuration management
-        self.config_manager = ConfigurationManager(config_path)
+    # Keyboard shortcuts in the preview window and the control commands they run
+    KEY_COMMANDS = {
+        ord('q'): "quit",
+        ord('r'): "reload",
+        ord('s'): "stats",
+        ord('d'): "toggle_debug",
+        ord('h'): "help",
+        ord('m'): "toggle_minimize",
+        ord('p'): "toggle_preview",
+        ord('b'): "toggle_branding",
+        ord('c'): "test_camera",
+        ord('t'): "dump_trace",
+        ord(' '): "skip",  # Spacebar to skip
+    }
+
+    # Queues between pipeline stages: name -> (maxsize, overflow policy)
+    PIPELINE_QUEUES = {
+        "detect": (1, "latest_only"),    # capture -> detect: always detect on the newest frame
+        "frames": (2, "drop_oldest"),    # capture -> frame loop: never fall behind the camera
+        "detections": (4, "block"),      # detect -> frame loop: detections are events, don't lose them
+    }
+
+    def __init__(self, config_path: str = "emotes/emotes.yaml", headless: bool = False,
+                 settings_overrides: Optional[dict] = None):
+        # Enhanced configuration management (overrides are not saved to settings.json)
+        self.config_manager = ConfigurationManager(config_path, settings_overrides)
         self.config_path = config_path
         self.emotes = {}
 
+        # Headless: no windows, no waitKey, no prompts; controlled by signals and the mailbox
+        self.headless = headless
+        self.control = ControlMailbox()
+        self.control_server: Optional[ControlServer] = None
+        self.prometheus_server: Optional[PrometheusServer] = None
+        self.memory_profiler: Optional[MemoryProfiler] = None
+
         # Setup enhanced logging - FĂRĂ EMOJI!
+        self.queue_logging = None
         self.setup_logging()
         self.logger = logging.getLogger(__name__)
 
@@ -316,15 +413,44 @@ class EmoteStreamApp:
 
         # Components
         self.config_loader = None
+        self.clip_index: Optional[ClipIndex] = None
         self.detector: Optional[EmoteDetector] = None
         self.video_player = None
         self.virtual_camera = None
+        self.output_sinks: Optional[SinkFanout] = None
+        self.camera_sink: Optional[VirtualCameraSink] = None
+        self.reconnect_supervisor: Optional[ReconnectSupervisor] = None
+        self.preview: Optional[PreviewRenderer] = None
+        self.pipeline: Optional[Pipeline] = None
+        self.tracer: Optional[Tracer] = None
+        if self.config_manager.settings.get("trace_enabled", False):
+            self.tracer = Tracer(self.config_manager.settings.get("trace_buffer", 65536), logger=self.logger)
+        self.metrics = MetricsRegistry(window=self.config_manager.settings.get("metrics_window", 10.0),
+                                       tracer=self.tracer)
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        self.trigger_latency = TriggerLatencyTracker()
+        self.resource_monitor = ResourceMonitor(
+            interval=self.config_manager.settings.get("monitor_interval", 5.0),
+            counters=self._frame_counters,
+            stage_cpu_threshold=self.config_manager.settings.get("alert_stage_cpu", 0.9),
+            drop_rate_threshold=self.config_manager.settings.get("alert_drop_rate", 0.1),
+            on_alert=self._on_resource_alert,
+            on_sample=self.tray_manager.on_sample,
+            logger=self.logger
+        )
+        self.detect_queue: Optional[StageQueue] = None
+        self.frame_queue: Optional[StageQueue] = None
+        self.detection_queue: Optional[StageQueue] = None
+        self.output_pacer: Optional[OutputPacer] = None
+        self.compositor: Optional[EmoteCompositor] = None
+        self.scheduler: Optional[TriggerScheduler] = None
         self.physical_camera: Optional[cv2.VideoCapture] = None
 
         # Enhanced application state
         self.running = False
         self.current_emote = None
-        self.last_triggered = 0
+        self.active_clip: Optional[ClipPlayback] = None
+        self._pending_trigger: Optional[tuple] = None  # (emote, timing) until its first clip frame is sent
         self.cooldown = self.config_manager.settings.get("cooldown_time", 2.0)  # Faster cooldown
         self.is_playing_emote = False
         self.auto_reconnect = self.config_manager.settings.get("auto_reconnect", True)
@@ -332,67 +458,57 @@ class EmoteStreamApp:
         # Statistics and monitoring
         self.frame_count = 0
         self.start_time = None
+        self.stop_time = None
+        self.input_is_file = False  # Replaying a recording: end of file ends the run
         self.error_count = 0
         self.detection_count = 0
+        self.detections_by_emote = {}  # emote name -> count
         self.last_health_check = time.time()
         self._last_results = None  # Store last results for preview
+        self._last_status = None
 
         # Quality of life features
         self.minimized = False
-        self.show_preview = True
+        self.show_preview = not headless
         self.branding_enabled = self.config_manager.settings.get("branding_enabled", True)
 
+        # Retained-mode overlays: sprites are rendered once and only re-rendered on change
+        self.branding = self._build_branding_overlays()
+        self._preview_bar = GradientSprite(0, 120, (20, 20, 20), alpha=0.8)
+
+    def _build_branding_overlays(self) -> OverlayStack:
+        """Branding box in the bottom-right corner plus the 'playing' status dot."""
+        overlays = OverlayStack()
+        brand = TextSprite("EmoteStream", font_scale=0.7, thickness=2, background=(30, 30, 30),
+                           background_alpha=0.6, padding=12)
+        overlays.add("brand", OverlayLayer(brand, anchor="bottom-right", margin=(13, 13)))
+
+        # Green dot left of the text while an emote is playing
+        text_width, text_height, _ = brand.text_size()
+        dot = BadgeSprite(radius=6, color=(0, 255, 0))
+        dot_size = dot.size[0]
+        overlays.add("playing", OverlayLayer(dot, anchor="bottom-right",
+                                             margin=(25 + text_width + 20 - dot_size // 2,
+                                                     25 + text_height // 2 - dot_size // 2),
+                                             visible=False))
+        return overlays
+
     def setup_logging(self):
-        """FIXED logging setup - eliminates emoji problems completely."""
+        """Logging to a timestamped file and the console through a queue - emoji stripped, frame threads never block."""
         log_dir = Path("logs")
         log_dir.mkdir(exist_ok=True)
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = log_dir / f"emotestream_{timestamp}.log"
-
-        # Custom formatter care elimină emoji automat
-        class NoEmojiFormatter(logging.Formatter):
-            def format(self, record):
-                # Elimină automat emoji din toate mesajele
-                import re
-                msg = str(record.getMessage())
-                # Pattern complet pentru emoji
-                emoji_pattern = re.compile("["
-                                           u"\U0001F600-\U0001F64F"  # emoticons
-                                           u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-                                           u"\U0001F680-\U0001F6FF"  # transport & map symbols
-                                           u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-                                           u"\U00002702-\U000027B0"  # dingbats
-                                           u"\U000024C2-\U0001F251"  # other symbols
-                                           u"\U0001F900-\U0001F9FF"  # supplemental symbols
-                                           "]+", flags=re.UNICODE)
-
-                clean_msg = emoji_pattern.sub('', msg).strip()
-                record.msg = clean_msg
-                record.args = None
-
-                return super().format(record)
+        settings = self.config_manager.settings
 
         try:
-            # File handler safe
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setFormatter(NoEmojiFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-
-            # Console handler cu formatter safe
-            console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setFormatter(NoEmojiFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-
-            # Configurare root logger
-            root_logger = logging.getLogger()
-            root_logger.setLevel(logging.INFO)
-
-            # Clear existing handlers
-            for handler in root_logger.handlers[:]:
-                root_logger.removeHandler(handler)
-
-            root_logger.addHandler(file_handler)
-            root_logger.addHandler(console_handler)
-
+            self.queue_logging = setup_queue_logging(
+                str(log_file),
+                burst=settings.get("log_burst", 10),
+                period=settings.get("log_burst_period", 10.0),
+                stream=sys.stdout
+            )
             print(f"[📝] Logging to: {log_file}")
 
         except Exception as e:
@@ -417,10 +533,17 @@ class EmoteStreamApp:
                 ("Config Loader", self._init_config_loader),
                 ("YOUR Configuration", self._load_config),
                 ("YOUR Gesture Detector", self._init_detector),
+                ("Trigger Scheduler", self._init_scheduler),
                 ("Physical Camera", self._initialize_physical_camera),
+                ("Pipeline", self._init_pipeline),
                 ("Video Player", self._init_video_player),
                 ("Virtual Camera", self._init_virtual_camera),
+                ("Output Sinks", self._init_outputs),
+                ("Compositor", self._init_compositor),
                 ("Audio System", self._init_audio),
+                ("Preview", self._init_preview),
+                ("Control API", self._init_control_api),
+                ("Metrics Endpoint", self._init_prometheus),
                 ("Background Services", self._init_background_services)
             ]
 
@@ -444,7 +567,13 @@ class EmoteStreamApp:
     def _init_config_loader(self) -> bool:
         """Initialize configuration loader."""
         try:
-            self.config_loader = ConfigLoader(self.logger)
+            index_path = self.config_manager.settings.get("clip_index", "cache/clips.sqlite") or ":memory:"
+            try:
+                self.clip_index = ClipIndex(index_path, self.logger)
+            except Exception as e:
+                self.logger.warning(f"Clip index {index_path} unusable ({e}), indexing in memory")
+                self.clip_index = ClipIndex(":memory:", self.logger)
+            self.config_loader = ConfigLoader(self.logger, self.clip_index)
             return True
         except Exception as e:
             self.logger.error(f"Config loader initialization failed: {e}")
@@ -460,6 +589,11 @@ class EmoteStreamApp:
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 raw_config = yaml.safe_load(f)
 
+            # Un stat per fișier; doar clipurile modificate sunt re-analizate (clip index)
+            media = self.clip_index.refresh(
+                path for emote_data in raw_config.values() if isinstance(emote_data, dict)
+                for path in (emote_data.get('video_path'), emote_data.get('audio_path')) if path)
+
             # Validare custom care NU cere audio_path
             validated_emotes = {}
             for emote_name, emote_data in raw_config.items():
@@ -473,17 +607,22 @@ class EmoteStreamApp:
                         self.logger.warning(f"Missing 'video_path' field for emote '{emote_name}' - skipping")
                         continue
 
-                    # Verifică dacă fișierul video există
-                    video_path = Path(emote_data['video_path'])
-                    if not video_path.exists():
+                    # Verifică dacă fișierul video există (și e lizibil)
+                    video_path = emote_data['video_path']
+                    if media.get(video_path) is None:
                         self.logger.warning(f"Video file not found for '{emote_name}': {video_path} - skipping")
                         continue
+                    emote_data = dict(emote_data, media=media[video_path])  # fps/frames for ClipPlayback
+
+                    # Audio separat e opțional - doar avertizare dacă lipsește
+                    audio_path = emote_data.get('audio_path')
+                    if audio_path and media.get(audio_path) is None:
+                        self.logger.warning(f"Audio file not found for '{emote_name}': {audio_path} - playing without audio")
+                        emote_data = {k: v for k, v in emote_data.items() if k != 'audio_path'}
 
                     # Verifică tipul de gesture
                     gesture_type = emote_data['gesture'].get('type')
-                    valid_gestures = ['hands_up', 'hands_on_head', 'violin_gesture', 'peace_out', 'middle_finger',
-                                      'shot_in_head']
-                    if gesture_type not in valid_gestures:
+                    if gesture_type not in VALID_GESTURES:
                         self.logger.warning(f"Unknown gesture type for '{emote_name}': {gesture_type} - skipping")
                         continue
 
@@ -496,6 +635,7 @@ class EmoteStreamApp:
                     continue
 
             self.emotes = validated_emotes
+            self.clip_index.prune(media)  # Forget clips no longer in the library
             self.logger.info(f"Successfully loaded {len(self.emotes)} emote configurations: {list(self.emotes.keys())}")
 
             if len(self.emotes) == 0:
@@ -518,12 +658,54 @@ class EmoteStreamApp:
             self.detector = EmoteDetector(
                 emote_configs=self.emotes,
                 hold_time=hold_time,
+                logger=self.logger,
+                metrics=self.metrics
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"YOUR detector initialization failed: {e}")
+            return False
+
+    def _init_scheduler(self) -> bool:
+        """Initialize trigger scheduler (cooldowns, priorities, queueing)."""
+        try:
+            self.scheduler = TriggerScheduler(
                 cooldown_time=self.cooldown,
+                policy=self.config_manager.settings.get("scheduler_policy", "preempt"),
+                max_queue=self.config_manager.settings.get("max_queued_emotes", 2),
                 logger=self.logger
             )
+            self.scheduler.subscribe(self._on_scheduler_event)
             return True
         except Exception as e:
-            self.logger.error(f"YOUR detector initialization failed: {e}")
+            self.logger.error(f"Trigger scheduler initialization failed: {e}")
+            return False
+
+    def _init_pipeline(self) -> bool:
+        """Create the capture and detection stages and the queues feeding the frame loop.
+
+        Capture and detection run on their own threads; scheduling and composition
+        stay on the frame loop together with control commands, because they share
+        the clip state. Output (pacer + sink workers) and preview are separate
+        consumers with latest-only slots.
+        """
+        try:
+            overrides = self.config_manager.settings.get("pipeline_queues") or {}
+            self.pipeline = Pipeline(self.logger)
+            queues = {}
+            for name, (maxsize, policy) in self.PIPELINE_QUEUES.items():
+                override = overrides.get(name, {})
+                queues[name] = self.pipeline.add_queue(name, override.get("maxsize", maxsize),
+                                                       override.get("policy", policy))
+            self.detect_queue = queues["detect"]
+            self.frame_queue = queues["frames"]
+            self.detection_queue = queues["detections"]
+
+            self.pipeline.add_stage("capture", self._capture_stage)
+            self.pipeline.add_stage("detect", self._detect_stage, source=self.detect_queue)
+            return True
+        except Exception as e:
+            self.logger.error(f"Pipeline initialization failed: {e}")
             return False
 
     def _init_video_player(self) -> bool:
@@ -536,21 +718,39 @@ class EmoteStreamApp:
             self.logger.error(f"Video player initialization failed: {e}")
             return False
 
+    def _output_size(self):
+        """Output resolution for the configured quality."""
+        quality = self.config_manager.settings.get("video_quality", "HD")
+        return (1280, 720) if quality == "HD" else (640, 480)
+
     def _init_virtual_camera(self) -> bool:
         """Initialize virtual camera with enhanced settings."""
         try:
-            quality = self.config_manager.settings.get("video_quality", "HD")
-            width, height = (1280, 720) if quality == "HD" else (640, 480)
+            if "virtualcam" not in self.config_manager.settings.get("output_sinks", ["virtualcam"]):
+                self.logger.info("Virtual camera disabled (not in output_sinks)")  # NO EMOJI
+                return True
+
+            settings = self.config_manager.settings
+            width, height = self._output_size()
 
             self.virtual_camera = VirtualCameraManager(
                 width=width, height=height, fps=30,
                 device_name="EmoteStream Virtual Camera",
-                logger=self.logger
+                logger=self.logger,
+                pixel_format=settings.get("virtual_camera_format", "auto"),
+                backends=settings.get("virtual_camera_backends"),
+                preferred_backend=settings.get("virtual_camera_backend"),
+                probe_timeout=settings.get("virtual_camera_probe_timeout", 3.0)
             )
 
             if not self.virtual_camera.open():
                 raise RuntimeError("Failed to open virtual camera")
 
+            # Remember the working backend so the next start skips the probing
+            if settings.get("virtual_camera_backend") != self.virtual_camera.active_backend:
+                settings["virtual_camera_backend"] = self.virtual_camera.active_backend
+                self.config_manager.save_settings()
+
             self.logger.info(f"Virtual camera ready: {self.virtual_camera.device_info}")  # NO EMOJI
             return True
 
@@ -558,30 +758,221 @@ class EmoteStreamApp:
             self.logger.error(f"Virtual camera initialization failed: {e}")
             return False
 
+    def _init_outputs(self) -> bool:
+        """Create output sinks and start the pacer thread that feeds them."""
+        try:
+            settings = self.config_manager.settings
+            width, height = self._output_size()
+            sinks = []
+
+            for sink_name in settings.get("output_sinks", ["virtualcam"]):
+                if sink_name == "virtualcam":
+                    self.camera_sink = VirtualCameraSink(
+                        self.virtual_camera,
+                        outage_policy=settings.get("reconnect_outage_policy", "latest"),
+                        logger=self.logger
+                    )
+                    sink = self.camera_sink
+                elif sink_name == "null":
+                    sink = NullSink(self.logger)
+                elif sink_name == "file":
+                    sink = FileRecorderSink(settings.get("record_path", "recordings/emotestream.mp4"),
+                                            width, height, 30, self.logger)
+                elif sink_name == "shm":
+                    sink = SharedMemorySink(settings.get("shared_memory_name", "emotestream_output"),
+                                            width, height, logger=self.logger)
+                else:
+                    self.logger.warning(f"Unknown output sink '{sink_name}' - skipping")
+                    continue
+
+                if not sink.open():
+                    raise RuntimeError(f"Failed to open output sink '{sink_name}'")
+                sinks.append(sink)
+
+            if not sinks:
+                raise RuntimeError("No output sinks configured")
+
+            self.output_sinks = SinkFanout(sinks, self.logger, metrics=self.metrics)
+            self.output_sinks.start()
+
+            self.output_pacer = OutputPacer(self.output_sinks, fps=30, logger=self.logger, metrics=self.metrics)
+            self.output_pacer.start()
+
+            # Camera drops are recovered off the frame loop
+            if self.camera_sink:
+                self.reconnect_supervisor = ReconnectSupervisor(
+                    self.camera_sink,
+                    auto=self.auto_reconnect,
+                    initial_delay=settings.get("reconnect_initial_delay", 0.5),
+                    max_delay=settings.get("reconnect_max_delay", 30.0),
+                    logger=self.logger
+                )
+                self.reconnect_supervisor.start()
+            return True
+        except Exception as e:
+            self.logger.error(f"Output initialization failed: {e}")
+            return False
+
+    def _init_compositor(self) -> bool:
+        """Initialize emote compositor (fullscreen or overlay over live feed)."""
+        try:
+            settings = self.config_manager.settings
+            width, height = self._output_size()
+            self.compositor = EmoteCompositor(
+                width=width,
+                height=height,
+                mode=settings.get("emote_display_mode", "fullscreen"),
+                region=settings.get("overlay_region", [0.62, 0.05, 0.35, 0.35]),
+                opacity=settings.get("overlay_opacity", 1.0),
+                logger=self.logger
+            )
+            self.compositor.set_transitions(settings.get("fade_in_time", 0.2), settings.get("fade_out_time", 0.3))
+            self.logger.info(f"Compositor ready: {self.compositor.mode.value} mode")  # NO EMOJI
+            return True
+        except Exception as e:
+            self.logger.error(f"Compositor initialization failed: {e}")
+            return False
+
     def _init_audio(self) -> bool:
         """Initialize audio system."""
         try:
-            pygame.mixer.init()
+            pygame.mixer.init(buffer=AUDIO_BUFFER_SIZE)
+
+            # Decode emote audio once so triggering never touches the disk
+            self._preload_audio()
+
             self.logger.info("Audio system ready")  # NO EMOJI
             return True
         except Exception as e:
             self.logger.error(f"Audio initialization failed: {e}")
             return False
 
+    def _preload_audio(self):
+        """Decode emote audio into the cache, re-decoding files whose content changed since they were cached."""
+        audio_paths = [emote['audio_path'] for emote in self.emotes.values() if emote.get('audio_path')]
+        for audio_path in audio_paths:
+            if self.clip_index.derived_status(audio_path).get("audio") == "stale":
+                self.logger.info(f"Audio changed on disk, decoding again: {audio_path}")
+                self.video_player.audio_cache.discard(audio_path)
+        self.video_player.preload_audio(self.emotes)
+        for audio_path in audio_paths:
+            if self.video_player.audio_cache.get(audio_path) is not None:
+                self.clip_index.mark_derived(audio_path, "audio")
+
+    def _init_preview(self) -> bool:
+        """Start the preview window renderer thread."""
+        if self.headless:
+            self.logger.info("Headless mode: preview window disabled")  # NO EMOJI
+            return True
+        try:
+            settings = self.config_manager.settings
+            self.preview = PreviewRenderer(
+                "🎭 YOUR EmoteStream 2.0 - Preview",
+                self._render_preview,
+                fps=settings.get("preview_fps", 15),
+                scale=settings.get("preview_scale", 0.75),
+                logger=self.logger,
+                metrics=self.metrics
+            )
+            self.preview.set_visible(self.show_preview and not self.minimized)
+            self.preview.start()
+            return True
+        except Exception as e:
+            self.logger.error(f"Preview initialization failed: {e}")
+            return False
+
+    def _init_control_api(self) -> bool:
+        """Start the local control server (optional; a failure to bind is not fatal)."""
+        settings = self.config_manager.settings
+        if not settings.get("control_api", True):
+            return True
+        self.control_server = ControlServer(
+            self.control,
+            socket_path=settings.get("control_socket", "emotestream.sock"),
+            port=settings.get("control_port", 47800),
+            logger=self.logger
+        )
+        if not self.control_server.start():
+            self.logger.warning("Control API unavailable, continuing without it")  # NO EMOJI
+            self.control_server = None
+        return True
+
+    def _init_prometheus(self) -> bool:
+        """Start the localhost Prometheus endpoint if a port is configured (a bind failure is not fatal)."""
+        settings = self.config_manager.settings
+        port = settings.get("prometheus_port")
+        if not port:
+            return True
+        self.prometheus_server = PrometheusServer(
+            lambda: render_metrics(self._collect_stats(), self.metrics, self.trigger_latency),
+            port=int(port),
+            host=settings.get("prometheus_host", "127.0.0.1"),
+            logger=self.logger
+        )
+        if not self.prometheus_server.start():
+            self.logger.warning("Metrics endpoint unavailable, continuing without it")  # NO EMOJI
+            self.prometheus_server = None
+        return True
+
     def _init_background_services(self) -> bool:
         """Initialize background services."""
         try:
             if self.config_manager.settings.get("auto_start_camera", True):
                 self.tray_manager.start_background_monitoring()
+
+            metrics_file = self.config_manager.settings.get("metrics_file", "logs/metrics.json")
+            if metrics_file:
+                self.metrics_exporter = MetricsExporter(
+                    metrics_file, self._collect_stats,
+                    interval=self.config_manager.settings.get("metrics_interval", 10.0),
+                    logger=self.logger
+                )
+                self.metrics_exporter.start()
+
+            if self.config_manager.settings.get("memory_profile", False):
+                self._init_memory_profiler()
             return True
         except Exception as e:
             self.logger.error(f"Background services initialization failed: {e}")
             return False
 
+    def _init_memory_profiler(self):
+        """Start tracemalloc snapshots, with allocations charged to the stage code that made them."""
+        settings = self.config_manager.settings
+        profiler = MemoryProfiler(
+            settings.get("memory_report", "logs/memory.txt"),
+            interval=settings.get("memory_interval", 60.0),
+            window=settings.get("memory_window", 600.0),
+            growth_threshold_mb=settings.get("memory_growth_mb", 50.0),
+            top=settings.get("memory_top", 25),
+            logger=self.logger
+        )
+        profiler.add_stage("capture", self._capture_stage)
+        profiler.add_stage("detect", self._detect_stage, "modules.detector")
+        profiler.add_stage("frame", self._process_frame)
+        profiler.add_stage("compose", self._prepare_output_frame, self._add_enhanced_branding,
+                           "modules.compositor", "modules.overlays")
+        profiler.add_stage("clip", self._start_emote_clip, self._compose_clip_frame, "modules.video_player")
+        profiler.add_stage("output", "modules.output_pacer", "modules.sinks", "modules.virtualcam")
+        profiler.add_stage("preview", self._preview_snapshot, self._render_enhanced_preview, "modules.preview")
+        profiler.add_stage("metrics", "modules.metrics", "modules.prometheus", "modules.tracing")
+        profiler.start()
+        self.memory_profiler = profiler
+
     def _initialize_physical_camera(self) -> bool:
         """Enhanced physical camera initialization."""
         try:
-            self.physical_camera = cv2.VideoCapture(0)
+            source = self.config_manager.settings.get("camera_source", 0)
+            if isinstance(source, str) and not source.isdigit():
+                # Recorded input: frames come at decode speed, no camera settings apply
+                self.physical_camera = cv2.VideoCapture(source)
+                if not self.physical_camera.isOpened():
+                    raise RuntimeError(f"Cannot open input video: {source}")
+                self.input_is_file = True
+                self.logger.info(f"Input video ready: {source}")  # NO EMOJI
+                return True
+
+            self.physical_camera = cv2.VideoCapture(int(source))
             if not self.physical_camera.isOpened():
                 raise RuntimeError("Cannot access physical camera")
 
@@ -615,8 +1006,9 @@ class EmoteStreamApp:
 ╔══════════════════════════════════════════════════════════════╗
 ║                    🎭 YOUR EMOTESTREAM READY! 🎭             ║
 ╠══════════════════════════════════════════════════════════════╣
-║ 📺 Virtual Camera: {self.virtual_camera.active_backend:<30} ║
-║ 🎥 Resolution: {self.virtual_camera.width}x{self.virtual_camera.height} @ 30fps                     ║
+║ 📺 Virtual Camera: {(self.virtual_camera.active_backend if self.virtual_camera else 'Disabled'):<30} ║
+║ 🎥 Resolution: {self._output_size()[0]}x{self._output_size()[1]} @ 30fps                     ║
+║ 📤 Outputs: {', '.join(sink.name for sink in self.output_sinks.sinks):<40} ║
 ║ 🎭 YOUR Emotes: {len(self.emotes):<36} ║
 ║ 🔊 Audio System: Ready                                      ║
 ║ 🤖 AI Detection: Active                                     ║
@@ -638,16 +1030,28 @@ class EmoteStreamApp:
         """
         print(summary)
 
+        if self.virtual_camera and self.virtual_camera.probe_results:
+            print("📡 Virtual camera backend probe:")
+            for result in self.virtual_camera.probe_results:
+                outcome = f"ok ({result['pixel_format']})" if result['ok'] else f"failed: {result['error']}"
+                print(f"  {result['backend']:<14} {result['latency_ms']:>8.1f} ms  {outcome}")
+
     def run(self):
         """Enhanced main application loop for YOUR gestures."""
         try:
             if not self.initialize():
                 self.logger.error("Initialization failed")  # NO EMOJI
-                input("Press Enter to exit...")
+                if not self.headless:
+                    input("Press Enter to exit...")
                 return
 
             self.running = True
             self.start_time = time.time()
+            self.pipeline.start()
+
+            if self.headless:
+                signals = install_signal_handlers(self.control, self.logger)
+                self.logger.info(f"Running headless, control signals: {', '.join(signals) or 'none'}")  # NO EMOJI
 
             print("\n🚀 YOUR EmoteStream is now running!")
             print("📺 Virtual camera is available in Discord and other apps")
@@ -657,8 +1061,10 @@ class EmoteStreamApp:
                 if not self._process_frame():
                     break
 
-                # Enhanced keyboard handling
-                self._handle_keyboard_input()
+                # Keyboard shortcuts (preview window) and control commands, between frames
+                if not self.headless:
+                    self._handle_keyboard_input()
+                self._apply_control_commands()
 
                 # Periodic health checks
                 self._perform_health_checks()
@@ -669,32 +1075,68 @@ class EmoteStreamApp:
             self.logger.error(f"Unexpected error: {e}")  # NO EMOJI
             traceback.print_exc()
         finally:
+            self.stop_time = time.time()
             self.cleanup()
 
     def _handle_keyboard_input(self):
-        """Enhanced keyboard input handling."""
-        key = cv2.waitKey(1) & 0xFF
-
-        if key == ord('q'):
-            self.logger.info("Exit requested by user")  # NO EMOJI
-            self.running = False
-        elif key == ord('r'):
-            self._reload_config()
-        elif key == ord('s'):
-            self._show_enhanced_stats()
-        elif key == ord('d'):
-            if self.detector:
-                self.detector.toggle_debug()
-        elif key == ord('h'):
-            self._show_help()
-        elif key == ord('m'):
-            self._toggle_minimize()
-        elif key == ord('p'):
-            self._toggle_preview()
-        elif key == ord('b'):
-            self._toggle_branding()
-        elif key == ord('c'):
-            self._test_virtual_camera()
+        """Enhanced keyboard input handling (keys come from the preview window thread)."""
+        key = self.preview.poll_key() if self.preview else -1
+        command = self.KEY_COMMANDS.get(key)
+        if command:
+            self._execute_command(command, {"source": "keyboard"})
+
+    def _apply_control_commands(self):
+        """Run the commands posted to the mailbox since the last frame."""
+        for message in self.control.drain():
+            result = self._execute_command(message["command"], message["args"])
+            if message["reply"]:
+                try:
+                    message["reply"](result)
+                except Exception as e:
+                    self.logger.error(f"Control reply failed: {e}")  # NO EMOJI
+
+    def _execute_command(self, command: str, args: dict) -> dict:
+        """Apply one control command on the frame thread; returns a result dict."""
+        try:
+            if command == "quit":
+                source = args.get("signal") or args.get("source", "control")
+                self.logger.info(f"Exit requested ({source})")  # NO EMOJI
+                self.running = False
+            elif command == "reload":
+                self._reload_config()
+            elif command == "stats":
+                self._show_enhanced_stats()
+            elif command == "toggle_debug":
+                if self.detector:
+                    self.detector.toggle_debug()
+            elif command == "help":
+                self._show_help()
+            elif command == "toggle_minimize":
+                self._toggle_minimize()
+            elif command == "toggle_preview":
+                self._toggle_preview()
+            elif command == "toggle_branding":
+                self._toggle_branding()
+            elif command == "test_camera":
+                self._test_virtual_camera()
+            elif command == "skip":
+                self._skip_current_emote()
+            elif command == "trigger":
+                return self._trigger_emote(args.get("emote"))
+            elif command == "stop":
+                self._stop_all_emotes(time.time())
+            elif command == "get_stats":
+                return {"ok": True, "stats": self._collect_stats()}
+            elif command == "dump_trace":
+                return self._dump_trace()
+            elif command == "set_setting":
+                return self._apply_setting(args.get("key"), args.get("value"), bool(args.get("persist", False)))
+            else:
+                return {"ok": False, "error": f"unknown command: {command}"}
+            return {"ok": True}
+        except Exception as e:
+            self.logger.error(f"Command {command} failed: {e}")  # NO EMOJI
+            return {"ok": False, "error": str(e)}
 
     def _perform_health_checks(self):
         """Perform periodic system health checks."""
@@ -702,74 +1144,154 @@ class EmoteStreamApp:
         if now - self.last_health_check > 30:  # Every 30 seconds
             self.last_health_check = now
 
-            # Check virtual camera health
-            if self.auto_reconnect and self.virtual_camera and not self.virtual_camera.is_open:
-                self.logger.warning("Virtual camera disconnected, attempting reconnect...")  # NO EMOJI
-                self._reconnect_virtual_camera()
+            # Reconnecting itself happens on the supervisor thread; just report outages
+            if self.reconnect_supervisor and self.reconnect_supervisor.state == SupervisorState.RECONNECTING:
+                stats = self.reconnect_supervisor.get_stats()
+                self.logger.warning(f"Virtual camera down for {stats['outage_s']}s, "
+                                    f"{stats['attempts']} reconnect attempts so far")  # NO EMOJI
 
     def _reconnect_virtual_camera(self):
-        """Attempt to reconnect virtual camera."""
-        try:
-            if self.virtual_camera:
-                self.virtual_camera.close()
+        """Ask the supervisor to reconnect the virtual camera (returns immediately)."""
+        if self.reconnect_supervisor:
+            self.reconnect_supervisor.request_reconnect()
+        else:
+            self.logger.warning("Virtual camera reconnect unavailable (no camera sink)")  # NO EMOJI
+
+    def _capture_stage(self, _) -> bool:
+        """Capture stage: read, mirror and fan out to detection and the frame loop."""
+        start = time.perf_counter()
+        ret, frame = self.physical_camera.read()
+        self.metrics.span("capture", start)
+        if not ret and self.input_is_file:
+            # Let detection and the frame loop drain what is queued, then end the run
+            self.logger.info("End of input video")  # NO EMOJI
+            self.detect_queue.close()
+            self.frame_queue.close()
+            self.pipeline.stages["capture"].finish()
+            return True
+        if not ret:
+            self.error_count += 1
+            if self.error_count > 10:
+                self.logger.error("Too many camera read errors")  # NO EMOJI
+                return False
+            return True
 
-            time.sleep(2)  # Wait before reconnecting
+        self.error_count = 0  # Reset error count on successful read
 
-            if self.virtual_camera.open():
-                self.logger.info("Virtual camera reconnected successfully")  # NO EMOJI
-            else:
-                self.logger.error("Failed to reconnect virtual camera")  # NO EMOJI
+        # Mirror effect
+        frame = cv2.flip(frame, 1)
+        captured = time.monotonic()
 
-        except Exception as e:
-            self.logger.error(f"Virtual camera reconnection failed: {e}")  # NO EMOJI
+        # Detection gets its own RGB copy, so compositing in place never races with it
+        start = time.perf_counter()
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.metrics.span("color", start)
+        self.metrics.rate("capture").tick()
+        self.detect_queue.put({"rgb": rgb, "captured": captured})
+        self.frame_queue.put({"frame": frame, "captured": captured})
+        return True
+
+    def _detect_stage(self, packet: dict) -> bool:
+        """Detection stage: MediaPipe and gesture rules on the newest captured frame."""
+        detector = self.detector  # May be swapped by a reload between frames
+        results = detector.process_rgb(packet["rgb"])
+        start = time.perf_counter()
+        emote_detected, status = detector.detect_emote_with_status(results, now=packet["captured"])
+        self.metrics.span("rules", start)
+        if emote_detected:
+            emote_detected['timing']['detected'] = time.monotonic()
+        self.metrics.rate("detect").tick()
+        self.detection_queue.put({"results": results, "status": status, "detected": emote_detected,
+                                  "captured": packet["captured"]}, timeout=1.0)
+        return True
 
     def _process_frame(self) -> bool:
-        """Enhanced frame processing with YOUR gesture detection."""
+        """Frame loop stage: apply detections, schedule, compose and hand off to output and preview."""
         try:
-            # Read frame from physical camera
-            ret, frame = self.physical_camera.read()
-            if not ret:
-                self.error_count += 1
-                if self.error_count > 10:
-                    self.logger.error("Too many camera read errors")  # NO EMOJI
+            packet = self.frame_queue.get(timeout=0.5)
+            if packet is None:
+                # No frame yet; stop if capture or detection gave up
+                if self.pipeline.failed:
                     return False
-                return True
+                if not self.frame_queue.closed:
+                    return True
+                # Input ended: keep applying detections until the detect stage has finished and they are all in
+                if self.pipeline.stages["detect"].is_running or len(self.detection_queue):
+                    detection = self.detection_queue.get(timeout=0.1)
+                    if detection:
+                        self._apply_detections([detection] + self.detection_queue.drain(), time.time())
+                    return True
+                return False
 
-            self.error_count = 0  # Reset error count on successful read
+            frame_start = time.perf_counter()
+            frame = packet["frame"]
             self.frame_count += 1
-
-            # Mirror effect
-            frame = cv2.flip(frame, 1)
-
-            # Process frame for YOUR emote detection
-            results = self.detector.process_frame(frame)
-            self._last_results = results  # Store for preview
-            emote_detected, status = self.detector.detect_emote_with_status(results)
-
-            # Handle emote detection
-            if emote_detected:
-                self.detection_count += 1
-                self.logger.info(f"YOUR emote detected: {emote_detected['name']} (#{self.detection_count})")  # NO EMOJI
-                self._handle_emote_detection(emote_detected)
-                return True
-
-            # Prepare output frame
-            output_frame = self._prepare_output_frame(frame.copy())
-
-            # Send to virtual camera
-            if not self.virtual_camera.send_frame(output_frame):
-                self.logger.warning("Failed to send frame to virtual camera")  # NO EMOJI
-
-            # Show preview if enabled
-            if self.show_preview and not self.minimized:
-                self._show_enhanced_preview(frame, status, emote_detected)
-
+            now = time.time()
+
+            # Detections that finished since the last frame (in order, none are lost)
+            emote_detected = self._apply_detections(self.detection_queue.drain(), now)
+            status = self._last_status
+
+            # Start the clip the scheduler picked (new, queued or preempting)
+            next_emote = self.scheduler.step(now)
+            if next_emote:
+                self._start_emote_clip(next_emote)
+
+            # Prepare output frame: clip over live feed, or the live feed itself
+            compose_start = time.perf_counter()
+            output_frame = self._compose_clip_frame(frame, now) if self.active_clip else None
+            playing_clip = output_frame is not None
+            if not playing_clip:
+                output_frame = self._prepare_output_frame(frame.copy())
+            self.metrics.span("compose", compose_start)
+            self.metrics.rate("frames").tick()
+
+            # The first frame of a new clip reports when it reached the output (trigger latency)
+            on_sent = None
+            if playing_clip and self._pending_trigger:
+                emote_name, timing = self._pending_trigger
+                self._pending_trigger = None
+                on_sent = lambda sent: self._on_first_clip_frame_sent(emote_name, timing, sent)
+
+            # Hand over to the output thread; live frames are fresh copies, clip frames may be reused buffers
+            self.output_pacer.submit(output_frame, owned=not playing_clip, captured=packet["captured"],
+                                     on_sent=on_sent)
+
+            # Hand a downscaled snapshot to the preview thread, only as often as it renders
+            if self.preview and self.preview.wants_frame():
+                self.preview.publish(self._preview_snapshot(output_frame if playing_clip else frame,
+                                                            status, emote_detected))
+
+            self.metrics.span("frame", frame_start)
             return True
 
         except Exception as e:
             self.logger.error(f"Frame processing error: {e}")  # NO EMOJI
             return True  # Continue running despite errors
 
+    def _apply_detections(self, detections: list, now: float):
+        """Record detection results in order and hand every detected emote on; returns the last one."""
+        emote_detected = None
+        for detection in detections:
+            if self.preview:
+                # Only the preview draws them; holding them otherwise keeps MediaPipe results alive
+                self._last_results = detection["results"]
+            self._last_status = detection["status"]
+            if detection["detected"]:
+                emote_detected = detection["detected"]
+                self._on_emote_detected(emote_detected, now)
+        return emote_detected
+
+    def _on_emote_detected(self, emote_detected, now: float):
+        """Count, log and publish a detection, then hand it to the scheduler."""
+        self.detection_count += 1
+        name = emote_detected['name']
+        self.detections_by_emote[name] = self.detections_by_emote.get(name, 0) + 1
+        self.logger.info(f"YOUR emote detected: {emote_detected['name']} (#{self.detection_count})")  # NO EMOJI
+        if self.control_server:
+            self.control_server.publish({"event": "detected", "emote": emote_detected['name'], "time": now})
+        self._handle_emote_detection(emote_detected, now)
+
     def _prepare_output_frame(self, frame):
         """Enhanced frame preparation with quality improvements."""
         try:
@@ -789,254 +1311,252 @@ class EmoteStreamApp:
             return frame
 
     def _add_enhanced_branding(self, frame):
-        """Enhanced branding with better visual design."""
+        """Blend the cached branding sprites into the frame (only their rectangles are touched)."""
         try:
-            # More sophisticated branding
-            brand_text = "EmoteStream"
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.7
-            thickness = 2
-
-            # Get text dimensions
-            (text_width, text_height), baseline = cv2.getTextSize(brand_text, font, font_scale, thickness)
-
-            # Position in bottom-right with padding
-            padding = 25
-            x = frame.shape[1] - text_width - padding
-            y = frame.shape[0] - padding
-
-            # Create modern semi-transparent background
-            overlay = frame.copy()
-
-            # Rounded rectangle background (approximation)
-            bg_padding = 12
-            cv2.rectangle(overlay,
-                          (x - bg_padding, y - text_height - bg_padding),
-                          (x + text_width + bg_padding, y + bg_padding),
-                          (30, 30, 30), -1)
-
-            # Blend overlay
-            alpha = 0.6
-            cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-
-            # Add text with subtle shadow
-            cv2.putText(frame, brand_text, (x + 1, y + 1), font, font_scale, (0, 0, 0), thickness)  # Shadow
-            cv2.putText(frame, brand_text, (x, y), font, font_scale, (255, 255, 255), thickness)  # Main text
-
-            # Add status indicator
-            if self.is_playing_emote:
-                cv2.circle(frame, (x - 20, y - text_height // 2), 6, (0, 255, 0), -1)  # Green dot when playing
-
-            return frame
+            self.branding.set_visible("playing", self.is_playing_emote)  # Green dot when playing
+            return self.branding.draw(frame)
 
         except Exception as e:
             self.logger.error(f"Branding error: {e}")  # NO EMOJI
             return frame
 
-    def _show_enhanced_preview(self, frame, status, emote_detected):
-        """Enhanced preview window for YOUR gestures."""
-        try:
-            if not self.show_preview:
-                return
-
-            preview = frame.copy()
-
-            # Draw landmarks if available
-            if self._last_results and hasattr(self.detector, 'draw_pose_landmarks'):
-                self.detector.draw_pose_landmarks(preview, self._last_results)
-
-            # Modern UI overlay
-            overlay = preview.copy()
-
-            # Top status bar
-            cv2.rectangle(overlay, (0, 0), (preview.shape[1], 120), (20, 20, 20), -1)
-            alpha = 0.8
-            cv2.addWeighted(overlay, alpha, preview, 1 - alpha, 0, preview)
-
-            # Status information
-            if status:
-                # Progress bar
-                bar_width = 250
-                bar_height = 8
-                progress = int(status['progress'] * bar_width)
-
-                # Background bar
-                cv2.rectangle(preview, (15, 45), (15 + bar_width, 45 + bar_height), (100, 100, 100), -1)
-                # Progress bar
-                cv2.rectangle(preview, (15, 45), (15 + progress, 45 + bar_height), (0, 255, 0), -1)
-
-                # Status text
-                cv2.putText(preview, status['text'], (15, 35),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-            if emote_detected:
-                cv2.putText(preview, f"🎉 {emote_detected['name'].upper()}", (15, 90),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-
-            # YOUR gestures info
-            gesture_icons = "👋🤲🎻✌️🖕🔫"
-            cv2.putText(preview, f"YOUR Gestures: {gesture_icons}", (15, 110),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-
-            # System info
-            info_text = [
-                f"FPS: {self._calculate_fps():.1f}",
-                f"YOUR Detections: {self.detection_count}",
-                f"Camera: {self.virtual_camera.active_backend if self.virtual_camera else 'None'}"
-            ]
+    def _preview_snapshot(self, frame, status, emote_detected) -> dict:
+        """Everything the preview thread draws, detached from the frame loop's buffers."""
+        clip = self.active_clip
+        return {
+            "frame": self.preview.downscale(frame),
+            "results": None if clip else self._last_results,
+            "status": status,
+            "emote": emote_detected['name'] if emote_detected else None,
+            "clip": (clip.name, clip.frame_index, clip.total_frames) if clip else None,
+            "fps": self._calculate_fps(),
+            "detections": self.detection_count,
+            "backend": self.virtual_camera.active_backend if self.virtual_camera else 'None',
+        }
 
-            for i, text in enumerate(info_text):
-                cv2.putText(preview, text, (preview.shape[1] - 200, 20 + i * 20),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    def _render_preview(self, snapshot: dict):
+        """Render a preview snapshot (runs on the preview thread)."""
+        if snapshot["clip"]:
+            return self._render_video_preview(snapshot["frame"], *snapshot["clip"])
+        return self._render_enhanced_preview(snapshot)
 
-            cv2.imshow("🎭 YOUR EmoteStream 2.0 - Preview", preview)
+    def _render_enhanced_preview(self, snapshot: dict):
+        """Enhanced preview window for YOUR gestures."""
+        preview = snapshot["frame"]
+        status = snapshot["status"]
+        emote_name = snapshot["emote"]
 
-        except Exception as e:
-            self.logger.error(f"Preview error: {e}")  # NO EMOJI
+        # Draw landmarks if available
+        if snapshot["results"] and hasattr(self.detector, 'draw_pose_landmarks'):
+            self.detector.draw_pose_landmarks(preview, snapshot["results"])
 
-    def _handle_emote_detection(self, emote_detected):
-        """Enhanced emote detection handling for YOUR gestures."""
-        now = time.time()
+        # Top status bar
+        self._draw_preview_bar(preview, 120)
 
-        # Check cooldown
-        if (now - self.last_triggered) < self.cooldown:
-            return
+        # Status information
+        if status:
+            # Progress bar
+            bar_width = 250
+            bar_height = 8
+            progress = int(status['progress'] * bar_width)
 
-        self.logger.info(f"Triggering YOUR emote: {emote_detected['name']}")  # NO EMOJI
-        self._play_emote_enhanced(emote_detected)
-        self.last_triggered = now
+            # Background bar
+            cv2.rectangle(preview, (15, 45), (15 + bar_width, 45 + bar_height), (100, 100, 100), -1)
+            # Progress bar
+            cv2.rectangle(preview, (15, 45), (15 + progress, 45 + bar_height), (0, 255, 0), -1)
+
+            # Status text
+            cv2.putText(preview, status['text'], (15, 35),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+        if emote_name:
+            cv2.putText(preview, f"🎉 {emote_name.upper()}", (15, 90),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+
+        # YOUR gestures info
+        gesture_icons = "👋🤲🎻✌️🖕🔫"
+        cv2.putText(preview, f"YOUR Gestures: {gesture_icons}", (15, 110),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+
+        # System info
+        info_text = [
+            f"FPS: {snapshot['fps']:.1f}",
+            f"YOUR Detections: {snapshot['detections']}",
+            f"Camera: {snapshot['backend']}"
+        ]
+
+        for i, text in enumerate(info_text):
+            cv2.putText(preview, text, (preview.shape[1] - 200, 20 + i * 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+
+        return preview
+
+    def _handle_emote_detection(self, emote_detected, now: float):
+        """Hand a detected emote to the scheduler (cooldowns, priority, queueing)."""
+        if self.scheduler.submit(emote_detected, now):
+            self.logger.info(f"Triggering YOUR emote: {emote_detected['name']}")  # NO EMOJI
+
+    def _on_scheduler_event(self, event: dict):
+        """Log clip lifecycle events published by the scheduler and forward them to API subscribers."""
+        if event['event'] != 'dropped' or event.get('reason') != 'cooldown':
+            self.logger.info(f"Emote {event['emote']}: {event['event']}")  # NO EMOJI
+        if self.control_server:
+            self.control_server.publish(event)
+
+    def _trigger_emote(self, name: Optional[str]) -> dict:
+        """Trigger an emote by name as if its gesture had been held."""
+        if name not in self.emotes:
+            return {"ok": False, "error": f"unknown emote: {name}"}
+        emote = self.emotes[name].copy()
+        emote['name'] = name
+        emote['timing'] = {'detected': time.monotonic()}  # No gesture: latency counts from the request
+        accepted = self.scheduler.submit(emote, time.time())
+        return {"ok": True, "accepted": accepted}
+
+    def _stop_all_emotes(self, now: float):
+        """Stop the playing clip and drop everything queued."""
+        if self.active_clip:
+            self.active_clip.stop()
+            self.active_clip = None
+        self.scheduler.clear(now)
+        self.is_playing_emote = False
+        self.current_emote = None
 
-    def _play_emote_enhanced(self, emote_detected):
-        """Enhanced emote playback - ONLY MP4 (no separate audio)."""
-        try:
-            emote_name = emote_detected['name']
-            video_path = emote_detected.get('video_path')
+    def _start_emote_clip(self, emote_detected):
+        """Start clip playback for an emote - MP4 with optional preloaded audio track."""
+        emote_name = emote_detected['name']
 
-            # Only check for video path (no separate audio)
-            if not video_path:
-                self.logger.error(f"Missing video path for YOUR emote: {emote_name}")  # NO EMOJI
-                return
+        # Preemption: the new clip replaces the one playing
+        if self.active_clip:
+            self.active_clip.stop()
+            self.active_clip = None
 
-            # Validate video file exists
-            if not Path(video_path).exists():
-                self.logger.error(f"Video file not found: {video_path}")  # NO EMOJI
+        try:
+            self.logger.info(f"Loading YOUR emote: {emote_detected.get('video_path')}")  # NO EMOJI
+
+            # Audio from the in-memory cache; the clip clock follows the audio channel
+            audio_path = emote_detected.get('audio_path')
+            sound = self.video_player.audio_cache.get(audio_path) if audio_path else None
+
+            start = time.perf_counter()
+            clip = ClipPlayback(emote_detected, sound, self.logger)
+            started = clip.start()
+            self.metrics.span("clip_open", start)
+            if not started:
+                self.logger.error(f"Cannot play YOUR emote: {emote_name}")  # NO EMOJI
+                self._finish_emote_clip(time.time(), reason="failed")
                 return
 
+            self.active_clip = clip
             self.is_playing_emote = True
             self.current_emote = emote_name
-
-            self.logger.info(f"Loading YOUR emote: {video_path}")  # NO EMOJI
-
-            # ONLY video loading (MP4 with embedded audio)
-            video_cap = cv2.VideoCapture(video_path)
-            if not video_cap.isOpened():
-                self.logger.error(f"Cannot open YOUR video: {video_path}")  # NO EMOJI
-                self.is_playing_emote = False
-                return
-
-            # Get video properties
-            fps = video_cap.get(cv2.CAP_PROP_FPS) or 30
-            total_frames = int(video_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
+            self._pending_trigger = (emote_name, dict(emote_detected.get('timing') or {},
+                                                      started=time.monotonic()))
+            self.compositor.begin_clip(emote_detected, clip.fps, clip.total_frames)
+            if self.memory_profiler:
+                self.memory_profiler.clip_started(emote_name)
 
             self.logger.info(
-                f"Playing YOUR emote: {fps:.1f} FPS, {total_frames} frames, {duration:.1f}s duration")  # NO EMOJI
-
-            frame_delay = 1.0 / fps
-            start_time = time.time()
-            frame_count = 0
-
-            # Enhanced video playback loop (no audio sync needed)
-            while video_cap.isOpened() and self.is_playing_emote and self.running:
-                ret, frame = video_cap.read()
-                if not ret:
-                    self.logger.info("YOUR video playback completed")  # NO EMOJI
-                    break
-
-                # Enhanced frame processing
-                frame = cv2.resize(frame, (self.virtual_camera.width, self.virtual_camera.height))
-                frame = cv2.flip(frame, 1)
-
-                # Add enhanced branding to video
-                if self.branding_enabled:
-                    frame = self._add_enhanced_branding(frame.copy())
-
-                # Send to virtual camera
-                if not self.virtual_camera.send_frame(frame):
-                    self.logger.warning("Failed to send YOUR video frame")  # NO EMOJI
-
-                # Enhanced preview during video playback
-                if self.show_preview and not self.minimized:
-                    self._show_video_preview(frame, emote_name, frame_count, total_frames)
-
-                # Handle keyboard input during video
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    self.logger.info("YOUR video playback interrupted by user")  # NO EMOJI
-                    self.running = False
-                    break
-                elif key == ord(' '):  # Spacebar to skip
-                    self.logger.info("YOUR video skipped by user")  # NO EMOJI
-                    break
-
-                # Precise frame timing
-                frame_count += 1
-                expected_time = frame_count * frame_delay
-                elapsed_time = time.time() - start_time
-                sleep_time = expected_time - elapsed_time
-
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-
-            # Cleanup (no audio to stop)
-            video_cap.release()
-            self.is_playing_emote = False
-            self.current_emote = None
-
-            self.logger.info(f"YOUR emote '{emote_name}' playback completed")  # NO EMOJI
+                f"Playing YOUR emote: {clip.fps:.1f} FPS, {clip.total_frames} frames, {clip.duration:.1f}s duration")  # NO EMOJI
 
         except Exception as e:
             self.logger.error(f"YOUR emote playback error: {e}")  # NO EMOJI
             traceback.print_exc()
-            self.is_playing_emote = False
-            self.current_emote = None
-
-    def _show_video_preview(self, frame, emote_name, current_frame, total_frames):
-        """Show enhanced preview during YOUR video playback."""
-        try:
-            preview = frame.copy()
-
-            # Video progress overlay
-            overlay = preview.copy()
-            cv2.rectangle(overlay, (0, 0), (preview.shape[1], 100), (20, 20, 20), -1)
-            alpha = 0.8
-            cv2.addWeighted(overlay, alpha, preview, 1 - alpha, 0, preview)
-
-            # Video info
-            cv2.putText(preview, f"🎬 PLAYING YOUR: {emote_name.upper()}", (15, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-
-            # Progress bar
-            if total_frames > 0:
-                progress = current_frame / total_frames
-                bar_width = 300
-                bar_height = 8
-                progress_pixels = int(progress * bar_width)
-
-                cv2.rectangle(preview, (15, 50), (15 + bar_width, 50 + bar_height), (100, 100, 100), -1)
-                cv2.rectangle(preview, (15, 50), (15 + progress_pixels, 50 + bar_height), (0, 255, 0), -1)
-
-                cv2.putText(preview, f"{current_frame}/{total_frames} ({progress * 100:.1f}%)", (15, 75),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-
-            # Controls info
-            cv2.putText(preview, "Press SPACE to skip, Q to quit", (15, preview.shape[0] - 15),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+            self._finish_emote_clip(time.time(), reason="failed")
+
+    def _compose_clip_frame(self, live_frame, now: float):
+        """Compose the clip frame due now over the live frame; None once the clip has ended."""
+        clip = self.active_clip
+        start = time.perf_counter()
+        clip_frame = clip.read_due()
+        self.metrics.span("clip_decode", start)
+        if clip_frame is None:
+            self.logger.info(
+                f"YOUR emote '{clip.name}' playback completed ({clip.frames_skipped} late frames skipped)")  # NO EMOJI
+            self._finish_emote_clip(now, reason="completed")
+            return None
+
+        clip_frame = cv2.flip(clip_frame, 1)
+
+        # Overlay mode and fades blend with the live frame behind the clip
+        weight = self.compositor.transition_weight(clip.frame_index)
+        frame = self.compositor.compose(live_frame, clip_frame, weight)
+
+        # Add enhanced branding to video (compose returns a reused buffer)
+        if self.branding_enabled:
+            frame = self._add_enhanced_branding(frame)
+
+        return frame
+
+    def _finish_emote_clip(self, now: float, reason: str = "completed"):
+        """Release the current clip and tell the scheduler it is done."""
+        if self.active_clip:
+            self.active_clip.stop()
+            self.active_clip = None
+            if self.memory_profiler and self.current_emote:
+                self.memory_profiler.clip_finished(self.current_emote)
+        self._pending_trigger = None
+        if self.scheduler:
+            self.scheduler.finish(now, reason=reason)
+        self.is_playing_emote = False
+        self.current_emote = None
 
-            cv2.imshow("🎭 YOUR EmoteStream 2.0 - Preview", preview)
-
-        except Exception as e:
-            self.logger.error(f"Video preview error: {e}")  # NO EMOJI
+    def _on_first_clip_frame_sent(self, emote_name: str, timing: dict, sent: float):
+        """Record the gesture-to-glass breakdown of a trigger (called on the output thread)."""
+        timing['sent'] = sent
+        segments = self.trigger_latency.record(emote_name, timing)
+        self.logger.info(f"Trigger latency {emote_name}: " + ", ".join(
+            f"{segment} {seconds * 1000:.0f} ms" for segment, seconds in segments.items()))  # NO EMOJI
+
+    def _dump_trace(self) -> dict:
+        """Write the span buffer as Chrome trace-event JSON (open it in ui.perfetto.dev)."""
+        if not self.tracer:
+            return {"ok": False, "error": "tracing is disabled (set trace_enabled)"}
+        path = self.config_manager.settings.get("trace_file", "logs/trace.json")
+        spans = self.tracer.export(path)
+        if not self.headless:
+            print(f"🧵 Trace with {spans} spans written to {path}")
+        return {"ok": True, "path": path, "spans": spans}
+
+    def _skip_current_emote(self):
+        """Skip the clip that is currently playing."""
+        if self.active_clip:
+            self.logger.info("YOUR video skipped by user")  # NO EMOJI
+            self._finish_emote_clip(time.time(), reason="skipped")
+
+    def _draw_preview_bar(self, preview, height: int):
+        """Dark translucent bar across the top of the preview (sprite re-rendered on size change)."""
+        self._preview_bar.width = preview.shape[1]
+        self._preview_bar.height = height
+        self._preview_bar.draw(preview, 0, 0)
+
+    def _render_video_preview(self, preview, emote_name, current_frame, total_frames):
+        """Enhanced preview during YOUR video playback."""
+        # Video progress overlay
+        self._draw_preview_bar(preview, 100)
+
+        # Video info
+        cv2.putText(preview, f"🎬 PLAYING YOUR: {emote_name.upper()}", (15, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+
+        # Progress bar
+        if total_frames > 0:
+            progress = current_frame / total_frames
+            bar_width = 300
+            bar_height = 8
+            progress_pixels = int(progress * bar_width)
+
+            cv2.rectangle(preview, (15, 50), (15 + bar_width, 50 + bar_height), (100, 100, 100), -1)
+            cv2.rectangle(preview, (15, 50), (15 + progress_pixels, 50 + bar_height), (0, 255, 0), -1)
+
+            cv2.putText(preview, f"{current_frame}/{total_frames} ({progress * 100:.1f}%)", (15, 75),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+
+        # Controls info
+        cv2.putText(preview, "Press SPACE to skip, Q to quit", (15, preview.shape[0] - 15),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+
+        return preview
 
     def _show_enhanced_stats(self):
         """Show comprehensive application statistics."""
@@ -1049,22 +1569,26 @@ class EmoteStreamApp:
 ╠══════════════════════════════════════════════════════════════╣
 ║ ⏱️  Runtime: {runtime / 60:.1f} minutes ({runtime:.1f}s)                    ║
 ║ 🎬 Frames processed: {self.frame_count:,}                            ║
-║ 📈 Average FPS: {fps:.1f}                                     ║
+║ 📈 Average FPS: {fps:.1f} (now {self._current_fps():.1f})                          ║
 ║ 🎯 YOUR detections: {self.detection_count}                            ║
 ║ ❌ Error count: {self.error_count}                                ║
 ║ 🎭 Current emote: {(self.current_emote or 'None'):<25} ║
 ║ 🎮 Playing emote: {('Yes' if self.is_playing_emote else 'No'):<25} ║
+║ 📋 Queued emotes: {(self.scheduler.queue_length if self.scheduler else 0):<25} ║
 ╠══════════════════════════════════════════════════════════════╣
 ║                    🎥 VIRTUAL CAMERA INFO                    ║
 ║ Backend: {(self.virtual_camera.active_backend if self.virtual_camera else 'None'):<40} ║
 ║ Resolution: {self.virtual_camera.width if self.virtual_camera else 0}x{self.virtual_camera.height if self.virtual_camera else 0} @ 30fps                           ║
 ║ Frames sent: {self.virtual_camera.frame_count if self.virtual_camera else 0:,}                                 ║
+║ Output: {self._format_output_stats():<40} ║
 ║ Status: {('Connected' if self.virtual_camera and self.virtual_camera.is_open else 'Disconnected'):<40} ║
+║ Pixel format: {(self.virtual_camera.pixel_format if self.virtual_camera else None) or 'None':<34} ║
 ╠══════════════════════════════════════════════════════════════╣
 ║                      ⚙️  SETTINGS                           ║
 ║ Quality: {self.config_manager.settings.get('video_quality', 'Unknown'):<40} ║
 ║ Hold time: {self.config_manager.settings.get('hold_time', 0):.1f}s                               ║
 ║ Cooldown: {self.cooldown:.1f}s                                   ║
+║ Scheduler: {(self.scheduler.policy.value if self.scheduler else 'None'):<30} ║
 ║ Auto-reconnect: {('Yes' if self.auto_reconnect else 'No'):<25} ║
 ║ Branding: {('Enabled' if self.branding_enabled else 'Disabled'):<30} ║
 ║ Preview: {('Shown' if self.show_preview else 'Hidden'):<30} ║
@@ -1072,6 +1596,59 @@ class EmoteStreamApp:
         """
         print(stats)
 
+        if self.output_sinks:
+            for name, sink_stats in self.output_sinks.get_stats().items():
+                print(f"  📤 {name}: {sink_stats['sent']:,} sent, {sink_stats['dropped']} dropped, "
+                      f"{sink_stats['avg_send_ms']:.2f} ms avg / {sink_stats['max_send_ms']:.2f} ms max")
+
+        if self.reconnect_supervisor:
+            rs = self.reconnect_supervisor.get_stats()
+            print(f"  🔌 Reconnect: {rs['state']}, {rs['outages']} outages, {rs['reconnects']} recovered, "
+                  f"last outage {rs['last_outage_s']}s")
+
+        if self.pipeline:
+            pipeline_stats = self.pipeline.get_stats()
+            for name, st in pipeline_stats["stages"].items():
+                print(f"  🧵 {name}: {st['processed']:,} items, {st['avg_ms']:.2f} ms avg, {st['busy_pct']:.0f}% busy")
+            for name, qs in pipeline_stats["queues"].items():
+                print(f"  📥 queue {name} ({qs['policy']}, max {qs['maxsize']}): {qs['dropped']} dropped, "
+                      f"high water {qs['high_water']}, blocked {qs['blocked_ms']} ms")
+
+        snapshot = self.metrics.snapshot()
+        if snapshot["latency"]:
+            print(f"  ⏱️ Latency over the last {snapshot['window_s']:.0f}s (ms):")
+            for name, h in snapshot["latency"].items():
+                print(f"     {name:<16} p50 {h['p50_ms']:>7.2f}  p95 {h['p95_ms']:>7.2f}  "
+                      f"p99 {h['p99_ms']:>7.2f}  max {h['max_ms']:>7.2f}  (n={h['count']})")
+            print("  📈 Rates (fps): " + ", ".join(f"{k} {v:.1f}" for k, v in snapshot["rates"].items()))
+
+        trigger_latency = self.trigger_latency.snapshot()
+        if trigger_latency["emotes"]:
+            print("  🎯 Trigger latency, p50 / p95 (ms):")
+            for emote, data in trigger_latency["emotes"].items():
+                segments = data["segments"]
+                print(f"     {emote:<16} " + "  ".join(
+                    f"{segment} {h['p50_ms']:.0f}/{h['p95_ms']:.0f}" for segment, h in segments.items())
+                    + f"  (n={max((h['count'] for h in segments.values()), default=0)})")
+
+        if self.preview:
+            ps = self.preview.get_stats()
+            print(f"  🪟 Preview: {ps['rendered']:,} rendered at {ps['fps']:.0f} fps max, "
+                  f"{ps['avg_render_ms']:.2f} ms avg render")
+
+        if self.resource_monitor.samples:
+            rs = self.resource_monitor.get_stats()
+            print(f"  🖥️ Process: CPU {(rs['cpu_share'] or 0) * 100:.0f}%, RSS {rs['rss_mb']:.0f} MB "
+                  f"(peak {rs['peak_rss_mb']:.0f}), {rs['threads']} threads ("
+                  + ", ".join(f"{group} {count}" for group, count in rs["thread_groups"].items())
+                  + f"), OpenCV pool {rs['opencv_pool_size']}")
+            busy = [(name, t["cpu_share"]) for name, t in rs["by_thread"].items() if t["cpu_share"]]
+            if busy:
+                print("     " + ", ".join(f"{name} {share * 100:.0f}%"
+                                          for name, share in sorted(busy, key=lambda item: -item[1])[:6]))
+            for message in rs["active_alerts"]:
+                print(f"  ⚠️ {message}")
+
     def _show_help(self):
         """Show comprehensive help information for YOUR gestures."""
         help_text = f"""
@@ -1084,6 +1661,7 @@ class EmoteStreamApp:
 ║ h = Show this help       │ m = Minimize/restore window     ║
 ║ p = Toggle preview       │ b = Toggle branding             ║
 ║ c = Test virtual camera  │ SPACE = Skip current video      ║
+║ t = Write pipeline trace │                                 ║
 ╠══════════════════════════════════════════════════════════════╣
 ║                      🎭 YOUR GESTURES                       ║
 ║ 👋 Hands Up: Raise both hands above your head              ║
@@ -1129,8 +1707,9 @@ class EmoteStreamApp:
     def _toggle_minimize(self):
         """Toggle window minimization."""
         self.minimized = not self.minimized
+        if self.preview:
+            self.preview.set_visible(self.show_preview and not self.minimized)
         if self.minimized:
-            cv2.destroyAllWindows()
             print("🪟 Preview minimized - press 'm' to restore")
         else:
             print("🪟 Preview restored")
@@ -1139,8 +1718,8 @@ class EmoteStreamApp:
     def _toggle_preview(self):
         """Toggle preview window visibility."""
         self.show_preview = not self.show_preview
-        if not self.show_preview:
-            cv2.destroyAllWindows()
+        if self.preview:
+            self.preview.set_visible(self.show_preview and not self.minimized)
         self.logger.info(f"Preview {'enabled' if self.show_preview else 'disabled'}")
         print(f"🪟 Preview {'enabled' if self.show_preview else 'disabled'}")
 
@@ -1154,9 +1733,10 @@ class EmoteStreamApp:
 
     def _test_virtual_camera(self):
         """Test virtual camera with test pattern."""
-        if self.virtual_camera:
+        if self.camera_sink:
             print("🧪 Testing virtual camera...")
-            self.virtual_camera.test_camera()
+            with self.camera_sink.exclusive() as camera:
+                camera.test_camera()
         else:
             print("❌ Virtual camera not available")
 
@@ -1177,14 +1757,32 @@ class EmoteStreamApp:
                 self.detector = EmoteDetector(
                     emote_configs=self.emotes,
                     hold_time=hold_time,
-                    cooldown_time=self.cooldown,
-                    logger=self.logger
+                    logger=self.logger,
+                    metrics=self.metrics
                 )
 
-                # Reload user settings
-                self.config_manager.settings = self.config_manager.load_settings()
+                # Decode audio of new or changed emotes (unchanged cached ones are reused)
+                if self.video_player:
+                    self._preload_audio()
+
+                # Reload user settings; the backend in use is kept and run overrides are applied again
+                self.config_manager.reload_settings(keep=("virtual_camera_backend",))
                 self.cooldown = self.config_manager.settings.get("cooldown_time", 2.0)
                 self.branding_enabled = self.config_manager.settings.get("branding_enabled", True)
+                if self.scheduler:
+                    self.scheduler.configure(
+                        cooldown_time=self.cooldown,
+                        policy=self.config_manager.settings.get("scheduler_policy", "preempt"),
+                        max_queue=self.config_manager.settings.get("max_queued_emotes", 2)
+                    )
+                if self.compositor:
+                    self.compositor.configure(
+                        mode=self.config_manager.settings.get("emote_display_mode", "fullscreen"),
+                        region=self.config_manager.settings.get("overlay_region", [0.62, 0.05, 0.35, 0.35]),
+                        opacity=self.config_manager.settings.get("overlay_opacity", 1.0)
+                    )
+                    self.compositor.set_transitions(self.config_manager.settings.get("fade_in_time", 0.2),
+                                                    self.config_manager.settings.get("fade_out_time", 0.3))
 
                 self.logger.info("YOUR configuration reloaded successfully")  # NO EMOJI
                 print("✅ YOUR configuration reloaded successfully")
@@ -1200,6 +1798,140 @@ class EmoteStreamApp:
             self.logger.error(f"YOUR configuration reload error: {e}")  # NO EMOJI
             print(f"❌ YOUR configuration reload error: {e}")
 
+    # Settings that can be changed while running (set-setting) and their types
+    LIVE_SETTINGS = {
+        "hold_time": float,
+        "cooldown_time": float,
+        "scheduler_policy": str,
+        "max_queued_emotes": int,
+        "branding_enabled": bool,
+        "emote_display_mode": str,
+        "overlay_region": list,
+        "overlay_opacity": float,
+        "fade_in_time": float,
+        "fade_out_time": float,
+        "auto_reconnect": bool,
+        "debug_mode": bool,
+    }
+
+    def _apply_setting(self, key: str, value, persist: bool = False) -> dict:
+        """Change one setting at runtime and push it to the component that uses it."""
+        if key not in self.LIVE_SETTINGS:
+            return {"ok": False, "error": f"setting cannot be changed at runtime: {key}"}
+        expected = self.LIVE_SETTINGS[key]
+        if expected is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, expected) or (expected is not bool and isinstance(value, bool)):
+            return {"ok": False, "error": f"{key} must be {expected.__name__}"}
+
+        settings = self.config_manager.settings
+        previous = settings.get(key)
+        settings[key] = value
+        try:
+            if key == "hold_time" and self.detector:
+                self.detector.hold_time = value
+            elif key in ("cooldown_time", "scheduler_policy", "max_queued_emotes"):
+                self.cooldown = settings.get("cooldown_time", 2.0)
+                self.scheduler.configure(cooldown_time=self.cooldown,
+                                         policy=settings.get("scheduler_policy", "preempt"),
+                                         max_queue=settings.get("max_queued_emotes", 2))
+            elif key == "branding_enabled":
+                self.branding_enabled = value
+            elif key in ("emote_display_mode", "overlay_region", "overlay_opacity"):
+                self.compositor.configure(mode=settings.get("emote_display_mode", "fullscreen"),
+                                          region=settings.get("overlay_region", [0.62, 0.05, 0.35, 0.35]),
+                                          opacity=settings.get("overlay_opacity", 1.0))
+            elif key in ("fade_in_time", "fade_out_time"):
+                self.compositor.set_transitions(settings.get("fade_in_time", 0.2), settings.get("fade_out_time", 0.3))
+            elif key == "auto_reconnect":
+                self.auto_reconnect = value
+                if self.reconnect_supervisor:
+                    self.reconnect_supervisor.auto = value
+            elif key == "debug_mode" and self.detector:
+                self.detector.debug_mode = value
+        except Exception as e:
+            settings[key] = previous
+            return {"ok": False, "error": str(e)}
+
+        if persist:
+            self.config_manager.save_settings()
+        self.logger.info(f"Setting {key} changed to {value}")  # NO EMOJI
+        return {"ok": True, "key": key, "value": value, "previous": previous}
+
+    def _collect_stats(self) -> dict:
+        """Runtime statistics as a plain dict (control API, exports)."""
+        stats = {
+            "runtime_s": round(time.time() - self.start_time, 1) if self.start_time else 0.0,
+            "frames": self.frame_count,
+            "fps": round(self._calculate_fps(), 2),
+            "fps_ewma": round(self._current_fps(), 2),
+            "detections": self.detection_count,
+            "detections_by_emote": {
+                name: {"gesture": self.emotes.get(name, {}).get('gesture', {}).get('type'), "count": count}
+                for name, count in list(self.detections_by_emote.items())
+            },
+            "current_emote": self.current_emote,
+            "clip_frame": self.active_clip.frame_index if self.active_clip else None,
+        }
+        if self.scheduler:
+            stats["scheduler"] = {"policy": self.scheduler.policy.value, "busy": self.scheduler.is_busy,
+                                  "queued": self.scheduler.queue_length, "events": dict(self.scheduler.event_counts)}
+        if self.output_pacer:
+            stats["pacer"] = self.output_pacer.get_stats()
+        if self.output_sinks:
+            stats["sinks"] = self.output_sinks.get_stats()
+        if self.reconnect_supervisor:
+            stats["reconnect"] = self.reconnect_supervisor.get_stats()
+        stats["metrics"] = self.metrics.snapshot()
+        stats["trigger_latency"] = self.trigger_latency.snapshot()
+        if self.pipeline:
+            stats["pipeline"] = self.pipeline.get_stats()
+        if self.preview:
+            stats["preview"] = self.preview.get_stats()
+        if self.control_server:
+            stats["control"] = self.control_server.get_stats()
+        if self.prometheus_server:
+            stats["prometheus"] = self.prometheus_server.get_stats()
+        if self.tracer:
+            stats["trace"] = self.tracer.get_stats()
+        if self.memory_profiler:
+            stats["memory"] = self.memory_profiler.get_stats()
+        if self.resource_monitor.samples:
+            stats["resources"] = self.resource_monitor.get_stats()
+        if self.queue_logging:
+            stats["logging"] = self.queue_logging.get_stats()
+        stats["caches"] = {"overlays": self.branding.cache_stats()}
+        if self.clip_index:
+            stats["caches"]["clips"] = self.clip_index.get_stats()
+        if self.video_player:
+            stats["caches"]["audio"] = self.video_player.audio_cache.get_stats()
+        return stats
+
+    def _frame_counters(self) -> dict:
+        """Running totals for the resource monitor's frame-drop rate."""
+        if not self.pipeline or "capture" not in self.pipeline.stages:
+            return {}
+        dropped = self.frame_queue.items_dropped if self.frame_queue else 0
+        if self.output_pacer:
+            dropped += self.output_pacer.frames_dropped
+        return {"frames": self.pipeline.stages["capture"].items_processed, "dropped": dropped}
+
+    def _on_resource_alert(self, alert: dict):
+        """Forward resource alerts to control API subscribers (the monitor already logged them)."""
+        if self.control_server:
+            self.control_server.publish(alert)
+
+    def _format_output_stats(self) -> str:
+        """One-line summary of output pacer counters."""
+        if not self.output_pacer:
+            return "N/A"
+        stats = self.output_pacer.get_stats()
+        return f"{stats['repeated']} repeated, {stats['late']} late, {stats['dropped']} dropped"
+
+    def _current_fps(self) -> float:
+        """EWMA fps of the frame loop (reacts within a second, unlike the lifetime average)."""
+        return self.metrics.rate("frames").rate
+
     def _calculate_fps(self) -> float:
         """Calculate current FPS."""
         if self.start_time and self.frame_count > 0:
@@ -1210,8 +1942,7 @@ class EmoteStreamApp:
     def _on_video_error(self, error):
         """Enhanced video error handling."""
         self.logger.error(f"Video player error: {error}")  # NO EMOJI
-        self.current_emote = None
-        self.is_playing_emote = False
+        self._finish_emote_clip(time.time(), reason="failed")
         print(f"❌ Video error: {error}")
 
     def cleanup(self):
@@ -1220,7 +1951,8 @@ class EmoteStreamApp:
         self.logger.info("Starting YOUR application cleanup...")  # NO EMOJI
 
         self.running = False
-        self.is_playing_emote = False
+        if self.active_clip:
+            self._finish_emote_clip(time.time(), reason="stopped")
 
         # Stop background services
         if hasattr(self, 'tray_manager'):
@@ -1235,23 +1967,60 @@ class EmoteStreamApp:
         # Stop audio (if any)
         try:
             print("  🔇 Stopping audio...")
-            pygame.mixer.music.stop()
+            pygame.mixer.stop()
+            if self.video_player:
+                self.video_player.audio_cache.clear()
             pygame.mixer.quit()
         except:
             pass
 
+        # Stop capture and detection before releasing the camera they use
+        if self.pipeline:
+            self.pipeline.stop()
+
         # Cleanup cameras
         if self.physical_camera:
             print("  📹 Releasing physical camera...")
             self.physical_camera.release()
 
-        if self.virtual_camera:
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+
+        if self.control_server:
+            self.control_server.stop()
+
+        if self.prometheus_server:
+            self.prometheus_server.stop()
+
+        if self.memory_profiler:
+            self.memory_profiler.stop()
+
+        if self.tracer:
+            try:
+                self._dump_trace()
+            except Exception as e:
+                self.logger.error(f"Trace export failed: {e}")  # NO EMOJI
+
+        if self.reconnect_supervisor:
+            self.reconnect_supervisor.stop()
+
+        if self.output_pacer:
+            print("  ⏱️ Stopping output pacer...")
+            self.output_pacer.stop()
+
+        if self.output_sinks:
+            print("  🎥 Closing output sinks...")
+            self.output_sinks.close()
+        elif self.virtual_camera:
             print("  🎥 Closing virtual camera...")
             self.virtual_camera.close()
 
         # Close windows
-        print("  🪟 Closing windows...")
-        cv2.destroyAllWindows()
+        if self.preview:
+            self.preview.stop()
+        if not self.headless:
+            print("  🪟 Closing windows...")
+            cv2.destroyAllWindows()
 
         # Final statistics
         if self.start_time:
@@ -1262,13 +2031,149 @@ class EmoteStreamApp:
             print(f"  YOUR detections: {self.detection_count}")
             print(f"  Average FPS: {self._calculate_fps():.1f}")
 
+        if self.clip_index:
+            self.clip_index.close()
+
         self.logger.info("YOUR application cleanup completed")  # NO EMOJI
+        if self.queue_logging:
+            self.queue_logging.stop()  # Flushes queued records to the file and console
         print("✅ YOUR EmoteStream cleanup completed")
         print("👋 Thank you for using YOUR EmoteStream!")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EmoteStream - gesture triggered emotes on a virtual camera")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without windows or prompts; control with signals "
+                             "(TERM/INT quit, HUP reload, USR1 stats, USR2 skip)")
+    parser.add_argument("--config", default="emotes/emotes.yaml", help="emote configuration file")
+
+    bench = parser.add_argument_group("benchmark")
+    bench.add_argument("--benchmark", nargs="*", metavar="VIDEO",
+                       help="run the full pipeline headless and unthrottled over recordings "
+                            "(files or directories, default assets/video) into a null output")
+    bench.add_argument("--bench-output", default="logs/benchmark.json", help="where to write the JSON result")
+    bench.add_argument("--baseline", help="baseline JSON to compare against")
+    bench.add_argument("--save-baseline", action="store_true", help="also write the result to --baseline")
+    bench.add_argument("--threshold", type=float, default=10.0,
+                       help="percent a metric may get worse before it counts as a regression")
+    bench.add_argument("--allocations", action="store_true",
+                       help="measure Python allocations per steady-state frame with tracemalloc (slower)")
+
+    analyze = parser.add_argument_group("offline analysis")
+    analyze.add_argument("--analyze", nargs="+", metavar="VIDEO",
+                         help="run gesture detection over recordings (files or directories) as fast as they "
+                              "decode and write a JSON lines timeline per file; no camera, output or preview")
+    analyze.add_argument("--analyze-output", default="logs/analysis", help="directory for the timelines")
+    analyze.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                         help="files analysed in parallel, one process each (default: CPU count)")
+    analyze.add_argument("--stride", type=int, default=1, help="analyse every Nth frame")
+    analyze.add_argument("--frames", action="store_true",
+                         help="also write one line per frame with the gesture rules that matched")
+    analyze.add_argument("--no-mirror", action="store_true",
+                         help="the recordings are already mirrored (e.g. EmoteStream output)")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args) -> int:
+    """Benchmark entry point; exit status 2 when the baseline comparison finds a regression."""
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # No sound device needed
+    inputs = benchmark.find_inputs(args.benchmark or ["assets/video"])
+    if not inputs:
+        print("❌ No input videos found")
+        return 1
+
+    def make_app(overrides: dict):
+        return EmoteStreamApp(config_path=args.config, headless=True, settings_overrides=overrides)
+
+    runs = []
+    for path in inputs:
+        print(f"\n⏱️ Benchmarking {path}...")
+        runs.append(benchmark.run_input(make_app, path, allocations=args.allocations))
+    result = benchmark.summarize(runs)
+    benchmark.save_json(args.bench_output, result)
+
+    print(f"\n📊 {result['frames']} frames in {result['seconds']:.1f}s: {result['fps']:.1f} fps, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    if "site_alloc_blocks_per_frame" in result:
+        print(f"   allocations per steady-state frame: {result['site_alloc_blocks_per_frame']} blocks, "
+              f"{result['site_alloc_kb_per_frame']} KB, {result['gc_gen0_per_frame']} gen0 collections")
+    for name, stage in result["stages"].items():
+        print(f"   {name:<16} p50 {stage['p50_ms']:>7.2f} ms  p99 {stage['p99_ms']:>7.2f} ms  (n={stage['count']})")
+    print(f"💾 Result written to {args.bench_output}")
+
+    status = 0
+    if args.baseline:
+        baseline = benchmark.load_json(args.baseline)
+        if baseline and not args.save_baseline:
+            rows, regressions = benchmark.compare(result, baseline, args.threshold)
+            print("\n" + benchmark.format_comparison(rows))
+            if regressions:
+                print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0f}%: {', '.join(regressions)}")
+                status = 2
+            else:
+                print("\n✅ No regressions against the baseline")
+        elif args.save_baseline:
+            benchmark.save_json(args.baseline, result)
+            print(f"💾 Baseline saved to {args.baseline}")
+        else:
+            print(f"⚠️ Baseline {args.baseline} not found; run with --save-baseline to create it")
+    return status
+
+
+def run_analysis(args) -> int:
+    """Offline analysis entry point; exit status 1 when any file failed."""
+    inputs = benchmark.find_inputs(args.analyze)
+    if not inputs:
+        print("❌ No input videos found")
+        return 1
+    settings = ConfigurationManager(args.config).settings
+    emotes = offline.load_emotes(args.config)
+    jobs = max(1, min(args.jobs, len(inputs)))
+    print(f"🔎 Analysing {len(inputs)} file(s) with {len(emotes)} emotes, {jobs} job(s)...")
+
+    def done(summary: dict):
+        if "error" in summary:
+            print(f"   ❌ {summary['input']}: {summary['error']}")
+        else:
+            print(f"   ✅ {summary['input']}: {summary['frames']} frames, {summary['video_seconds']:.1f}s of video "
+                  f"in {summary['seconds']:.1f}s ({summary['speed']:.1f}x), {summary['triggers']} trigger(s)")
+
+    summaries = offline.analyze_files(
+        inputs, args.analyze_output, emotes, jobs=jobs, on_done=done,
+        hold_time=settings.get("hold_time", 1.0),
+        cooldown_time=settings.get("cooldown_time", 2.0),
+        policy=settings.get("scheduler_policy", "preempt"),
+        max_queue=settings.get("max_queued_emotes", 2),
+        stride=max(1, args.stride), mirror=not args.no_mirror, frame_events=args.frames)
+
+    failed = [summary for summary in summaries if "error" in summary]
+    print(f"💾 Timelines written to {args.analyze_output}")
+    return 1 if failed else 0
+
+
+def run_headless(config_path: str) -> int:
+    """Service entry point: no banner, no prompts, no HighGUI."""
+    try:
+        app = EmoteStreamApp(config_path=config_path, headless=True)
+        app.run()
+        return 0 if app.start_time else 1
+    except Exception as e:
+        print(f"\n💥 Fatal error: {e}")
+        traceback.print_exc()
+        return 1
+
+
 def main():
     """Enhanced application entry point for YOUR gestures."""
+    args = parse_args()
+    if args.analyze:
+        return run_analysis(args)
+    if args.benchmark is not None:
+        return run_benchmark(args)
+    if args.headless:
+        return run_headless(args.config)
+
     # Clear screen and show banner
     os.system('cls' if os.name == 'nt' else 'clear')
     show_startup_banner()
@@ -1298,7 +2203,7 @@ def main():
         print("🚀 Starting YOUR EmoteStream 2.0...")
 
         # Create and run application
-        app = EmoteStreamApp(config_path="emotes/emotes.yaml")
+        app = EmoteStreamApp(config_path=args.config)
         app.run()
 
     except KeyboardInterrupt:
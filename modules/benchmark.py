@@ -0,0 +1,274 @@
+import gc
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.metrics import process_stats
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# Settings applied to every benchmark run: file input, null output, nothing interactive.
+# Blocking queues make capture wait for the slowest stage, so every frame is processed.
+BENCHMARK_SETTINGS = {
+    "output_sinks": ["null"],
+    "pipeline_queues": {
+        "detect": {"maxsize": 1, "policy": "block"},
+        "frames": {"maxsize": 2, "policy": "block"},
+    },
+    "auto_start_camera": False,
+    "control_api": False,
+    "prometheus_port": None,
+    "metrics_file": None,
+    "trace_enabled": False,
+    "memory_profile": False,
+}
+
+# Metrics compared against a baseline: (path in the result, True if higher is better,
+# smallest absolute change that can count as a regression)
+COMPARED_METRICS = [
+    (("fps",), True, 0.0),
+    (("peak_rss_mb",), False, 5.0),
+    (("site_alloc_blocks_per_frame",), False, 10.0),  # Only with --allocations
+]
+COMPARED_STAGE_FIELDS = ("p50_ms", "p99_ms")
+# Depends on the phase of the fixed-rate output clock, not on the work done
+UNCOMPARED_STAGES = ("glass",)
+
+
+def find_inputs(paths: Iterable[str]) -> List[str]:
+    """Video files named directly or found (non-recursively) in the given directories."""
+    inputs = []
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            inputs.extend(str(f) for f in sorted(p.iterdir()) if f.suffix.lower() in VIDEO_EXTENSIONS)
+        elif p.exists():
+            inputs.append(str(p))
+    return inputs
+
+
+class SteadyStateAllocations:
+    """Allocations per frame in the running frame loop, from tracemalloc snapshots.
+
+    A thread watches the app's frame counter and takes a snapshot every
+    `every` frames once `warmup` frames went by, so construction, model
+    loading and cleanup fall outside the window. Between two snapshots the
+    growth of every allocation site that grew is summed: memory a stage
+    allocates and frees again within one interval does not show, but buffers
+    that are reallocated instead of reused do, no matter how long the clip.
+    """
+
+    def __init__(self, app, warmup: int = 30, every: int = 15):
+        self.app = app
+        self.warmup = warmup
+        self.every = every
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._first_frame = self._last_frame = 0
+        self._gc_first = self._gc_last = 0
+        self.bytes = 0
+        self.blocks = 0
+        self.peak = 0  # Largest traced-memory rise above an interval's starting level
+        self._interval_start = 0
+
+    def start(self):
+        tracemalloc.start()
+        self._thread = threading.Thread(target=self._run, name="BenchAllocations", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        tracemalloc.stop()
+
+    def _run(self):
+        mark = self.warmup
+        while not self._stop.wait(0.001):
+            frame = self.app.frame_count
+            if frame >= mark:
+                self._sample(frame)
+                mark = frame + self.every
+
+    def _sample(self, frame: int):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+        gen0 = gc.get_stats()[0]["collections"]
+        if self._previous is None:
+            self._first_frame, self._gc_first = frame, gen0
+        else:
+            for diff in snapshot.compare_to(self._previous, "lineno"):
+                if diff.size_diff > 0:
+                    self.bytes += diff.size_diff
+                if diff.count_diff > 0:
+                    self.blocks += diff.count_diff
+            self.peak = max(self.peak, peak - self._interval_start)
+        self._last_frame, self._gc_last = frame, gen0
+        self._previous = snapshot
+        # Measured after the snapshot so its own allocations don't count
+        tracemalloc.reset_peak()
+        self._interval_start = tracemalloc.get_traced_memory()[0]
+
+    def result(self) -> dict:
+        frames = self._last_frame - self._first_frame
+        if frames <= 0:
+            return {}
+        return {
+            "alloc_window_frames": frames,
+            "site_alloc_kb_per_frame": round(self.bytes / 1024 / frames, 2),
+            "site_alloc_blocks_per_frame": round(self.blocks / frames, 2),
+            "alloc_interval_peak_kb": round(self.peak / 1024, 1),
+            "gc_gen0_per_frame": round((self._gc_last - self._gc_first) / frames, 3),
+        }
+
+
+def run_input(app_factory: Callable[[dict], object], path: str, allocations: bool = False,
+              logger: Optional[logging.Logger] = None) -> dict:
+    """Run the app pipeline over one recording at full speed and measure it.
+
+    app_factory builds an EmoteStreamApp from settings overrides; its run()
+    returns once the input is exhausted. With allocations, per-frame
+    allocation figures are measured over the steady-state frames only (see
+    SteadyStateAllocations); tracemalloc slows the run down, so compare them
+    only against baselines also taken with allocations.
+    """
+    logger = logger or logging.getLogger(__name__)
+    gc.collect()
+
+    app = app_factory(dict(BENCHMARK_SETTINGS, camera_source=path))
+    sampler = SteadyStateAllocations(app) if allocations else None
+    if sampler:
+        sampler.start()
+    try:
+        app.run()
+    finally:
+        if sampler:
+            sampler.stop()
+
+    frames = app.frame_count
+    elapsed = max((app.stop_time or time.time()) - (app.start_time or time.time()), 1e-9)
+    result = {
+        "input": path,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2),
+        "detections": app.detection_count,
+        "stages": {name: h.lifetime_snapshot() for name, h in sorted(app.metrics.histograms.items())},
+        "peak_rss_mb": round(process_stats()["peak_rss_bytes"] / 2**20, 1),
+    }
+    if sampler:
+        result.update(sampler.result())
+    if app.output_pacer:
+        result["output"] = app.output_pacer.get_stats()
+
+    logger.info(f"Benchmark {path}: {frames} frames in {elapsed:.1f}s ({result['fps']} fps)")
+    return result
+
+
+def summarize(runs: List[dict]) -> dict:
+    """Combine per-input runs into one result (frame-weighted where it matters)."""
+    frames = sum(run["frames"] for run in runs)
+    seconds = sum(run["seconds"] for run in runs)
+    measured = [run for run in runs if "alloc_window_frames" in run]
+    window_frames = sum(run["alloc_window_frames"] for run in measured)
+    stages: Dict[str, dict] = {}
+    for run in runs:
+        for name, stage in run["stages"].items():
+            merged = stages.setdefault(name, {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0})
+            merged["count"] += stage["count"]
+            # Percentiles can't be merged exactly; weight them by sample count
+            merged["p50_ms"] += stage["p50_ms"] * stage["count"]
+            merged["p99_ms"] += stage["p99_ms"] * stage["count"]
+            merged["max_ms"] = max(merged["max_ms"], stage["max_ms"])
+    for stage in stages.values():
+        count = max(stage["count"], 1)
+        stage["p50_ms"] = round(stage["p50_ms"] / count, 3)
+        stage["p99_ms"] = round(stage["p99_ms"] / count, 3)
+
+    result = {
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count()},
+        "frames": frames,
+        "seconds": round(seconds, 3),
+        "fps": round(frames / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": max((run["peak_rss_mb"] for run in runs), default=0.0),
+        "stages": stages,
+        "runs": runs,
+    }
+    if window_frames:
+        for field in ("site_alloc_kb_per_frame", "site_alloc_blocks_per_frame", "gc_gen0_per_frame"):
+            result[field] = round(sum(run[field] * run["alloc_window_frames"] for run in measured)
+                                  / window_frames, 3)
+    return result
+
+
+def compare(result: dict, baseline: dict, threshold: float = 10.0,
+            min_delta_ms: float = 0.5) -> Tuple[List[tuple], List[str]]:
+    """Rows of (metric, baseline, current, change %, regressed) and the names of regressions.
+
+    A metric regresses when it got worse by more than threshold percent; stage
+    timings must also have grown by at least min_delta_ms, so jitter in
+    sub-millisecond stages is not reported.
+    """
+    pairs = []
+    for path, higher_is_better, min_delta in COMPARED_METRICS:
+        pairs.append((".".join(path), _lookup(baseline, path), _lookup(result, path), higher_is_better,
+                      min_delta))
+    for name in sorted(set(result.get("stages", {})) & set(baseline.get("stages", {})) - set(UNCOMPARED_STAGES)):
+        for field in COMPARED_STAGE_FIELDS:
+            pairs.append((f"{name}.{field}", baseline["stages"][name].get(field),
+                          result["stages"][name].get(field), False, min_delta_ms))
+
+    rows, regressions = [], []
+    for metric, old, new, higher_is_better, min_delta in pairs:
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold and abs(new - old) >= min_delta
+        rows.append((metric, old, new, round(change, 1), regressed))
+        if regressed:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def format_comparison(rows: List[tuple]) -> str:
+    lines = [f"{'metric':<28} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{metric:<28} {old:>10.2f} {new:>10.2f} {change:>7.1f}%{flag}")
+    return "\n".join(lines)
+
+
+def _lookup(data: dict, path: tuple):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def load_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(path: str, data: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
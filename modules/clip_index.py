@@ -0,0 +1,239 @@
+import hashlib
+import os
+import sqlite3
+import struct
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import cv2
+
+# Bumped when the columns or probing change; an index with another version is rebuilt
+SCHEMA_VERSION = 1
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".flac", ".m4a"}
+_MP4_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    duration REAL,
+    fps REAL,
+    frame_count INTEGER,
+    width INTEGER,
+    height INTEGER,
+    has_audio INTEGER,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS derived (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (path, kind)
+);
+"""
+_COLUMNS = ("path", "size", "mtime_ns", "content_hash", "duration", "fps", "frame_count", "width", "height",
+            "has_audio", "indexed_at")
+
+
+def content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def mp4_has_audio(path: str) -> Optional[bool]:
+    """True if an MP4/MOV file has a sound track (a 'soun' handler in moov), None if it can't tell."""
+    try:
+        with open(path, "rb") as f:
+            # Walk the top-level boxes to moov, skipping mdat without reading it
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                size, box = struct.unpack(">I4s", header)
+                offset = 8
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                    offset = 16
+                elif size == 0:
+                    return None  # Box runs to the end of the file and it isn't moov
+                if box == b"moov":
+                    moov = f.read(size - offset)
+                    break
+                f.seek(size - offset, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+    # hdlr payload: version/flags (4), pre_defined (4), handler type (4)
+    index = moov.find(b"hdlr")
+    while index != -1:
+        if moov[index + 12:index + 16] == b"soun":
+            return True
+        index = moov.find(b"hdlr", index + 4)
+    return False
+
+
+def probe(path: str) -> dict:
+    """Media metadata for one file: video properties from OpenCV, audio presence from the container."""
+    extension = Path(path).suffix.lower()
+    if extension in AUDIO_EXTENSIONS:
+        return {"duration": None, "fps": None, "frame_count": None, "width": None, "height": None,
+                "has_audio": 1}
+
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    finally:
+        cap.release()
+    has_audio = mp4_has_audio(path) if extension in _MP4_EXTENSIONS else None
+    return {"duration": frame_count / fps if fps > 0 else None, "fps": fps or None, "frame_count": frame_count,
+            "width": width, "height": height, "has_audio": None if has_audio is None else int(has_audio)}
+
+
+class ClipIndex:
+    """Persistent SQLite index of emote clips and their metadata.
+
+    refresh() stats each path once and only re-probes (OpenCV open plus a
+    content hash) files whose size or mtime changed since they were indexed,
+    so startup and reload with an unchanged library never decode anything.
+    All rows are kept in memory as well, so get() is a dict lookup and safe to
+    call on the trigger path.
+
+    Derived caches (e.g. decoded audio) are recorded with mark_derived() against
+    the content hash they were built from; derived_status() reports them as
+    "stale" once the source's content changes. Paths are stored as given, so
+    relative paths in emotes.yaml stay valid when the app is moved.
+    """
+
+    def __init__(self, path: str = "cache/clips.sqlite", logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows: Dict[str, dict] = {}
+        self._derived: Dict[str, Dict[str, str]] = {}  # path -> {kind: source hash}
+
+        self.hits = 0
+        self.misses = 0
+        self.missing = 0
+        self.last_refresh_ms = 0.0
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._open()
+
+    def _open(self):
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self.logger.info(f"Clip index schema {version} is outdated, rebuilding")
+            self._db.executescript("DROP TABLE IF EXISTS clips; DROP TABLE IF EXISTS derived;")
+        self._db.executescript(_SCHEMA)
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.commit()
+        for row in self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM clips"):
+            self._rows[row[0]] = dict(zip(_COLUMNS, row))
+        for path, kind, source_hash in self._db.execute("SELECT path, kind, source_hash FROM derived"):
+            self._derived.setdefault(path, {})[kind] = source_hash
+
+    def refresh(self, paths: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Bring the given paths up to date; returns {path: metadata, or None if missing/unreadable}."""
+        start = time.perf_counter()
+        result = {}
+        with self._lock:
+            for path in dict.fromkeys(paths):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    self.missing += 1
+                    result[path] = None
+                    continue
+                row = self._rows.get(path)
+                if row and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                    self.hits += 1
+                    result[path] = row
+                    continue
+                try:
+                    row = self._index(path, stat)
+                except Exception as e:
+                    self.logger.warning(f"Cannot index {path}: {e}")
+                    result[path] = None
+                    continue
+                self._rows[path] = row
+                result[path] = row
+            self._db.commit()
+        self.last_refresh_ms = (time.perf_counter() - start) * 1000
+        return result
+
+    def _index(self, path: str, stat: os.stat_result) -> dict:
+        self.misses += 1
+        row = dict(probe(path), path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                   content_hash=content_hash(path), indexed_at=time.time())
+        self._db.execute(f"INSERT OR REPLACE INTO clips ({', '.join(_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(_COLUMNS))})", [row[column] for column in _COLUMNS])
+        if row["frame_count"] is None:
+            self.logger.info(f"Indexed audio {path}")
+        else:
+            self.logger.info(f"Indexed clip {path}: {row['frame_count']} frames, "
+                             f"{row['duration'] or 0:.1f}s, {row['width']}x{row['height']}")
+        return row
+
+    def get(self, path: str) -> Optional[dict]:
+        """Indexed metadata for a path as of the last refresh(); no disk access."""
+        return self._rows.get(path)
+
+    def mark_derived(self, path: str, kind: str):
+        """Record that a cache of the given kind was built from the path's current content."""
+        row = self._rows.get(path)
+        if row is None or self._derived.get(path, {}).get(kind) == row["content_hash"]:
+            return
+        with self._lock:
+            self._derived.setdefault(path, {})[kind] = row["content_hash"]
+            self._db.execute("INSERT OR REPLACE INTO derived (path, kind, source_hash, created_at) VALUES (?, ?, ?, ?)",
+                             (path, kind, row["content_hash"], time.time()))
+            self._db.commit()
+
+    def derived_status(self, path: str) -> Dict[str, str]:
+        """{kind: "fresh" | "stale"} for every derived cache recorded for the path."""
+        row = self._rows.get(path)
+        return {kind: "fresh" if row and row["content_hash"] == source_hash else "stale"
+                for kind, source_hash in self._derived.get(path, {}).items()}
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Forget every path not in keep (clips removed from the library). Returns rows deleted."""
+        keep = set(keep)
+        with self._lock:
+            stale = [path for path in self._rows if path not in keep]
+            for path in stale:
+                del self._rows[path]
+                self._derived.pop(path, None)
+            self._db.executemany("DELETE FROM clips WHERE path = ?", [(path,) for path in stale])
+            self._db.executemany("DELETE FROM derived WHERE path = ?", [(path,) for path in stale])
+            self._db.commit()
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_stats(self) -> dict:
+        stale = sum(1 for path in list(self._derived) for status in self.derived_status(path).values()
+                    if status == "stale")
+        return {"clips": len(self._rows), "hits": self.hits, "misses": self.misses, "missing": self.missing,
+                "stale_derived": stale, "last_refresh_ms": round(self.last_refresh_ms, 2)}
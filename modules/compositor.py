@@ -0,0 +1,243 @@
+import cv2
+import numpy as np
+import logging
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+
+class CompositeMode(Enum):
+    FULLSCREEN = "fullscreen"
+    OVERLAY = "overlay"
+
+
+# Fixed-point alpha scale: alpha 0..256 so the blend normalizes with a shift by 8
+ALPHA_ONE = 256
+ALPHA_SHIFT = 8
+
+
+class FadeTransition:
+    """Precomputed clip weights for fading between the live feed and a clip."""
+
+    def __init__(self, fade_in_frames: int = 0, fade_out_frames: int = 0, total_frames: int = 0):
+        self.total_frames = max(int(total_frames), 0)
+        # Don't let the two fades overlap on very short clips
+        if self.total_frames > 0:
+            fade_in_frames = min(fade_in_frames, self.total_frames // 2)
+            fade_out_frames = min(fade_out_frames, self.total_frames // 2)
+        self.fade_in = [(i + 1) / (fade_in_frames + 1) for i in range(max(fade_in_frames, 0))]
+        self.fade_out = [(i + 1) / (fade_out_frames + 1) for i in range(max(fade_out_frames, 0))][::-1]
+
+    @classmethod
+    def from_durations(cls, fade_in: float, fade_out: float, fps: float, total_frames: int) -> "FadeTransition":
+        """Build the weight tables from fade durations in seconds."""
+        return cls(int(round(fade_in * fps)), int(round(fade_out * fps)), total_frames)
+
+    def weight(self, frame_index: int) -> float:
+        """Clip weight for a frame (1.0 = clip only, 0.0 = live only)."""
+        if frame_index < len(self.fade_in):
+            return self.fade_in[frame_index]
+        if self.total_frames > 0:
+            remaining = self.total_frames - frame_index
+            if 0 < remaining <= len(self.fade_out):
+                return self.fade_out[len(self.fade_out) - remaining]
+        return 1.0
+
+
+class EmoteCompositor:
+    """Composes emote clip frames over the live camera feed.
+
+    In FULLSCREEN mode the clip replaces the frame (previous behaviour). In OVERLAY
+    mode the clip is resized only to the configured region and blended there with
+    integer math; the rest of the live frame is untouched. All buffers are
+    preallocated per region size and the alpha mask is built once per clip.
+    """
+
+    def __init__(self, width: int, height: int, mode: str = "fullscreen",
+                 region: Sequence[float] = (0.62, 0.05, 0.35, 0.35), opacity: float = 1.0,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.width = width
+        self.height = height
+        self.mode = CompositeMode(mode)
+        self.opacity = min(max(float(opacity), 0.0), 1.0)
+        self.region = self._region_to_pixels(region)
+
+        # Per-clip mask settings
+        self._chroma_key: Optional[np.ndarray] = None
+        self._chroma_tolerance = 0
+        self._mask_image: Optional[np.ndarray] = None
+        self._mask_ready = False
+
+        # Fade durations in seconds; weight tables are built per clip in begin_clip()
+        self.fade_in_time = 0.0
+        self.fade_out_time = 0.0
+        self.transition = FadeTransition()
+
+        self._allocate_buffers()
+
+    def _region_to_pixels(self, region: Sequence[float]) -> Tuple[int, int, int, int]:
+        """Convert a normalized (x, y, w, h) region into a clamped pixel rectangle."""
+        rx, ry, rw, rh = (float(v) for v in region)
+        w = max(2, min(int(rw * self.width), self.width))
+        h = max(2, min(int(rh * self.height), self.height))
+        x = min(max(int(rx * self.width), 0), self.width - w)
+        y = min(max(int(ry * self.height), 0), self.height - h)
+        return x, y, w, h
+
+    def _allocate_buffers(self):
+        """Preallocate output and blend buffers for the current size and region."""
+        _, _, w, h = self.region
+        self._output = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self._live = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self._clip_roi = np.zeros((h, w, 3), dtype=np.uint8)
+        self._region = np.zeros((h, w, 3), dtype=np.uint8)
+        self._alpha = np.full((h, w, 1), int(self.opacity * ALPHA_ONE), dtype=np.uint16)
+        self._inv_alpha = ALPHA_ONE - self._alpha
+        self._blend_a = np.zeros((h, w, 3), dtype=np.uint16)
+        self._blend_b = np.zeros((h, w, 3), dtype=np.uint16)
+
+    def configure(self, mode: Optional[str] = None, region: Optional[Sequence[float]] = None,
+                  opacity: Optional[float] = None):
+        """Change compositing mode, region or opacity (reallocates buffers if needed)."""
+        if mode is not None:
+            self.mode = CompositeMode(mode)
+        if opacity is not None:
+            self.opacity = min(max(float(opacity), 0.0), 1.0)
+        if region is not None:
+            self.region = self._region_to_pixels(region)
+        self._allocate_buffers()
+        self._mask_ready = False
+
+    def resize(self, width: int, height: int, region: Sequence[float]):
+        """Change the output size (e.g. after a quality change)."""
+        self.width = width
+        self.height = height
+        self.configure(region=region)
+
+    def set_transitions(self, fade_in: float, fade_out: float):
+        """Set fade-in/fade-out durations in seconds (0 disables the fade)."""
+        self.fade_in_time = max(float(fade_in), 0.0)
+        self.fade_out_time = max(float(fade_out), 0.0)
+
+    @property
+    def is_overlay(self) -> bool:
+        return self.mode == CompositeMode.OVERLAY
+
+    def transition_weight(self, frame_index: int) -> float:
+        """Clip weight of the current transition for a clip frame index."""
+        return self.transition.weight(frame_index)
+
+    def begin_clip(self, emote_config: Optional[dict] = None, fps: float = 30, total_frames: int = 0):
+        """Reset per-clip state and precompute this clip's transition weights.
+
+        The alpha mask is rebuilt from the clip's first frame.
+        """
+        self.transition = FadeTransition.from_durations(self.fade_in_time, self.fade_out_time,
+                                                        fps, total_frames)
+
+        overlay_cfg = (emote_config or {}).get('overlay', {}) or {}
+
+        chroma = overlay_cfg.get('chroma_key')
+        if chroma is not None:
+            r, g, b = (int(c) for c in chroma)  # Config is RGB, frames are BGR
+            self._chroma_key = np.array([b, g, r], dtype=np.int16)
+            self._chroma_tolerance = int(overlay_cfg.get('chroma_tolerance', 60))
+        else:
+            self._chroma_key = None
+
+        self._mask_image = None
+        mask_path = overlay_cfg.get('mask_path')
+        if mask_path:
+            if Path(mask_path).exists():
+                self._mask_image = cv2.imread(mask_path, cv2.IMREAD_UNCHANGED)
+            else:
+                self.logger.warning(f"Overlay mask not found: {mask_path}")
+
+        self._mask_ready = False
+
+    def _build_alpha_mask(self, clip_roi: np.ndarray):
+        """Compute the fixed-point alpha mask once for the current clip."""
+        _, _, w, h = self.region
+        opacity = int(self.opacity * ALPHA_ONE)
+        alpha = np.full((h, w), opacity, dtype=np.uint16)
+
+        if self._mask_image is not None:
+            mask = self._mask_image
+            if mask.ndim == 3:
+                # Use the alpha channel of a BGRA image, otherwise its luminance
+                mask = mask[:, :, 3] if mask.shape[2] == 4 else cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
+            mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_AREA).astype(np.uint32)
+            alpha = ((alpha * (mask + 1)) >> ALPHA_SHIFT).astype(np.uint16)
+
+        if self._chroma_key is not None:
+            # Keyed from the first frame: suits clips shot on a static green/blue screen
+            distance = np.abs(clip_roi.astype(np.int16) - self._chroma_key).max(axis=2)
+            keyed = distance < self._chroma_tolerance
+            alpha[keyed] = 0
+            # Soften the key edge a little to hide aliasing
+            alpha = cv2.blur(alpha, (3, 3))
+
+        self._alpha[:, :, 0] = alpha
+        np.subtract(ALPHA_ONE, self._alpha, out=self._inv_alpha)
+        self._mask_ready = True
+
+    def _fit_output(self, frame: np.ndarray, buffer: np.ndarray) -> np.ndarray:
+        """Return frame at output size, resizing into buffer only when needed."""
+        if frame.shape[:2] != (self.height, self.width):
+            cv2.resize(frame, (self.width, self.height), dst=buffer)
+            return buffer
+        return frame
+
+    def compose(self, live_frame: Optional[np.ndarray], clip_frame: np.ndarray,
+                weight: float = 1.0) -> np.ndarray:
+        """Return the composed output frame.
+
+        weight is the transition weight of the clip (see transition_weight); below
+        1.0 the clip is cross-faded with the live frame in one extra in-place
+        multiply-add pass. The result is either a reused internal buffer, the clip
+        frame or live_frame itself, so copy it if you need to keep it.
+        """
+        if not self.is_overlay or live_frame is None:
+            # Full-frame replacement
+            output = self._fit_output(clip_frame, self._output)
+            if weight < 1.0 and live_frame is not None:
+                live = self._fit_output(live_frame, self._live)
+                cv2.addWeighted(output, weight, live, 1.0 - weight, 0, dst=output)
+            return output
+
+        x, y, w, h = self.region
+
+        # Live frame as background, blended in place when it already has the output size
+        if live_frame.shape[:2] != (self.height, self.width):
+            cv2.resize(live_frame, (self.width, self.height), dst=self._output)
+            output = self._output
+        else:
+            output = live_frame
+
+        # Resize the clip only to the overlay region
+        cv2.resize(clip_frame, (w, h), dst=self._clip_roi, interpolation=cv2.INTER_AREA)
+
+        if not self._mask_ready:
+            self._build_alpha_mask(self._clip_roi)
+
+        out_roi = output[y:y + h, x:x + w]
+
+        # During a transition the blended region goes to a scratch buffer first
+        target = self._region if weight < 1.0 else out_roi
+
+        if self._chroma_key is None and self._mask_image is None and self.opacity >= 1.0:
+            # Opaque overlay: plain copy of the region
+            np.copyto(target, self._clip_roi)
+        else:
+            # out = (clip * a + live * (256 - a)) >> 8, all in uint16, only inside the region
+            np.multiply(self._clip_roi, self._alpha, out=self._blend_a)
+            np.multiply(out_roi, self._inv_alpha, out=self._blend_b)
+            np.add(self._blend_a, self._blend_b, out=self._blend_a)
+            np.right_shift(self._blend_a, ALPHA_SHIFT, out=self._blend_a)
+            np.copyto(target, self._blend_a, casting='unsafe')
+
+        if weight < 1.0:
+            cv2.addWeighted(self._region, weight, out_roi, 1.0 - weight, 0, dst=out_roi)
+
+        return output
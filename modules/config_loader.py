@@ -4,9 +4,16 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 import logging
 
+from modules.clip_index import ClipIndex
+
+# Gesture types EmoteDetector has a rule for
+VALID_GESTURES = ('hands_up', 'hands_on_head', 'violin_gesture', 'peace_out', 'middle_finger', 'shot_in_head')
+
 class ConfigLoader:
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, clip_index: Optional[ClipIndex] = None):
         self.logger = logger or logging.getLogger(__name__)
+        # File checks go through the index: one stat per file, probing only what changed
+        self.clip_index = clip_index or ClipIndex(":memory:", self.logger)
     
     def load_config(self, path: str = "emotes.yaml") -> Dict[str, Any]:
         """Load and validate emote configuration from YAML file."""
@@ -37,6 +44,9 @@ class ConfigLoader:
     def _validate_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Validate emote configuration structure and file paths."""
         validated = {}
+        media = self.clip_index.refresh(
+            path for emote_data in config.values() if isinstance(emote_data, dict)
+            for path in (emote_data.get('video_path'), emote_data.get('audio_path')) if path)
         
         for emote_name, emote_data in config.items():
             try:
@@ -47,22 +57,19 @@ class ConfigLoader:
                 if 'video_path' not in emote_data:
                     raise ValueError(f"Missing 'video_path' field for emote '{emote_name}'")
                 
-                if 'audio_path' not in emote_data:
-                    raise ValueError(f"Missing 'audio_path' field for emote '{emote_name}'")
-                
-                # Validate file paths exist
-                video_path = Path(emote_data['video_path'])
-                audio_path = Path(emote_data['audio_path'])
+                # Validate file paths exist (audio is optional)
+                video_path = emote_data['video_path']
+                audio_path = emote_data.get('audio_path')
                 
-                if not video_path.exists():
+                if media.get(video_path) is None:
                     self.logger.warning(f"Video file not found for '{emote_name}': {video_path}")
                 
-                if not audio_path.exists():
+                if audio_path and media.get(audio_path) is None:
                     self.logger.warning(f"Audio file not found for '{emote_name}': {audio_path}")
                 
                 # Validate gesture type
                 gesture_type = emote_data['gesture'].get('type')
-                if gesture_type not in ['hands_up', 'hands_on_head']:
+                if gesture_type not in VALID_GESTURES:
                     self.logger.warning(f"Unknown gesture type for '{emote_name}': {gesture_type}")
                 
                 validated[emote_name] = emote_data
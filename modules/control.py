@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, Iterator, Optional, Set
+
+
+class ControlMailbox:
+    """Commands for the frame loop, posted from any thread and applied between frames.
+
+    Producers (signal handlers, the keyboard, a control server) only append to a
+    deque and consumers only pop from it; both are atomic in CPython, so posting
+    never takes a lock or waits for the frame loop. When the mailbox is full the
+    oldest command is discarded.
+    """
+
+    def __init__(self, maxlen: int = 256, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._commands = deque(maxlen=maxlen)
+        self.posted = 0
+
+    def post(self, command: str, args: Optional[dict] = None,
+             reply: Optional[Callable[[dict], None]] = None):
+        """Queue a command. reply, if given, is called on the frame thread with the result."""
+        self._commands.append({"command": command, "args": args or {}, "reply": reply,
+                               "posted": time.monotonic()})
+        self.posted += 1
+
+    def drain(self) -> Iterator[dict]:
+        """Yield the commands posted so far, oldest first."""
+        while True:
+            try:
+                yield self._commands.popleft()
+            except IndexError:
+                return
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+
+# POSIX signals understood in headless mode and the commands they post
+SIGNAL_COMMANDS = {
+    "SIGINT": "quit",
+    "SIGTERM": "quit",
+    "SIGHUP": "reload",
+    "SIGUSR1": "stats",
+    "SIGUSR2": "skip",
+}
+
+
+def install_signal_handlers(mailbox: ControlMailbox, logger: Optional[logging.Logger] = None) -> list:
+    """Route process signals into the mailbox. Must be called from the main thread.
+
+    Returns the names of the signals that were installed (Windows has only a few).
+    """
+    logger = logger or logging.getLogger(__name__)
+    installed = []
+    for name, command in SIGNAL_COMMANDS.items():
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+
+        def handler(received, frame, command=command):
+            mailbox.post(command, {"signal": signal.Signals(received).name})
+
+        try:
+            signal.signal(signum, handler)
+            installed.append(name)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot handle {name}: {e}")
+    return installed
+
+
+class ControlServer:
+    """Local control API: line-delimited JSON over a Unix socket.
+
+    Runs its own asyncio loop on a background thread. Each request line is
+    parsed there and posted to the ControlMailbox; the frame loop applies it
+    between frames and the result comes back as the response line. Where Unix
+    sockets are unavailable (Windows) it listens on TCP localhost instead.
+
+        -> {"id": 1, "cmd": "trigger", "emote": "hands_up"}
+        <- {"id": 1, "ok": true, "accepted": true}
+        -> {"id": 2, "cmd": "subscribe", "events": ["started", "finished"]}
+        <- {"id": 2, "ok": true}
+        <- {"event": "started", "emote": "hands_up", "time": ..., "priority": 0}
+    """
+
+    # Commands forwarded to the frame loop (protocol name -> mailbox command)
+    FORWARDED = {
+        "trigger": "trigger",
+        "stop": "stop",
+        "reload": "reload",
+        "skip": "skip",
+        "get-stats": "get_stats",
+        "set-setting": "set_setting",
+        "dump-trace": "dump_trace",
+    }
+    MAX_LINE = 64 * 1024
+    MAX_PENDING_OUTPUT = 256 * 1024  # Subscribers that fall this far behind are dropped
+
+    def __init__(self, mailbox: ControlMailbox, socket_path: Optional[str] = "emotestream.sock",
+                 port: int = 47800, host: str = "127.0.0.1", reply_timeout: float = 5.0,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.mailbox = mailbox
+        self.socket_path = socket_path
+        self.port = port
+        self.host = host
+        self.reply_timeout = reply_timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._subscribers: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self.address: Optional[str] = None
+        self.requests_handled = 0
+        self.events_published = 0
+
+    @property
+    def uses_unix_socket(self) -> bool:
+        return bool(self.socket_path) and sys.platform != "win32" and hasattr(asyncio, "start_unix_server")
+
+    def start(self, timeout: float = 5.0) -> bool:
+        """Start listening; returns False if the server could not bind."""
+        self._thread = threading.Thread(target=self._run, name="ControlServer", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self._server is not None
+
+    def stop(self, timeout: float = 2.0):
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def publish(self, event: dict):
+        """Send an event to subscribed clients. Safe to call from any thread; never blocks."""
+        if not self._subscribers or not self._loop:
+            return
+        line = (json.dumps(event, default=str) + "\n").encode()
+        try:
+            self._loop.call_soon_threadsafe(self._broadcast, event.get("event"), line)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        except Exception as e:
+            self.logger.error(f"Control API failed to start: {e}")
+            self._server = None
+            self._loop.close()
+            self._ready.set()
+            return
+        self._ready.set()
+
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            for writer in list(self._subscribers):
+                writer.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+            if self.uses_unix_socket and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _listen(self):
+        if self.uses_unix_socket:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)  # Stale socket from a previous run
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path,
+                                                           limit=self.MAX_LINE)
+            os.chmod(self.socket_path, 0o600)
+            self.address = f"unix:{self.socket_path}"
+        else:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                      limit=self.MAX_LINE)
+            self.address = f"tcp:{self.host}:{self.port}"
+        self.logger.info(f"Control API listening on {self.address}")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than MAX_LINE
+                    await self._send(writer, {"ok": False, "error": "request too long"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._handle_request(line, writer)
+                self.requests_handled += 1
+                await self._send(writer, response)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, message: dict):
+        writer.write((json.dumps(message, default=str) + "\n").encode())
+        await writer.drain()
+
+    async def _handle_request(self, line: bytes, writer: asyncio.StreamWriter) -> dict:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return {"ok": False, "error": f"invalid request: {e}"}
+
+        request_id = request.get("id")
+        command = request.get("cmd")
+        args = {k: v for k, v in request.items() if k not in ("id", "cmd")}
+
+        if command == "ping":
+            result = {"ok": True}
+        elif command == "subscribe":
+            self._subscribers[writer] = set(args.get("events") or [])
+            result = {"ok": True}
+        elif command == "unsubscribe":
+            self._subscribers.pop(writer, None)
+            result = {"ok": True}
+        elif command in self.FORWARDED:
+            result = await self._forward(self.FORWARDED[command], args)
+        else:
+            result = {"ok": False, "error": f"unknown command: {command}"}
+
+        response = {"id": request_id}
+        response.update(result)
+        return response
+
+    async def _forward(self, command: str, args: dict) -> dict:
+        """Post to the mailbox and wait (without blocking the loop) for the frame thread's reply."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def reply(result: dict):
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+            except RuntimeError:
+                pass  # Loop closed while the command was queued
+
+        self.mailbox.post(command, args, reply)
+        try:
+            return await asyncio.wait_for(future, self.reply_timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "timed out waiting for the frame loop"}
+
+    def _broadcast(self, event_name: Optional[str], line: bytes):
+        self.events_published += 1
+        for writer, events in list(self._subscribers.items()):
+            if events and event_name not in events:
+                continue
+            if writer.transport.get_write_buffer_size() > self.MAX_PENDING_OUTPUT:
+                self.logger.warning("Dropping slow control API subscriber")
+                self._subscribers.pop(writer, None)
+                writer.close()
+                continue
+            writer.write(line)
+
+    def get_stats(self) -> dict:
+        return {
+            "address": self.address,
+            "subscribers": len(self._subscribers),
+            "requests": self.requests_handled,
+            "events": self.events_published,
+        }
@@ -1,15 +1,108 @@
-import mediapipe as mp
 import cv2
 import time
+import types
+from enum import IntEnum
 import numpy as np
 
+try:
+    import mediapipe as mp
+except ImportError:  # Gesture rules still run on landmark fixtures (see modules.gesture_bench)
+    mp = None
+
+
+class PoseLandmark(IntEnum):
+    """MediaPipe Pose landmark indices (same values as mp.solutions.pose.PoseLandmark)."""
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
+
+
+class HandLandmark(IntEnum):
+    """MediaPipe Hands landmark indices (same values as mp.solutions.hands.HandLandmark)."""
+    WRIST = 0
+    THUMB_CMC = 1
+    THUMB_MCP = 2
+    THUMB_IP = 3
+    THUMB_TIP = 4
+    INDEX_FINGER_MCP = 5
+    INDEX_FINGER_PIP = 6
+    INDEX_FINGER_DIP = 7
+    INDEX_FINGER_TIP = 8
+    MIDDLE_FINGER_MCP = 9
+    MIDDLE_FINGER_PIP = 10
+    MIDDLE_FINGER_DIP = 11
+    MIDDLE_FINGER_TIP = 12
+    RING_FINGER_MCP = 13
+    RING_FINGER_PIP = 14
+    RING_FINGER_DIP = 15
+    RING_FINGER_TIP = 16
+    PINKY_MCP = 17
+    PINKY_PIP = 18
+    PINKY_DIP = 19
+    PINKY_TIP = 20
+
+
 class EmoteDetector:
-    def __init__(self, emote_configs, hold_time=0.8, cooldown_time=1.5, logger=None):
+    def __init__(self, emote_configs, hold_time=0.8, logger=None, metrics=None, load_models=True):
         self.emote_configs = emote_configs
         self.hold_time = hold_time  # Reduced for faster response
-        self.cooldown_time = cooldown_time
+        # Cooldowns are applied by the TriggerScheduler, the detector only reports holds
         self.logger = logger
+        self.metrics = metrics  # Optional MetricsRegistry for Pose/Hands timings
+
+        # State tracking
+        self.last_triggered = None
+        self.last_emote_type = None
+        self.detection_start_time = None
+        self.active_candidate = None
+        
+        # Debug mode
+        self.debug_mode = True
+        self._debug_frame_count = 0
         
+        # Gesture stability tracking - reduced for faster response
+        self.gesture_history = []
+        self.history_size = 2  # Reduced from 3 to 2
+
+        if not load_models:
+            # Rules only (fixtures, benchmarks): landmark indices without MediaPipe
+            self.mp_pose = types.SimpleNamespace(PoseLandmark=PoseLandmark)
+            self.mp_hands = types.SimpleNamespace(HandLandmark=HandLandmark)
+            self.pose = self.hands = None
+            return
+        if mp is None:
+            raise ImportError("mediapipe is required for live detection (pip install mediapipe)")
+
         # MediaPipe setup - Relaxed settings for better detection
         self.mp_pose = mp.solutions.pose
         self.mp_hands = mp.solutions.hands
@@ -31,27 +124,26 @@ class EmoteDetector:
         
         self.mp_drawing = mp.solutions.drawing_utils
 
-        # State tracking
-        self.last_triggered = None
-        self.last_emote_type = None
-        self.detection_start_time = None
-        self.active_candidate = None
-        
-        # Debug mode
-        self.debug_mode = True
-        self._debug_frame_count = 0
-        
-        # Gesture stability tracking - reduced for faster response
-        self.gesture_history = []
-        self.history_size = 2  # Reduced from 3 to 2
+        # Drawing styles are built once, not per preview frame
+        self._pose_landmark_spec = self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=3)
+        self._pose_connection_spec = self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+        self._hand_landmark_spec = self.mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=2, circle_radius=2)
+        self._hand_connection_spec = self.mp_drawing.DrawingSpec(color=(0, 255, 255), thickness=2)
 
     def process_frame(self, frame):
         """Process frame with MediaPipe solutions"""
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
+        return self.process_rgb(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def process_rgb(self, image_rgb):
+        """Process an RGB frame (converted by the caller, e.g. the capture stage)"""
         # Process with both detectors
+        start = time.perf_counter()
         pose_results = self.pose.process(image_rgb)
+        pose_done = time.perf_counter()
         hands_results = self.hands.process(image_rgb)
+        if self.metrics:
+            self.metrics.span("pose", start, pose_done)
+            self.metrics.span("hands", pose_done)
         
         # Return combined results
         return {
@@ -66,8 +158,8 @@ class EmoteDetector:
                 frame,
                 results['pose'].pose_landmarks,
                 self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=3),
-                connection_drawing_spec=self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+                landmark_drawing_spec=self._pose_landmark_spec,
+                connection_drawing_spec=self._pose_connection_spec
             )
         
         # Draw hand landmarks
@@ -75,8 +167,8 @@ class EmoteDetector:
             for hand_landmarks in results['hands'].multi_hand_landmarks:
                 self.mp_drawing.draw_landmarks(
                     frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS,
-                    landmark_drawing_spec=self.mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=2, circle_radius=2),
-                    connection_drawing_spec=self.mp_drawing.DrawingSpec(color=(0, 255, 255), thickness=2)
+                    landmark_drawing_spec=self._hand_landmark_spec,
+                    connection_drawing_spec=self._hand_connection_spec
                 )
         
         # Debug: Draw key points with labels
@@ -106,8 +198,13 @@ class EmoteDetector:
                     cv2.circle(frame, (x, y), 8, (255, 255, 0), -1)
                     cv2.putText(frame, name, (x+10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
 
-    def detect_emote_with_status(self, results):
-        """Detect emotes with multiple gesture types - improved responsiveness"""
+    def detect_emote_with_status(self, results, now=None):
+        """Detect emotes with multiple gesture types - improved responsiveness
+
+        now is the monotonic capture time of the frame the results belong to
+        (defaults to the current time), so hold times follow the frames and a
+        triggered emote carries the onset and hold-satisfied times in 'timing'.
+        """
         detected = None
         current_gesture = None
         
@@ -136,7 +233,8 @@ class EmoteDetector:
 
         # Handle timing logic
         if stable_gesture:
-            now = time.time()
+            if now is None:
+                now = time.monotonic()
 
             if self.active_candidate != stable_gesture:
                 self.active_candidate = stable_gesture
@@ -158,15 +256,14 @@ class EmoteDetector:
             }
 
             if progress >= 1.0:
-                if (self.last_emote_type != stable_gesture or 
-                    (self.last_triggered and now - self.last_triggered > self.cooldown_time)):
-                    self.last_triggered = now
-                    self.last_emote_type = stable_gesture
-                    self.active_candidate = None
-                    self.gesture_history.clear()
-                    if self.debug_mode:
-                        print(f"[DEBUG] ✓ EMOTE TRIGGERED: {detected['name']}")
-                    return detected, None
+                detected['timing'] = {'onset': self.detection_start_time, 'held': now}
+                self.last_triggered = now
+                self.last_emote_type = stable_gesture
+                self.active_candidate = None
+                self.gesture_history.clear()
+                if self.debug_mode:
+                    print(f"[DEBUG] ✓ EMOTE TRIGGERED: {detected['name']}")
+                return detected, None
 
             return None, status
         else:
@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+from typing import Dict, List, Optional, Sequence
+
+from modules.detector import EmoteDetector, HandLandmark, PoseLandmark
+
+# Gesture type -> EmoteDetector rule, in emotes.yaml order (the order detect_emote_with_status tries them)
+GESTURE_RULES = {
+    "hands_up": "_detect_hands_up",
+    "hands_on_head": "_detect_hands_on_head",
+    "violin_gesture": "_detect_violin_gesture",
+    "peace_out": "_detect_peace_out_improved",
+    "middle_finger": "_detect_middle_finger_improved",
+    "shot_in_head": "_detect_shot_in_head_improved",
+}
+
+FIXTURE_VERSION = 1
+
+
+class Landmark:
+    """Stand-in for a MediaPipe NormalizedLandmark (x, y, z, visibility)."""
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x: float, y: float, z: float = 0.0, visibility: float = 1.0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+
+class LandmarkList:
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmark: List[Landmark]):
+        self.landmark = landmark
+
+
+class PoseResults:
+    __slots__ = ("pose_landmarks",)
+
+    def __init__(self, pose_landmarks: Optional[LandmarkList]):
+        self.pose_landmarks = pose_landmarks
+
+
+class HandsResults:
+    __slots__ = ("multi_hand_landmarks",)
+
+    def __init__(self, multi_hand_landmarks: Optional[List[LandmarkList]]):
+        self.multi_hand_landmarks = multi_hand_landmarks
+
+
+class Fixture:
+    """One labeled frame of landmarks. label is the expected gesture type, None for no gesture."""
+
+    def __init__(self, name: str, label: Optional[str], pose: Optional[list], hands: Optional[list]):
+        self.name = name
+        self.label = label
+        self.pose = pose    # 33 [x, y, z, visibility] rows or None
+        self.hands = hands  # list of 21-row [x, y, z] hands or None
+
+    def results(self) -> dict:
+        """The fixture in the shape EmoteDetector.process_rgb returns."""
+        pose = LandmarkList([Landmark(*row) for row in self.pose]) if self.pose else None
+        hands = [LandmarkList([Landmark(*row) for row in hand]) for hand in self.hands] if self.hands else None
+        return {"pose": PoseResults(pose), "hands": HandsResults(hands)}
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "label": self.label, "pose": self.pose, "hands": self.hands}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Fixture":
+        return cls(data["name"], data.get("label"), data.get("pose"), data.get("hands"))
+
+
+# --- Synthetic fixtures -----------------------------------------------------
+# Normalized image coordinates (y grows downwards) of a person facing a
+# mirrored camera: the subject's left side has the smaller x.
+
+NEUTRAL_POSE = {
+    PoseLandmark.NOSE: (0.50, 0.30),
+    PoseLandmark.LEFT_EYE_INNER: (0.48, 0.28), PoseLandmark.LEFT_EYE: (0.47, 0.28),
+    PoseLandmark.LEFT_EYE_OUTER: (0.46, 0.28), PoseLandmark.RIGHT_EYE_INNER: (0.52, 0.28),
+    PoseLandmark.RIGHT_EYE: (0.53, 0.28), PoseLandmark.RIGHT_EYE_OUTER: (0.54, 0.28),
+    PoseLandmark.LEFT_EAR: (0.44, 0.30), PoseLandmark.RIGHT_EAR: (0.56, 0.30),
+    PoseLandmark.MOUTH_LEFT: (0.48, 0.34), PoseLandmark.MOUTH_RIGHT: (0.52, 0.34),
+    PoseLandmark.LEFT_SHOULDER: (0.38, 0.45), PoseLandmark.RIGHT_SHOULDER: (0.62, 0.45),
+    PoseLandmark.LEFT_ELBOW: (0.35, 0.60), PoseLandmark.RIGHT_ELBOW: (0.65, 0.60),
+    PoseLandmark.LEFT_WRIST: (0.36, 0.75), PoseLandmark.RIGHT_WRIST: (0.64, 0.75),
+    PoseLandmark.LEFT_PINKY: (0.36, 0.78), PoseLandmark.RIGHT_PINKY: (0.64, 0.78),
+    PoseLandmark.LEFT_INDEX: (0.37, 0.79), PoseLandmark.RIGHT_INDEX: (0.63, 0.79),
+    PoseLandmark.LEFT_THUMB: (0.38, 0.77), PoseLandmark.RIGHT_THUMB: (0.62, 0.77),
+    PoseLandmark.LEFT_HIP: (0.42, 0.80), PoseLandmark.RIGHT_HIP: (0.58, 0.80),
+    PoseLandmark.LEFT_KNEE: (0.42, 0.92), PoseLandmark.RIGHT_KNEE: (0.58, 0.92),
+    PoseLandmark.LEFT_ANKLE: (0.42, 1.02), PoseLandmark.RIGHT_ANKLE: (0.58, 1.02),
+    PoseLandmark.LEFT_HEEL: (0.42, 1.04), PoseLandmark.RIGHT_HEEL: (0.58, 1.04),
+    PoseLandmark.LEFT_FOOT_INDEX: (0.41, 1.05), PoseLandmark.RIGHT_FOOT_INDEX: (0.59, 1.05),
+}
+
+# Wrist (and elbow) positions that differ from the neutral pose
+POSES = {
+    "neutral": {},
+    "hands_up": {PoseLandmark.LEFT_WRIST: (0.33, 0.12), PoseLandmark.RIGHT_WRIST: (0.67, 0.12),
+                 PoseLandmark.LEFT_ELBOW: (0.33, 0.28), PoseLandmark.RIGHT_ELBOW: (0.67, 0.28)},
+    "hands_on_head": {PoseLandmark.LEFT_WRIST: (0.44, 0.24), PoseLandmark.RIGHT_WRIST: (0.56, 0.24),
+                      PoseLandmark.LEFT_ELBOW: (0.30, 0.30), PoseLandmark.RIGHT_ELBOW: (0.70, 0.30)},
+    "violin": {PoseLandmark.RIGHT_WRIST: (0.58, 0.40), PoseLandmark.LEFT_WRIST: (0.20, 0.50),
+               PoseLandmark.LEFT_ELBOW: (0.28, 0.48)},
+    "temple": {PoseLandmark.RIGHT_WRIST: (0.60, 0.29), PoseLandmark.RIGHT_ELBOW: (0.70, 0.40)},
+    "one_hand_face": {PoseLandmark.RIGHT_WRIST: (0.52, 0.20), PoseLandmark.RIGHT_ELBOW: (0.60, 0.35)},
+    "wave": {PoseLandmark.RIGHT_WRIST: (0.78, 0.22), PoseLandmark.RIGHT_ELBOW: (0.74, 0.38)},
+    "arms_crossed": {PoseLandmark.LEFT_WRIST: (0.58, 0.55), PoseLandmark.RIGHT_WRIST: (0.42, 0.55)},
+    "hands_on_hips": {PoseLandmark.LEFT_WRIST: (0.40, 0.78), PoseLandmark.RIGHT_WRIST: (0.60, 0.78),
+                      PoseLandmark.LEFT_ELBOW: (0.28, 0.65), PoseLandmark.RIGHT_ELBOW: (0.72, 0.65)},
+}
+
+# Finger -> (MCP landmark, x offset) in hand units relative to the wrist; MCP joints sit at y = -0.4.
+# A shape lists how far each extended finger reaches; fingers it leaves out are curled.
+_FINGERS = {
+    "index": (HandLandmark.INDEX_FINGER_MCP, -0.15),
+    "middle": (HandLandmark.MIDDLE_FINGER_MCP, -0.05),
+    "ring": (HandLandmark.RING_FINGER_MCP, 0.05),
+    "pinky": (HandLandmark.PINKY_MCP, 0.15),
+}
+HAND_SHAPES = {
+    "v_sign": {"index": 0.9, "middle": 0.9, "spread": 0.2},
+    "middle_up": {"middle": 0.95},
+    "open_palm": {"index": 0.9, "middle": 0.95, "ring": 0.9, "pinky": 0.8, "thumb": True},
+    "fist": {},
+    "point": {"index": 0.9, "thumb": True},
+}
+
+# label -> (pose, hand shape or None)
+SCENES = {
+    "hands_up": ("hands_up", None),
+    "hands_on_head": ("hands_on_head", None),
+    "violin_gesture": ("violin", None),
+    "peace_out": ("one_hand_face", "v_sign"),
+    "middle_finger": ("neutral", "middle_up"),
+    "shot_in_head": ("temple", "point"),
+}
+NEGATIVE_SCENES = {
+    "neutral": ("neutral", None),
+    "open_palm": ("one_hand_face", "open_palm"),
+    "fist": ("neutral", "fist"),
+    "wave": ("wave", "open_palm"),
+    "arms_crossed": ("arms_crossed", None),
+    "hands_on_hips": ("hands_on_hips", None),
+}
+
+
+def _pose_rows(name: str, rng: random.Random, jitter: float) -> list:
+    points = {**NEUTRAL_POSE, **POSES[name]}
+    rows = []
+    for landmark in PoseLandmark:
+        x, y = points[landmark]
+        rows.append([round(x + rng.gauss(0, jitter), 4), round(y + rng.gauss(0, jitter), 4), 0.0,
+                     round(rng.uniform(0.6, 1.0), 3)])
+    return rows
+
+
+def _hand_rows(shape: str, center_x: float, center_y: float, rng: random.Random, jitter: float,
+               size: float = 0.15) -> list:
+    spec = HAND_SHAPES[shape]
+    spread = spec.get("spread", 0.0)
+    points = [(0.0, 0.0)] * len(HandLandmark)
+    # Thumb: out to the side when extended, folded across the palm otherwise
+    thumb = [(-0.2, -0.1), (-0.3, -0.2), (-0.38, -0.3), (-0.45, -0.38)] if spec.get("thumb") else \
+        [(-0.2, -0.1), (-0.25, -0.2), (-0.15, -0.3), (-0.05, -0.32)]
+    points[HandLandmark.THUMB_CMC:HandLandmark.THUMB_TIP + 1] = thumb
+    for finger, (mcp, x) in _FINGERS.items():
+        reach = spec.get(finger)
+        tilt = -spread if finger == "index" else spread if finger == "middle" else 0.0
+        if reach:
+            joints = [(x, -0.4), (x + tilt * 0.4, -0.4 - reach * 0.3), (x + tilt * 0.7, -0.4 - reach * 0.5),
+                      (x + tilt, -0.4 - reach * 0.65)]
+        else:
+            joints = [(x, -0.4), (x, -0.5), (x, -0.42), (x, -0.34)]
+        points[mcp:mcp + 4] = joints
+
+    return [[round(center_x + px * size + rng.gauss(0, jitter), 4),
+             round(center_y + py * size + rng.gauss(0, jitter), 4), 0.0] for px, py in points]
+
+
+def synthetic_fixtures(samples: int = 50, jitter: float = 0.01, seed: int = 1) -> List[Fixture]:
+    """Jittered copies of a template scene per gesture plus gesture-free negatives."""
+    rng = random.Random(seed)
+    fixtures = []
+    scenes = [(label, label, scene) for label, scene in SCENES.items()]
+    scenes += [(name, None, scene) for name, scene in NEGATIVE_SCENES.items()]
+    for name, label, (pose_name, hand_shape) in scenes:
+        for i in range(samples):
+            pose = _pose_rows(pose_name, rng, jitter)
+            hands = None
+            if hand_shape:
+                wrist = PoseLandmark.RIGHT_WRIST
+                hands = [_hand_rows(hand_shape, pose[wrist][0], pose[wrist][1], rng, jitter / 2)]
+            fixtures.append(Fixture(f"{name}#{i}", label, pose, hands))
+    return fixtures
+
+
+# --- Recorded fixtures -----------------------------------------------------
+
+def results_to_fixture(name: str, label: Optional[str], results: dict) -> Fixture:
+    """Convert MediaPipe results (EmoteDetector.process_rgb) into a fixture."""
+    pose = None
+    if results["pose"].pose_landmarks:
+        pose = [[round(lm.x, 4), round(lm.y, 4), round(lm.z, 4), round(lm.visibility, 3)]
+                for lm in results["pose"].pose_landmarks.landmark]
+    hands = None
+    if results["hands"].multi_hand_landmarks:
+        hands = [[[round(lm.x, 4), round(lm.y, 4), round(lm.z, 4)] for lm in hand.landmark]
+                 for hand in results["hands"].multi_hand_landmarks]
+    return Fixture(name, label, pose, hands)
+
+
+def record_fixtures(video_path: str, label: Optional[str], every: int = 5) -> List[Fixture]:
+    """Run MediaPipe over a recording of one gesture and keep every n-th frame. Needs mediapipe."""
+    import cv2
+
+    detector = EmoteDetector({})
+    detector.debug_mode = False
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise OSError(f"Cannot open {video_path}")
+    fixtures = []
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                frame = cv2.flip(frame, 1)  # Same mirroring as the live capture stage
+                fixtures.append(results_to_fixture(f"{stem}@{index}", label, detector.process_frame(frame)))
+            index += 1
+    finally:
+        cap.release()
+    return fixtures
+
+
+def load_fixtures(path: str) -> List[Fixture]:
+    with open(path) as f:
+        data = json.load(f)
+    return [Fixture.from_dict(item) for item in data["fixtures"]]
+
+
+def save_fixtures(path: str, fixtures: Sequence[Fixture]):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"version": FIXTURE_VERSION, "fixtures": [fixture.to_dict() for fixture in fixtures]}, f)
+
+
+# --- Measurement -----------------------------------------------------------
+
+def rules_detector(hold_time: float = 0.8) -> EmoteDetector:
+    detector = EmoteDetector({}, hold_time=hold_time, load_models=False)
+    detector.debug_mode = False  # Rules print on every hit otherwise
+    return detector
+
+
+def evaluate(detector: EmoteDetector, fixtures: Sequence[Fixture], gestures: Sequence[str]) -> dict:
+    """Per-gesture precision/recall of each rule in isolation, plus first-match accuracy.
+
+    A rule is scored on every fixture: a hit on a fixture labeled with another
+    gesture (or none) is a false positive. First-match accuracy replays the
+    live behaviour, where the first gesture in config order that matches wins.
+    """
+    results = [fixture.results() for fixture in fixtures]
+    scores = {}
+    for gesture in gestures:
+        rule = getattr(detector, GESTURE_RULES[gesture])
+        tp = fp = fn = 0
+        for fixture, result in zip(fixtures, results):
+            hit = bool(rule(result))
+            expected = fixture.label == gesture
+            tp += hit and expected
+            fp += hit and not expected
+            fn += expected and not hit
+        scores[gesture] = {
+            "support": tp + fn,
+            "tp": tp, "fp": fp, "fn": fn,
+            "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+            "recall": round(tp / (tp + fn), 3) if tp + fn else None,
+        }
+
+    correct = 0
+    confusion: Dict[str, Dict[str, int]] = {}
+    for fixture, result in zip(fixtures, results):
+        predicted = next((g for g in gestures if detector._check_gesture(g, result)), None)
+        correct += predicted == fixture.label
+        row = confusion.setdefault(str(fixture.label), {})
+        row[str(predicted)] = row.get(str(predicted), 0) + 1
+    return {"gestures": scores, "first_match_accuracy": round(correct / max(len(fixtures), 1), 3),
+            "confusion": confusion}
+
+
+def time_rule(func, results: Sequence[dict], repeat: int = 7) -> dict:
+    """ns/call of func over the fixture results.
+
+    Each measurement is one pass over all results, looped enough times to take
+    at least 0.2s (timeit.autorange), repeated `repeat` times with the GC
+    disabled. The median is the figure to compare; the spread between the
+    quartiles says how much to trust it.
+    """
+    def one_pass():
+        for result in results:
+            func(result)
+
+    timer = timeit.Timer(one_pass)
+    number, _ = timer.autorange()
+    samples = sorted(t / (number * len(results)) * 1e9 for t in timer.repeat(repeat, number))
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return {
+        "median_ns": round(statistics.median(samples), 1),
+        "min_ns": round(samples[0], 1),
+        "iqr_ns": round(quartiles[2] - quartiles[0], 1),
+        "calls": number * len(results) * repeat,
+    }
+
+
+def run(fixtures: Sequence[Fixture], gestures: Optional[Sequence[str]] = None, repeat: int = 7) -> dict:
+    """Accuracy and timing for each rule, plus the cost of one frame through all rules."""
+    gestures = list(gestures or GESTURE_RULES)
+    detector = rules_detector()
+    report = evaluate(detector, fixtures, gestures)
+    results = [fixture.results() for fixture in fixtures]
+    for gesture in gestures:
+        report["gestures"][gesture]["timing"] = time_rule(getattr(detector, GESTURE_RULES[gesture]), results,
+                                                          repeat)
+
+    def all_rules(result):
+        for gesture in gestures:
+            if detector._check_gesture(gesture, result):
+                return gesture
+
+    report["all_rules"] = time_rule(all_rules, results, repeat)
+    report["fixtures"] = len(fixtures)
+    return report
+
+
+def format_report(report: dict) -> str:
+    def pct(value):
+        return f"{value * 100:5.1f}%" if value is not None else "    - "
+
+    lines = [f"{'gesture':<16} {'support':>7} {'precision':>9} {'recall':>7} {'ns/call':>9} {'iqr':>7}"]
+    for gesture, score in report["gestures"].items():
+        timing = score["timing"]
+        lines.append(f"{gesture:<16} {score['support']:>7} {pct(score['precision']):>9} {pct(score['recall']):>7} "
+                     f"{timing['median_ns']:>9.0f} {timing['iqr_ns']:>7.0f}")
+    lines.append(f"{'all rules':<16} {report['fixtures']:>7} {'':>9} {'':>7} "
+                 f"{report['all_rules']['median_ns']:>9.0f} {report['all_rules']['iqr_ns']:>7.0f}")
+    lines.append(f"first-match accuracy: {pct(report['first_match_accuracy']).strip()}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m modules.gesture_bench",
+                                     description="Time and score the gesture rules on landmark fixtures")
+    parser.add_argument("--fixtures", nargs="+", metavar="FILE", help="Recorded fixture files (default: synthetic)")
+    parser.add_argument("--samples", type=int, default=50, help="Synthetic fixtures per scene")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Synthetic landmark noise (normalized units)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gestures", nargs="+", choices=list(GESTURE_RULES), help="Rules to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing repetitions per rule")
+    parser.add_argument("--json", metavar="FILE", help="Also write the full report as JSON")
+    parser.add_argument("--record", metavar="VIDEO", help="Record fixtures from a video instead (needs mediapipe)")
+    parser.add_argument("--label", help="Expected gesture of the recorded video (omit for none)")
+    parser.add_argument("--every", type=int, default=5, help="Record every n-th frame")
+    parser.add_argument("--out", default="fixtures/gestures.json", help="Where --record writes fixtures")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        fixtures = record_fixtures(args.record, args.label, args.every)
+        save_fixtures(args.out, fixtures)
+        print(f"{len(fixtures)} fixtures written to {args.out}")
+        return 0
+
+    if args.fixtures:
+        fixtures = [fixture for path in args.fixtures for fixture in load_fixtures(path)]
+    else:
+        fixtures = synthetic_fixtures(args.samples, args.jitter, args.seed)
+    report = run(fixtures, args.gestures, args.repeat)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import queue
+import re
+import threading
+import time
+import logging
+import logging.handlers
+from typing import Dict, List, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Compiled once: the Windows console and some log viewers choke on emoji
+EMOJI_PATTERN = re.compile("["
+                           u"\U0001F600-\U0001F64F"  # emoticons
+                           u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+                           u"\U0001F680-\U0001F6FF"  # transport & map symbols
+                           u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+                           u"\U00002702-\U000027B0"  # dingbats
+                           u"\U000024C2-\U0001F251"  # other symbols
+                           u"\U0001F900-\U0001F9FF"  # supplemental symbols
+                           "]+", flags=re.UNICODE)
+
+
+class NoEmojiFormatter(logging.Formatter):
+    """Strips emoji from every message before formatting it."""
+
+    def format(self, record):
+        record.msg = EMOJI_PATTERN.sub('', str(record.getMessage())).strip()
+        record.args = None
+        return super().format(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `burst` records per call site through every `period` seconds.
+
+    A call site is the (file, line) of the logging call, so an f-string message
+    logged from a per-frame path ("Error sending frame: ...") is limited as one
+    source no matter how its text varies. The first record after a suppressed
+    stretch says how many were dropped. Runs in the logging thread before the
+    record is queued, so suppressed records cost a dict lookup.
+    """
+
+    def __init__(self, burst: int = 10, period: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._sites: Dict[Tuple[str, int], list] = {}  # site -> [window start, passed, suppressed]
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        now = time.monotonic()
+        site = self._sites.get((record.pathname, record.lineno))
+        if site is None:
+            self._sites[(record.pathname, record.lineno)] = [now, 1, 0]
+            return True
+        if now - site[0] >= self.period:
+            suppressed = site[2]
+            site[0], site[1], site[2] = now, 1, 0
+            if suppressed:
+                record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+                record.args = None
+            return True
+        if site[1] < self.burst:
+            site[1] += 1
+            return True
+        site[2] += 1
+        self.suppressed += 1
+        return False
+
+
+class QueueLogging:
+    """Root logging through a queue: callers only enqueue, a listener thread writes.
+
+    File and console writes (and emoji stripping) happen on the listener
+    thread, so a slow disk or terminal never stalls the frame loop or the
+    output thread. Repeated records from one call site are rate limited before
+    they are queued.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], level: int = logging.INFO,
+                 burst: int = 10, period: float = 10.0):
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.rate_limit = RateLimitFilter(burst, period)
+        self.handler = logging.handlers.QueueHandler(self.queue)
+        self.handler.addFilter(self.rate_limit)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.level = level
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Route the root logger through the queue (replacing its handlers) and start the listener."""
+        with self._lock:
+            if self._started:
+                return
+            root_logger = logging.getLogger()
+            root_logger.setLevel(self.level)
+            for handler in root_logger.handlers[:]:
+                root_logger.removeHandler(handler)
+                handler.close()
+            root_logger.addHandler(self.handler)
+            self.listener.start()
+            self._started = True
+
+    def stop(self):
+        """Write out everything still queued and detach the queue.
+
+        The handlers are attached to the root logger directly afterwards, so
+        records logged during shutdown are still written (synchronously).
+        """
+        with self._lock:
+            if not self._started:
+                return
+            self.listener.stop()
+            root_logger = logging.getLogger()
+            root_logger.removeHandler(self.handler)
+            for handler in self.listener.handlers:
+                root_logger.addHandler(handler)
+            self._started = False
+
+    def get_stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "suppressed": self.rate_limit.suppressed}
+
+
+def setup_queue_logging(log_file: Optional[str] = None, level: int = logging.INFO, burst: int = 10,
+                        period: float = 10.0, stream=None) -> QueueLogging:
+    """File (if given) and console logging behind a queue, emoji stripped. Returns the started QueueLogging."""
+    handlers: List[logging.Handler] = []
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(NoEmojiFormatter(LOG_FORMAT))
+        handlers.append(file_handler)
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setFormatter(NoEmojiFormatter(LOG_FORMAT))
+    handlers.append(console_handler)
+
+    logs = QueueLogging(handlers, level, burst, period)
+    logs.start()
+    return logs
@@ -0,0 +1,243 @@
+import dis
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import logging
+import types
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from modules.metrics import process_stats
+
+# Allocations made by the profiler itself or the import machinery are not the app's
+_IGNORED = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>",
+            "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+class MemoryProfiler:
+    """Memory instrumentation for soak runs: tracemalloc snapshots plus RSS samples.
+
+    Every interval a snapshot is taken on a background thread and each trace is
+    attributed to a pipeline stage: the innermost traceback frame inside code
+    registered with add_stage() (functions, methods or whole modules) decides.
+    Per stage it reports the bytes retained, growth since the first snapshot
+    and churn since the previous one (the sum of absolute per-site changes,
+    i.e. memory freed and allocated again between snapshots). Clip plays are
+    bracketed with clip_started()/clip_finished(), so traced memory a clip
+    leaves behind is charged to its emote.
+
+    A warning is logged when RSS or traced memory grows by more than
+    growth_threshold_mb within window seconds, and a top-N report is rewritten
+    on every sample. tracemalloc slows every allocation down, so this is a
+    diagnostics mode and off by default.
+    """
+
+    def __init__(self, report_path: str = "logs/memory.txt", interval: float = 60.0, window: float = 600.0,
+                 growth_threshold_mb: float = 50.0, top: int = 25, frames: int = 16,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.report_path = report_path
+        self.interval = interval
+        self.window = window
+        self.growth_threshold = growth_threshold_mb * 2**20
+        self.top = top
+        self.frames = frames
+
+        self._files: Dict[str, str] = {}
+        self._ranges: Dict[str, List[Tuple[int, int, str]]] = {}
+        self._frame_stages: Dict[Tuple[str, int], Optional[str]] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._samples: deque = deque()  # (monotonic time, rss bytes, traced bytes)
+        self._clip_marks: Dict[str, int] = {}
+        self._started_tracing = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_warning = 0.0
+
+        self.started_at: Optional[float] = None
+        self.samples_taken = 0
+        self.warnings = 0
+        self.stages: Dict[str, dict] = {}
+        self.clips: Dict[str, dict] = {}
+        self.top_sites: List[tracemalloc.StatisticDiff] = []
+        self.last: dict = {}
+
+    def add_stage(self, stage: str, *targets):
+        """Charge allocations made in the given functions, methods, modules or module names to stage."""
+        for target in targets:
+            if isinstance(target, str):
+                target = sys.modules[target]
+            if isinstance(target, types.ModuleType):
+                self._files[target.__file__] = stage
+                continue
+            code = getattr(target, "__func__", target).__code__
+            lines = [line for _, line in dis.findlinestarts(code) if line] + [code.co_firstlineno]
+            self._ranges.setdefault(code.co_filename, []).append((min(lines), max(lines), stage))
+        self._frame_stages.clear()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self.started_at = time.monotonic()
+        directory = os.path.dirname(self.report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MemoryProfiler", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Memory profiling on (tracemalloc, {self.frames} frames), report: {self.report_path}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5.0)
+            self._thread = None
+        if tracemalloc.is_tracing():
+            self.sample()  # Final report
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _run(self):
+        self.sample()  # Baseline
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def clip_started(self, emote: str):
+        if tracemalloc.is_tracing():
+            self._clip_marks[emote] = tracemalloc.get_traced_memory()[0]
+
+    def clip_finished(self, emote: str):
+        """Charge the traced memory left over since clip_started() to the emote."""
+        mark = self._clip_marks.pop(emote, None)
+        if mark is None or not tracemalloc.is_tracing():
+            return
+        clip = self.clips.setdefault(emote, {"plays": 0, "retained_bytes": 0})
+        clip["plays"] += 1
+        clip["retained_bytes"] += tracemalloc.get_traced_memory()[0] - mark
+
+    def _stage_of(self, traceback: tracemalloc.Traceback) -> str:
+        # Frames run oldest to most recent; the innermost registered one wins
+        for frame in reversed(traceback):
+            key = (frame.filename, frame.lineno)
+            stage = self._frame_stages.get(key, "")
+            if stage == "":
+                stage = self._files.get(frame.filename)
+                for first, last, range_stage in self._ranges.get(frame.filename, ()):
+                    if first <= frame.lineno <= last:
+                        stage = range_stage
+                self._frame_stages[key] = stage
+            if stage:
+                return stage
+        return "other"
+
+    def sample(self):
+        """Take a snapshot, update the per-stage figures, check growth and rewrite the report."""
+        try:
+            now = time.monotonic()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, pattern) for pattern in _IGNORED])
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            rss = process_stats()["rss_bytes"]
+
+            stages: Dict[str, dict] = {}
+
+            def stage_of(traceback) -> dict:
+                name = self._stage_of(traceback)
+                if name not in stages:
+                    stages[name] = {"retained_bytes": 0, "blocks": 0, "growth_bytes": 0, "churn_bytes": 0}
+                return stages[name]
+
+            for stat in snapshot.statistics("traceback"):
+                stage = stage_of(stat.traceback)
+                stage["retained_bytes"] += stat.size
+                stage["blocks"] += stat.count
+            if self._baseline is None:
+                self._baseline = snapshot
+            else:
+                for diff in snapshot.compare_to(self._baseline, "traceback"):
+                    stage_of(diff.traceback)["growth_bytes"] += diff.size_diff
+                for diff in snapshot.compare_to(self._previous, "traceback"):
+                    stage_of(diff.traceback)["churn_bytes"] += abs(diff.size_diff)
+                self.top_sites = [diff for diff in snapshot.compare_to(self._baseline, "lineno")[:self.top]
+                                  if diff.size_diff]
+            self._previous = snapshot
+            self.stages = stages
+            self.samples_taken += 1
+
+            self._samples.append((now, rss, traced))
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            _, rss_start, traced_start = self._samples[0]
+            self.last = {"rss_bytes": rss, "traced_bytes": traced, "traced_peak_bytes": traced_peak,
+                         "rss_growth_bytes": rss - rss_start, "traced_growth_bytes": traced - traced_start}
+            self._check_growth(now)
+            self.write_report()
+        except Exception as e:
+            self.logger.error(f"Memory sample failed: {e}")
+
+    def _check_growth(self, now: float):
+        growth = max(self.last["rss_growth_bytes"], self.last["traced_growth_bytes"])
+        # One warning per window, so a steady leak does not flood the log
+        if growth <= self.growth_threshold or now - self._last_warning < self.window:
+            return
+        self._last_warning = now
+        self.warnings += 1
+        culprit = max(self.stages.items(), key=lambda item: item[1]["growth_bytes"], default=(None, None))[0]
+        self.logger.warning(
+            f"Memory grew {growth / 2**20:.1f} MB in the last {self.window:.0f}s "
+            f"(RSS {self.last['rss_bytes'] / 2**20:.0f} MB); most growth since start: {culprit}. "
+            f"See {self.report_path}")
+
+    def write_report(self):
+        elapsed = time.monotonic() - (self.started_at or time.monotonic())
+        last = self.last
+        lines = [
+            f"EmoteStream memory report, {time.strftime('%Y-%m-%d %H:%M:%S')} "
+            f"(sample {self.samples_taken}, {elapsed / 60:.1f} min)",
+            f"RSS {last['rss_bytes'] / 2**20:.1f} MB ({last['rss_growth_bytes'] / 2**20:+.1f} MB in window), "
+            f"traced {last['traced_bytes'] / 2**20:.1f} MB ({last['traced_growth_bytes'] / 2**20:+.1f} MB in window, "
+            f"peak {last['traced_peak_bytes'] / 2**20:.1f} MB)",
+            "",
+            f"{'stage':<12} {'retained KB':>12} {'blocks':>9} {'growth KB':>11} {'churn KB':>10}",
+        ]
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["growth_bytes"]):
+            lines.append(f"{name:<12} {stage['retained_bytes'] / 1024:>12.1f} {stage['blocks']:>9} "
+                         f"{stage['growth_bytes'] / 1024:>+11.1f} {stage['churn_bytes'] / 1024:>10.1f}")
+        if self.clips:
+            lines += ["", f"{'clip':<20} {'plays':>6} {'retained KB':>12} {'KB/play':>9}"]
+            for name, clip in sorted(self.clips.items(), key=lambda item: -item[1]["retained_bytes"]):
+                lines.append(f"{name:<20} {clip['plays']:>6} {clip['retained_bytes'] / 1024:>+12.1f} "
+                             f"{clip['retained_bytes'] / 1024 / clip['plays']:>+9.1f}")
+        if self.top_sites:
+            lines += ["", f"Top {len(self.top_sites)} allocation sites by growth since the first sample:"]
+            for diff in self.top_sites:
+                frame = diff.traceback[-1]
+                lines.append(f"{diff.size_diff / 1024:>+10.1f} KB {diff.count_diff:>+7} blocks  "
+                             f"{frame.filename}:{frame.lineno}")
+
+        temp_path = f"{self.report_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.report_path)
+
+    def get_stats(self) -> dict:
+        last = self.last
+        return {
+            "samples": self.samples_taken,
+            "warnings": self.warnings,
+            "rss_mb": round(last.get("rss_bytes", 0) / 2**20, 1),
+            "traced_mb": round(last.get("traced_bytes", 0) / 2**20, 1),
+            "rss_growth_mb": round(last.get("rss_growth_bytes", 0) / 2**20, 1),
+            "traced_growth_mb": round(last.get("traced_growth_bytes", 0) / 2**20, 1),
+            "stages": {name: {"retained_kb": round(stage["retained_bytes"] / 1024, 1),
+                              "growth_kb": round(stage["growth_bytes"] / 1024, 1),
+                              "churn_kb": round(stage["churn_bytes"] / 1024, 1)}
+                       for name, stage in list(self.stages.items())},
+            "clips": {name: {"plays": clip["plays"], "retained_kb": round(clip["retained_bytes"] / 1024, 1)}
+                      for name, clip in list(self.clips.items())},
+        }
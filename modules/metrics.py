@@ -0,0 +1,323 @@
+import json
+import os
+import sys
+import threading
+import time
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bucket upper bounds in seconds: 50 us to ~10 s, each 20% wider than the last
+BUCKET_BOUNDS: List[float] = []
+_bound = 50e-6
+while _bound < 10.0:
+    BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.2
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram over a rolling time window.
+
+    The window is split into slices; recording touches one counter in the
+    current slice and slices older than the window are recycled, so memory and
+    cost per sample are constant. Percentiles are bucket upper bounds (about 20%
+    resolution), which is plenty to spot a regression. Meant to be written from
+    one thread; readers on other threads may see a sample late.
+    """
+
+    def __init__(self, window: float = 10.0, slices: int = 10):
+        self.window = window
+        self.slices = slices
+        self.slice_length = window / slices
+        self._counts = [[0] * (len(BUCKET_BOUNDS) + 1) for _ in range(slices)]
+        self._max = [0.0] * slices
+        self._slice_ids = [-1] * slices
+        self._lifetime = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.lifetime_max = 0.0
+
+    def record(self, seconds: float, now: Optional[float] = None):
+        slice_id = int((now if now is not None else time.monotonic()) / self.slice_length)
+        slot = slice_id % self.slices
+        if self._slice_ids[slot] != slice_id:
+            self._counts[slot] = [0] * (len(BUCKET_BOUNDS) + 1)
+            self._max[slot] = 0.0
+            self._slice_ids[slot] = slice_id
+
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        self._counts[slot][index] += 1
+        self._lifetime[index] += 1
+        if seconds > self._max[slot]:
+            self._max[slot] = seconds
+        self.total_count += 1
+        self.total_sum += seconds
+        if seconds > self.lifetime_max:
+            self.lifetime_max = seconds
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        """count, p50/p95/p99 and max in milliseconds over the rolling window."""
+        current = int((now if now is not None else time.monotonic()) / self.slice_length)
+        counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        window_max = 0.0
+        for slot in range(self.slices):
+            if current - self.slices < self._slice_ids[slot] <= current:
+                for i, c in enumerate(self._counts[slot]):
+                    counts[i] += c
+                window_max = max(window_max, self._max[slot])
+
+        return self._summary(counts, window_max)
+
+    def lifetime_snapshot(self) -> dict:
+        """Same as snapshot() but over every sample since creation (for batch runs)."""
+        return self._summary(list(self._lifetime), self.lifetime_max)
+
+    def _summary(self, counts: List[int], max_seconds: float) -> dict:
+        total = sum(counts)
+        result = {"count": total, "max_ms": round(max_seconds * 1000, 3)}
+        for name, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            result[name] = round(self._percentile(counts, total, q, max_seconds) * 1000, 3)
+        return result
+
+    def cumulative_buckets(self, step: int = 4) -> List[Tuple[float, int]]:
+        """Lifetime (upper bound, cumulative count) for every step-th bucket, ending with +Inf.
+
+        With step=4 the bounds double from one to the next, which keeps an
+        exported histogram small while the counts stay exact.
+        """
+        counts = list(self._lifetime)
+        result = []
+        running = 0
+        for i, bound in enumerate(BUCKET_BOUNDS):
+            running += counts[i]
+            if i % step == step - 1:
+                result.append((bound, running))
+        result.append((float("inf"), running + counts[-1]))
+        return result
+
+    @staticmethod
+    def _percentile(counts: List[int], total: int, q: float, window_max: float) -> float:
+        if total == 0:
+            return 0.0
+        target = q * total
+        cumulative = 0
+        for i, c in enumerate(counts):
+            cumulative += c
+            if cumulative >= target:
+                # The overflow bucket and the top occupied bucket are capped by the real max
+                bound = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else window_max
+                return min(bound, window_max)
+        return window_max
+
+
+class RateMeter:
+    """Exponentially weighted moving average of an event rate (e.g. output fps)."""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self._last: Optional[float] = None
+        self._interval: Optional[float] = None
+
+    def tick(self, now: Optional[float] = None):
+        now = now if now is not None else time.monotonic()
+        if self._last is not None:
+            dt = now - self._last
+            self._interval = dt if self._interval is None else self.alpha * dt + (1 - self.alpha) * self._interval
+        self._last = now
+
+    @property
+    def rate(self) -> float:
+        if not self._interval:
+            return 0.0
+        # Decay towards zero when ticks stop arriving
+        idle = time.monotonic() - self._last
+        return 1.0 / max(self._interval, idle)
+
+
+class MetricsRegistry:
+    """Named latency histograms and rate meters shared by the pipeline stages.
+
+    With a tracer attached (see modules.tracing), span() also records each
+    timed block on the timeline.
+    """
+
+    def __init__(self, window: float = 10.0, tracer=None):
+        self.window = window
+        self.tracer = tracer
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.rates: Dict[str, RateMeter] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram(self.window))
+        return histogram
+
+    def record(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    def span(self, name: str, start: float, end: Optional[float] = None):
+        """Record a block timed with perf_counter from start to end (default: now)."""
+        if end is None:
+            end = time.perf_counter()
+        self.histogram(name).record(end - start)
+        if self.tracer is not None:
+            self.tracer.add(name, start, end)
+
+    def rate(self, name: str) -> RateMeter:
+        meter = self.rates.get(name)
+        if meter is None:
+            with self._lock:
+                meter = self.rates.setdefault(name, RateMeter())
+        return meter
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "window_s": self.window,
+            "rates": {name: round(meter.rate, 2) for name, meter in list(self.rates.items())},
+            "latency": {name: h.snapshot(now) for name, h in list(self.histograms.items())},
+        }
+
+
+def process_stats() -> dict:
+    """CPU time, current and peak resident memory and thread count of this process.
+
+    Read from /proc on Linux; elsewhere falls back to what the resource module
+    offers (peak instead of current RSS) or to zeros.
+    """
+    stats = {"cpu_seconds": 0.0, "rss_bytes": 0, "peak_rss_bytes": 0, "threads": threading.active_count()}
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name, which may itself contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        stats["cpu_seconds"] = (int(fields[11]) + int(fields[12])) / ticks
+        stats["threads"] = int(fields[17])
+        stats["rss_bytes"] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    stats["peak_rss_bytes"] = int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            stats["cpu_seconds"] = usage.ru_utime + usage.ru_stime
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            stats["rss_bytes"] = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+            stats["peak_rss_bytes"] = stats["rss_bytes"]
+        except ImportError:
+            pass
+    return stats
+
+
+class TriggerLatencyTracker:
+    """Per-emote breakdown of gesture-to-glass latency.
+
+    Each trigger carries monotonic timestamps collected along the way: onset
+    (capture time of the first frame showing the gesture), held (capture time
+    of the frame that satisfied the hold), detected (rules finished), started
+    (clip opened on the frame thread) and sent (first clip frame delivered by
+    the output pacer). record() turns them into segments and keeps one
+    histogram per emote and segment; timestamps a trigger lacks (e.g. onset for
+    a control API trigger) just skip the segments that need them.
+    """
+
+    SEGMENTS = {
+        "hold": ("onset", "held"),
+        "detect": ("held", "detected"),
+        "schedule": ("detected", "started"),
+        "first_frame": ("started", "sent"),
+        "reaction": ("held", "sent"),
+        "total": ("onset", "sent"),
+    }
+
+    def __init__(self, window: float = 3600.0):
+        # Triggers are rare, so the window is much longer than the per-frame one
+        self.window = window
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.last: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def breakdown(self, timing: dict) -> Dict[str, float]:
+        """Segment durations in seconds for the timestamps present."""
+        result = {}
+        for segment, (begin, end) in self.SEGMENTS.items():
+            if timing.get(begin) is not None and timing.get(end) is not None:
+                result[segment] = max(timing[end] - timing[begin], 0.0)
+        return result
+
+    def record(self, emote: str, timing: dict) -> Dict[str, float]:
+        segments = self.breakdown(timing)
+        histograms = self.histograms.get(emote)
+        if histograms is None:
+            with self._lock:
+                histograms = self.histograms.setdefault(emote, {
+                    segment: LatencyHistogram(self.window, slices=60) for segment in self.SEGMENTS})
+        for segment, seconds in segments.items():
+            histograms[segment].record(seconds)
+        self.last[emote] = {segment: round(seconds * 1000, 1) for segment, seconds in segments.items()}
+        return segments
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "window_s": self.window,
+            "emotes": {
+                emote: {
+                    "segments": {segment: h.snapshot(now) for segment, h in histograms.items()
+                                 if h.total_count},
+                    "last_ms": self.last.get(emote, {}),
+                }
+                for emote, histograms in list(self.histograms.items())
+            },
+        }
+
+
+class MetricsExporter:
+    """Periodically writes a stats snapshot to a JSON file (atomically replaced)."""
+
+    def __init__(self, path: str, snapshot: Callable[[], dict], interval: float = 10.0,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = path
+        self.snapshot = snapshot
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+        self.write()  # Final snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            data = self.snapshot()
+            data["timestamp"] = time.time()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=2, default=str)
+            os.replace(temp_path, self.path)
+            self.writes += 1
+        except Exception as e:
+            self.logger.error(f"Metrics export failed: {e}")
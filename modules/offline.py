@@ -0,0 +1,235 @@
+import json
+import multiprocessing
+import os
+import time
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import yaml
+
+from modules.detector import EmoteDetector
+from modules.scheduler import TriggerScheduler
+
+
+def load_emotes(config_path: str) -> Dict[str, dict]:
+    """Emotes with a gesture from emotes.yaml, each with its clip duration (0 if the clip can't be read).
+
+    Clips don't have to exist: offline analysis only needs the gestures, the
+    duration just lets the scheduler model a clip being busy.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    emotes = {}
+    for name, data in config.items():
+        if not isinstance(data, dict) or not data.get("gesture", {}).get("type"):
+            continue
+        emote = dict(data)
+        emote["duration"] = _clip_duration(emote.get("video_path"))
+        emotes[name] = emote
+    return emotes
+
+
+def _clip_duration(path: Optional[str]) -> float:
+    if not path or not Path(path).exists():
+        return 0.0
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+        return frames / fps if fps > 0 else 0.0
+    finally:
+        cap.release()
+
+
+class TimelineWriter:
+    """JSON lines, one event per line, written as they happen."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+        self.events = 0
+
+    def write(self, event: str, t: Optional[float] = None, **fields):
+        record = {"event": event}
+        if t is not None:
+            record["t"] = round(t, 3)
+        record.update(fields)
+        self._file.write(json.dumps(record) + "\n")
+        self.events += 1
+
+    def close(self):
+        self._file.close()
+
+
+def analyze_file(path: str, output: str, emotes: Dict[str, dict], hold_time: float = 1.0,
+                 cooldown_time: float = 2.0, policy: str = "preempt", max_queue: int = 2, stride: int = 1,
+                 mirror: bool = True, frame_events: bool = False) -> dict:
+    """Run the detector and scheduler over one video as fast as it decodes; write its timeline to output.
+
+    The clock is the frame timestamp, so hold times, cooldowns and clip
+    durations mean the same as live no matter how fast frames are processed.
+    Events: start, candidate (a gesture began), candidate_lost (it ended
+    before the hold was satisfied, with the progress reached as its score),
+    trigger (hold satisfied), clip (scheduler decisions: started, queued,
+    dropped, preempted, finished) and end. With frame_events every analysed
+    frame also gets a line with each gesture rule that matched it.
+    """
+    logger = logging.getLogger(__name__)
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"Cannot open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    detector = EmoteDetector(emotes, hold_time=hold_time)
+    detector.debug_mode = False
+    scheduler = TriggerScheduler(cooldown_time, policy, max_queue, logger=logger)
+    timeline = TimelineWriter(output)
+    timeline.write("start", input=path, fps=fps, frames=total_frames, hold_time=hold_time,
+                   cooldown_time=cooldown_time, policy=policy, stride=stride, emotes=sorted(emotes))
+    scheduler.subscribe(lambda event: timeline.write(
+        "clip", event["time"], action=event["event"],
+        **{key: value for key, value in event.items() if key not in ("event", "time")}))
+    gestures = sorted({emote["gesture"]["type"] for emote in emotes.values()})
+
+    started = time.perf_counter()
+    index = analysed = triggers = 0
+    t = last_t = 0.0
+    candidate, candidate_start, candidate_score = None, 0.0, 0.0
+    clip_ends = None
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # Frame timestamp from the container; index / fps when the backend has none
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if t <= last_t and index > 0:
+                t = index / fps if fps > 0 else last_t + 1 / 30
+            last_t = t
+            index += 1
+            if (index - 1) % stride:
+                continue
+            analysed += 1
+
+            if mirror:
+                frame = cv2.flip(frame, 1)
+            results = detector.process_frame(frame)
+            if frame_events:
+                timeline.write("frame", t, frame=index - 1,
+                               gestures=[g for g in gestures if detector._check_gesture(g, results)])
+            detected, status = detector.detect_emote_with_status(results, now=t)
+
+            # Candidates: a gesture being held, reported once when it starts and once when it ends
+            if detector.active_candidate != candidate and candidate and not detected:
+                timeline.write("candidate_lost", t, gesture=candidate, held=round(t - candidate_start, 3),
+                               score=round(candidate_score, 3))
+            if detector.active_candidate and detector.active_candidate != candidate:
+                candidate_start, candidate_score = t, 0.0
+                timeline.write("candidate", t, frame=index - 1, gesture=detector.active_candidate)
+            candidate = detector.active_candidate
+            if status:
+                candidate_score = max(candidate_score, status["progress"])
+
+            if detected:
+                triggers += 1
+                timing = detected.get("timing", {})
+                timeline.write("trigger", t, frame=index - 1, emote=detected["name"],
+                               gesture=detected["gesture"]["type"], onset=round(timing.get("onset", t), 3))
+                candidate = None
+                scheduler.submit(detected, t)
+
+            # The clip "plays" for its duration on the same clock
+            if clip_ends is not None and t >= clip_ends:
+                scheduler.finish(t)
+                clip_ends = None
+            emote = scheduler.step(t)
+            if emote:
+                clip_ends = t + emote.get("duration", 0.0)
+    finally:
+        cap.release()
+        elapsed = time.perf_counter() - started
+        summary = {
+            "input": path,
+            "output": output,
+            "frames": index,
+            "analysed": analysed,
+            "video_seconds": round(t, 3),
+            "seconds": round(elapsed, 3),
+            "speed": round(t / elapsed, 2) if elapsed > 0 else 0.0,
+            "triggers": triggers,
+            "clips": dict(scheduler.event_counts),
+        }
+        timeline.write("end", t, **{key: value for key, value in summary.items() if key not in ("input", "output")})
+        timeline.close()
+    return summary
+
+
+def _init_worker():
+    # One OpenCV thread per process: the pool already uses every core
+    cv2.setNumThreads(1)
+
+
+def timeline_paths(inputs: List[str], output_dir: str) -> List[str]:
+    """One distinct timeline file per input: <stem>.jsonl, qualified when stems collide.
+
+    Inputs sharing a stem (a/session.mp4 and b/session.mp4, x.mp4 and x.mkv)
+    get their directory and extension in the name, plus a counter if that
+    still collides, so no two workers ever write the same file.
+    """
+    stems = Counter(Path(path).stem for path in inputs)
+    used = set()
+    outputs = []
+    for path in inputs:
+        p = Path(path)
+        name = p.stem
+        if stems[p.stem] > 1:
+            name = "_".join(part for part in (p.parent.name, p.stem, p.suffix.lstrip(".")) if part)
+        base, n = name, 1
+        while name in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name)
+        outputs.append(os.path.join(output_dir, f"{name}.jsonl"))
+    return outputs
+
+
+def analyze_files(inputs: List[str], output_dir: str, emotes: Dict[str, dict], jobs: int = 1,
+                  on_done: Optional[Callable[[dict], None]] = None, **options) -> List[dict]:
+    """Analyse many videos, in a process pool when jobs > 1. Returns one summary per input."""
+    outputs = timeline_paths(inputs, output_dir)
+    summaries = []
+    if jobs <= 1 or len(inputs) == 1:
+        for path, output in zip(inputs, outputs):
+            summary = _safe_analyze(path, output, emotes, options)
+            summaries.append(summary)
+            if on_done:
+                on_done(summary)
+        return summaries
+
+    # spawn: MediaPipe and OpenCV hold threads and GPU/driver state that must not be forked
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker) as pool:
+        futures = [pool.submit(_safe_analyze, path, output, emotes, options)
+                   for path, output in zip(inputs, outputs)]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if on_done:
+                on_done(summary)
+    order = {output: i for i, output in enumerate(outputs)}
+    return sorted(summaries, key=lambda summary: order[summary["output"]])
+
+
+def _safe_analyze(path: str, output: str, emotes: Dict[str, dict], options: dict) -> dict:
+    try:
+        return analyze_file(path, output, emotes, **options)
+    except Exception as e:
+        return {"input": path, "output": output, "error": str(e)}
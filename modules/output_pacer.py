@@ -0,0 +1,156 @@
+import threading
+import time
+import logging
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class OutputPacer:
+    """Emits composed frames to the outputs at a fixed rate from a dedicated thread.
+
+    Producers hand in composed frames with submit(), which never blocks. The pacer
+    thread wakes once per output frame and passes the latest submitted frame, or
+    the previous one again when nothing new arrived, to the output (a SinkFanout),
+    so a stall upstream shows up as repeated frames instead of a frozen camera.
+    Frames are immutable once submitted, because sinks on other threads share them.
+
+    A frame may carry its monotonic capture time and on_sent callbacks; both
+    are handed to the output with the frame, which records "glass" latency and
+    calls back once the frame has really been sent (see SinkWorker). Callbacks
+    of a frame that was replaced before it went out move on to the frame that
+    replaced it, so they fire for the first frame actually delivered.
+    """
+
+    def __init__(self, output, fps: float, logger: Optional[logging.Logger] = None, metrics=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.output = output
+        self.metrics = metrics  # Optional MetricsRegistry; ticks the "output" fps meter
+        self.fps = fps
+        self.period = 1.0 / self.fps
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._wakeup = threading.Event()
+
+        # Latest submitted frame and the one sent last (kept for repeats)
+        self._latest: Optional[np.ndarray] = None
+        self._previous: Optional[np.ndarray] = None
+        self._latest_captured: Optional[float] = None
+        self._on_sent: List[Callable[[float], None]] = []
+
+        # Counters
+        self.frames_submitted = 0
+        self.frames_sent = 0
+        self.frames_repeated = 0
+        self.frames_late = 0
+        self.frames_dropped = 0
+        self.send_errors = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        """Start the output thread."""
+        if self._running:
+            return
+        self._running = True
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name="OutputPacer", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Output pacer started at {self.fps} fps")
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the output thread (the outputs themselves stay open)."""
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.logger.info("Output pacer stopped")
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def submit(self, frame: np.ndarray, owned: bool = False, captured: Optional[float] = None,
+               on_sent: Optional[Callable[[float], None]] = None):
+        """Offer a composed frame for output. Never blocks on the outputs.
+
+        owned=True means the caller will not touch the array again, so it is used
+        as-is; otherwise a copy is taken. on_sent is called on the sink thread
+        with the monotonic time the frame (or its replacement) was delivered.
+        """
+        if not owned:
+            frame = frame.copy()
+
+        with self._lock:
+            if self._latest is not None:
+                # Replaced before it was ever sent
+                self.frames_dropped += 1
+            self._latest = frame
+            self._latest_captured = captured
+            if on_sent is not None:
+                self._on_sent.append(on_sent)
+            self.frames_submitted += 1
+
+    def _take_frame(self):
+        """Return (frame, is_new, captured, callbacks) for the next output tick."""
+        with self._lock:
+            if self._latest is not None:
+                self._previous = self._latest
+                self._latest = None
+                callbacks, self._on_sent = self._on_sent, []
+                return self._previous, True, self._latest_captured, callbacks
+            return self._previous, False, None, []
+
+    def _run(self):
+        next_deadline = time.perf_counter()
+
+        while self._running:
+            frame, is_new, captured, callbacks = self._take_frame()
+
+            if frame is not None and self.output.is_open:
+                if not is_new:
+                    self.frames_repeated += 1
+                if is_new:
+                    sent = self.output.send(frame, captured=captured, on_sent=callbacks)
+                    callbacks = []  # The output owns them now, delivered or not
+                else:
+                    sent = self.output.send(frame)
+                if sent:
+                    self.frames_sent += 1
+                    if self.metrics:
+                        self.metrics.rate("output").tick()
+                else:
+                    self.send_errors += 1
+
+            if callbacks:
+                # Not delivered (output down); wait for the next frame that is
+                with self._lock:
+                    self._on_sent[:0] = callbacks
+
+            # Fixed-rate schedule; if we fell a whole frame behind, count it and resync
+            next_deadline += self.period
+            now = time.perf_counter()
+            lateness = now - next_deadline
+            if lateness > 0:
+                self.frames_late += 1
+                self.max_lateness = max(self.max_lateness, lateness)
+                if lateness > self.period:
+                    next_deadline = now
+                continue
+
+            self._wakeup.wait(-lateness)
+
+    def get_stats(self) -> dict:
+        """Output counters: a healthy stream has sent ~= fps * runtime."""
+        return {
+            "fps": self.fps,
+            "submitted": self.frames_submitted,
+            "sent": self.frames_sent,
+            "repeated": self.frames_repeated,
+            "late": self.frames_late,
+            "dropped": self.frames_dropped,
+            "send_errors": self.send_errors,
+            "max_lateness_ms": round(self.max_lateness * 1000, 2),
+        }
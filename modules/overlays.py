@@ -0,0 +1,245 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+def blend_sprite(frame: np.ndarray, premultiplied: np.ndarray, inv_alpha: np.ndarray, x: int, y: int):
+    """Alpha-blend a prepared sprite into frame at (x, y), touching only its rectangle.
+
+    premultiplied holds color * alpha and inv_alpha holds 256 - alpha, both uint16,
+    so the blend is (frame * inv_alpha + premultiplied) >> 8.
+    """
+    frame_h, frame_w = frame.shape[:2]
+    sprite_h, sprite_w = premultiplied.shape[:2]
+
+    # Clip the sprite rectangle to the frame
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite_w, frame_w), min(y + sprite_h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    sx0, sy0 = x0 - x, y0 - y
+    sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+    roi = frame[y0:y1, x0:x1]
+    blended = roi * inv_alpha[sy0:sy1, sx0:sx1]
+    blended += premultiplied[sy0:sy1, sx0:sx1]
+    blended >>= 8
+    np.copyto(roi, blended, casting='unsafe')
+
+
+class Sprite:
+    """A BGRA image rendered once and re-rendered only when its content changes."""
+
+    def __init__(self):
+        self._key = None
+        self._premultiplied: Optional[np.ndarray] = None
+        self._inv_alpha: Optional[np.ndarray] = None
+        self.render_count = 0
+        self.draw_count = 0
+
+    def content_key(self) -> tuple:
+        """Everything the rendered image depends on."""
+        raise NotImplementedError
+
+    def render(self) -> np.ndarray:
+        """Render the sprite as a BGRA uint8 image."""
+        raise NotImplementedError
+
+    def _prepare(self):
+        key = self.content_key()
+        if key != self._key or self._premultiplied is None:
+            bgra = self.render()
+            alpha = bgra[:, :, 3:4].astype(np.uint16)
+            alpha += alpha >> 7  # map 0..255 onto 0..256
+            self._premultiplied = bgra[:, :, :3].astype(np.uint16) * alpha
+            self._inv_alpha = 256 - alpha
+            self._key = key
+            self.render_count += 1
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the rendered sprite."""
+        self._prepare()
+        return self._premultiplied.shape[1], self._premultiplied.shape[0]
+
+    def draw(self, frame: np.ndarray, x: int, y: int):
+        self._prepare()
+        self.draw_count += 1
+        blend_sprite(frame, self._premultiplied, self._inv_alpha, x, y)
+
+
+class TextSprite(Sprite):
+    """Text with optional drop shadow on an optional semi-transparent box."""
+
+    def __init__(self, text: str, font_scale: float = 0.7, thickness: int = 2,
+                 color: Tuple[int, int, int] = (255, 255, 255),
+                 shadow_color: Optional[Tuple[int, int, int]] = (0, 0, 0),
+                 background: Optional[Tuple[int, int, int]] = None, background_alpha: float = 0.6,
+                 padding: int = 0, font: int = cv2.FONT_HERSHEY_SIMPLEX):
+        super().__init__()
+        self.text = text
+        self.font = font
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.color = color
+        self.shadow_color = shadow_color
+        self.background = background
+        self.background_alpha = background_alpha
+        self.padding = padding
+
+    def content_key(self) -> tuple:
+        return (self.text, self.font, self.font_scale, self.thickness, self.color,
+                self.shadow_color, self.background, self.background_alpha, self.padding)
+
+    def text_size(self) -> Tuple[int, int, int]:
+        (text_width, text_height), baseline = cv2.getTextSize(self.text, self.font, self.font_scale,
+                                                              self.thickness)
+        return text_width, text_height, baseline
+
+    def render(self) -> np.ndarray:
+        text_width, text_height, baseline = self.text_size()
+        width = text_width + 2 * self.padding + 2
+        height = text_height + baseline + 2 * self.padding + 2
+        sprite = np.zeros((height, width, 4), dtype=np.uint8)
+
+        if self.background is not None:
+            sprite[:, :, :3] = self.background
+            sprite[:, :, 3] = int(self.background_alpha * 255)
+
+        origin = (self.padding, self.padding + text_height)
+        bgr = np.ascontiguousarray(sprite[:, :, :3])
+        alpha = np.ascontiguousarray(sprite[:, :, 3])
+
+        if self.shadow_color is not None:
+            shadow_origin = (origin[0] + 1, origin[1] + 1)
+            cv2.putText(bgr, self.text, shadow_origin, self.font, self.font_scale, self.shadow_color,
+                        self.thickness, cv2.LINE_AA)
+            cv2.putText(alpha, self.text, shadow_origin, self.font, self.font_scale, 255,
+                        self.thickness, cv2.LINE_AA)
+
+        cv2.putText(bgr, self.text, origin, self.font, self.font_scale, self.color, self.thickness, cv2.LINE_AA)
+        cv2.putText(alpha, self.text, origin, self.font, self.font_scale, 255, self.thickness, cv2.LINE_AA)
+
+        sprite[:, :, :3] = bgr
+        sprite[:, :, 3] = alpha
+        return sprite
+
+
+class BadgeSprite(Sprite):
+    """A filled circle, e.g. a status dot."""
+
+    def __init__(self, radius: int = 6, color: Tuple[int, int, int] = (0, 255, 0)):
+        super().__init__()
+        self.radius = radius
+        self.color = color
+
+    def content_key(self) -> tuple:
+        return (self.radius, self.color)
+
+    def render(self) -> np.ndarray:
+        size = 2 * self.radius + 3
+        sprite = np.zeros((size, size, 4), dtype=np.uint8)
+        center = (size // 2, size // 2)
+        sprite[:, :, :3] = self.color
+        alpha = np.zeros((size, size), dtype=np.uint8)
+        cv2.circle(alpha, center, self.radius, 255, -1, cv2.LINE_AA)
+        sprite[:, :, 3] = alpha
+        return sprite
+
+
+class GradientSprite(Sprite):
+    """A vertical color gradient box, rendered with array ops instead of a row loop."""
+
+    def __init__(self, width: int, height: int, top_color: Tuple[int, int, int],
+                 bottom_color: Optional[Tuple[int, int, int]] = None, alpha: float = 1.0):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.top_color = top_color
+        self.bottom_color = bottom_color or top_color
+        self.alpha = alpha
+
+    def content_key(self) -> tuple:
+        return (self.width, self.height, self.top_color, self.bottom_color, self.alpha)
+
+    def render(self) -> np.ndarray:
+        return render_gradient(self.width, self.height, self.top_color, self.bottom_color, self.alpha)
+
+
+def render_gradient(width: int, height: int, top_color: Tuple[int, int, int],
+                    bottom_color: Tuple[int, int, int], alpha: float = 1.0) -> np.ndarray:
+    """Vertical BGRA gradient from top_color to bottom_color."""
+    t = (np.arange(height, dtype=np.float32) / max(height, 1))[:, None]
+    top = np.array(top_color, dtype=np.float32)
+    bottom = np.array(bottom_color, dtype=np.float32)
+    rows = (top + (bottom - top) * t).astype(np.uint8)  # (height, 3)
+    sprite = np.empty((height, width, 4), dtype=np.uint8)
+    sprite[:, :, :3] = rows[:, None, :]
+    sprite[:, :, 3] = int(alpha * 255)
+    return sprite
+
+
+class OverlayLayer:
+    """A sprite placed on the frame by anchor corner and margin."""
+
+    ANCHORS = ('top-left', 'top-right', 'bottom-left', 'bottom-right')
+
+    def __init__(self, sprite: Sprite, anchor: str = 'top-left', margin: Tuple[int, int] = (0, 0),
+                 visible: bool = True):
+        if anchor not in self.ANCHORS:
+            raise ValueError(f"Unknown anchor: {anchor}")
+        self.sprite = sprite
+        self.anchor = anchor
+        self.margin = margin
+        self.visible = visible
+
+    def position(self, frame_width: int, frame_height: int) -> Tuple[int, int]:
+        width, height = self.sprite.size
+        mx, my = self.margin
+        x = frame_width - width - mx if self.anchor.endswith('right') else mx
+        y = frame_height - height - my if self.anchor.startswith('bottom') else my
+        return x, y
+
+    def draw(self, frame: np.ndarray):
+        if self.visible:
+            x, y = self.position(frame.shape[1], frame.shape[0])
+            self.sprite.draw(frame, x, y)
+
+
+class OverlayStack:
+    """Named overlay layers drawn in insertion order (retained mode)."""
+
+    def __init__(self):
+        self._layers: Dict[str, OverlayLayer] = {}
+
+    def add(self, name: str, layer: OverlayLayer) -> OverlayLayer:
+        self._layers[name] = layer
+        return layer
+
+    def get(self, name: str) -> Optional[OverlayLayer]:
+        return self._layers.get(name)
+
+    def remove(self, name: str):
+        self._layers.pop(name, None)
+
+    def set_visible(self, name: str, visible: bool):
+        layer = self._layers.get(name)
+        if layer:
+            layer.visible = visible
+
+    @property
+    def layers(self) -> List[OverlayLayer]:
+        return list(self._layers.values())
+
+    def cache_stats(self) -> dict:
+        """Sprite draws served from the cached render vs. re-renders."""
+        draws = sum(layer.sprite.draw_count for layer in self._layers.values())
+        renders = sum(layer.sprite.render_count for layer in self._layers.values())
+        return {"hits": max(draws - renders, 0), "misses": renders}
+
+    def draw(self, frame: np.ndarray) -> np.ndarray:
+        """Blend all visible layers into frame in place and return it."""
+        for layer in self._layers.values():
+            layer.draw(frame)
+        return frame
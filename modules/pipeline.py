@@ -0,0 +1,235 @@
+import threading
+import time
+import logging
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class QueuePolicy(Enum):
+    BLOCK = "block"              # Producer waits for room (nothing is lost)
+    DROP_OLDEST = "drop_oldest"  # Full queue discards its oldest item
+    LATEST_ONLY = "latest_only"  # Single slot, a new item replaces the pending one
+
+
+class StageQueue:
+    """Bounded queue between two pipeline stages with a declared overflow policy."""
+
+    def __init__(self, name: str, maxsize: int = 1, policy: str = "block"):
+        self.name = name
+        self.policy = QueuePolicy(policy)
+        self.maxsize = 1 if self.policy == QueuePolicy.LATEST_ONLY else max(int(maxsize), 1)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Counters
+        self.items_put = 0
+        self.items_dropped = 0
+        self.high_water = 0
+        self.blocked_time = 0.0
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Add an item according to the policy. Returns False if it was not queued."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == QueuePolicy.BLOCK:
+                    start = time.perf_counter()
+                    deadline = None if timeout is None else start + timeout
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        remaining = None if deadline is None else deadline - time.perf_counter()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    self.blocked_time += time.perf_counter() - start
+                    if len(self._items) >= self.maxsize or self._closed:
+                        self.items_dropped += 1
+                        return False
+                else:
+                    self._items.popleft()
+                    self.items_dropped += 1
+
+            self._items.append(item)
+            self.items_put += 1
+            self.high_water = max(self.high_water, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Oldest item, waiting up to timeout; None if nothing arrived or the queue is closed."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def drain(self) -> List[Any]:
+        """Take everything queued right now without waiting."""
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+            return items
+
+    def close(self):
+        """Wake up and release all waiting producers and consumers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+            self._items.clear()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_stats(self) -> dict:
+        return {
+            "policy": self.policy.value,
+            "maxsize": self.maxsize,
+            "depth": len(self._items),
+            "high_water": self.high_water,
+            "put": self.items_put,
+            "dropped": self.items_dropped,
+            "blocked_ms": round(self.blocked_time * 1000, 1),
+        }
+
+
+class PipelineStage:
+    """One pipeline stage running on its own thread.
+
+    With a source queue, process(item) is called for every item taken from it;
+    without one (a producer such as capture) process(None) is called in a loop.
+    process returns False to stop the stage, e.g. when its input device died.
+    """
+
+    def __init__(self, name: str, process: Callable[[Any], Optional[bool]],
+                 source: Optional[StageQueue] = None, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.name = name
+        self.process = process
+        self.source = source
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.failed = False
+
+        # Counters
+        self.items_processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self._started_at = 0.0
+
+    def start(self):
+        self._running = True
+        self.failed = False
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"Stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def finish(self):
+        """Stop after the current item without counting as a failure (e.g. end of input)."""
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def _run(self):
+        while self._running:
+            item = None
+            if self.source is not None:
+                item = self.source.get(timeout=0.1)
+                if item is None:
+                    if self.source.closed:
+                        self._running = False  # Producer finished and everything was consumed
+                        break
+                    continue
+
+            start = time.perf_counter()
+            try:
+                keep_going = self.process(item)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Pipeline stage {self.name} error: {e}")
+                keep_going = True
+            self.busy_time += time.perf_counter() - start
+            self.items_processed += 1
+
+            if keep_going is False:
+                self.logger.error(f"Pipeline stage {self.name} stopped")
+                self.failed = True
+                self._running = False
+
+    def get_stats(self) -> dict:
+        elapsed = max(time.perf_counter() - self._started_at, 1e-6)
+        processed = max(self.items_processed, 1)
+        return {
+            "processed": self.items_processed,
+            "errors": self.errors,
+            "avg_ms": round(self.busy_time / processed * 1000, 2),
+            "busy_pct": round(min(self.busy_time / elapsed, 1.0) * 100, 1),
+        }
+
+
+class Pipeline:
+    """Stages and the bounded queues connecting them, started and stopped together."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.stages: Dict[str, PipelineStage] = {}
+        self.queues: Dict[str, StageQueue] = {}
+
+    def add_queue(self, name: str, maxsize: int = 1, policy: str = "block") -> StageQueue:
+        queue = StageQueue(name, maxsize, policy)
+        self.queues[name] = queue
+        return queue
+
+    def add_stage(self, name: str, process: Callable[[Any], Optional[bool]],
+                  source: Optional[StageQueue] = None) -> PipelineStage:
+        stage = PipelineStage(name, process, source, self.logger)
+        self.stages[name] = stage
+        return stage
+
+    def start(self):
+        for queue in self.queues.values():
+            queue.reopen()
+        for stage in self.stages.values():
+            stage.start()
+        self.logger.info("Pipeline started: " + ", ".join(
+            f"{name} ({q.policy.value}, {q.maxsize})" for name, q in self.queues.items()))
+
+    def stop(self):
+        for stage in self.stages.values():
+            stage._running = False
+        # Closing the queues releases stages blocked on them
+        for queue in self.queues.values():
+            queue.close()
+        for stage in self.stages.values():
+            stage.stop()
+
+    @property
+    def failed(self) -> bool:
+        return any(stage.failed for stage in self.stages.values())
+
+    def get_stats(self) -> dict:
+        return {
+            "stages": {name: stage.get_stats() for name, stage in self.stages.items()},
+            "queues": {name: queue.get_stats() for name, queue in self.queues.items()},
+        }
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+import logging
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class PreviewRenderer:
+    """Draws the preview window from its own thread at a reduced rate and size.
+
+    The frame thread asks wants_frame() and, only when it returns True, hands
+    over a snapshot dict (a downscaled frame plus whatever the render callback
+    needs) with publish(). That is a single reference swap, so the preview never
+    blocks the pipeline; snapshots that arrive faster than the preview rate
+    simply replace each other. All HighGUI calls (imshow, waitKey,
+    destroyWindow) happen on this thread, and key presses are forwarded to the
+    frame thread through poll_key().
+    """
+
+    def __init__(self, window_name: str, render: Callable[[dict], np.ndarray], fps: float = 15,
+                 scale: float = 0.75, logger: Optional[logging.Logger] = None, metrics=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.window_name = window_name
+        self.render = render
+        self.fps = max(float(fps), 1.0)
+        self.period = 1.0 / self.fps
+        self.scale = min(max(float(scale), 0.1), 1.0)
+
+        self.visible = True
+        self._snapshot: Optional[dict] = None
+        self._last_publish = 0.0
+        self._keys: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+        self._window_open = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+
+        # Counters
+        self.frames_published = 0
+        self.frames_rendered = 0
+        self.render_time_total = 0.0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="PreviewRenderer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_visible(self, visible: bool):
+        """Show or hide the window; the window itself is closed on the preview thread."""
+        self.visible = visible
+        self._wakeup.set()
+
+    def preview_size(self, width: int, height: int) -> Tuple[int, int]:
+        return max(int(width * self.scale), 1), max(int(height * self.scale), 1)
+
+    def wants_frame(self) -> bool:
+        """True when a new snapshot is due (cheap; call every frame)."""
+        return self.visible and self._running and time.perf_counter() - self._last_publish >= self.period
+
+    def downscale(self, frame: np.ndarray) -> np.ndarray:
+        """Private downscaled copy of a frame for a snapshot."""
+        if self.scale >= 1.0:
+            return frame.copy()
+        return cv2.resize(frame, self.preview_size(frame.shape[1], frame.shape[0]),
+                          interpolation=cv2.INTER_AREA)
+
+    def publish(self, snapshot: dict):
+        """Hand over the latest snapshot. Never blocks."""
+        self._last_publish = time.perf_counter()
+        self._snapshot = snapshot
+        self.frames_published += 1
+
+    def poll_key(self) -> int:
+        """Next key pressed in the preview window, or -1."""
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return -1
+
+    def _run(self):
+        while self._running:
+            deadline = time.perf_counter() + self.period
+
+            snapshot, self._snapshot = self._snapshot, None
+            if self.visible and snapshot is not None:
+                start = time.perf_counter()
+                try:
+                    image = self.render(snapshot)
+                    cv2.imshow(self.window_name, image)
+                    self._window_open = True
+                    self.frames_rendered += 1
+                except Exception as e:
+                    self.logger.error(f"Preview error: {e}")  # NO EMOJI
+                end = time.perf_counter()
+                self.render_time_total += end - start
+                if self.metrics:
+                    self.metrics.span("preview", start, end)
+            elif not self.visible and self._window_open:
+                self._close_window()
+
+            remaining = max(deadline - time.perf_counter(), 0.001)
+            if self._window_open:
+                # waitKey doubles as the rate limiter and pumps the window events
+                key = cv2.waitKey(max(int(remaining * 1000), 1))
+                if key != -1:
+                    self._keys.put(key & 0xFF)
+            else:
+                self._wakeup.wait(remaining)
+                self._wakeup.clear()
+
+        if self._window_open:
+            self._close_window()
+
+    def _close_window(self):
+        try:
+            cv2.destroyWindow(self.window_name)
+            cv2.waitKey(1)
+        except Exception:
+            pass
+        self._window_open = False
+
+    def get_stats(self) -> dict:
+        rendered = max(self.frames_rendered, 1)
+        return {
+            "fps": self.fps,
+            "scale": self.scale,
+            "published": self.frames_published,
+            "rendered": self.frames_rendered,
+            "avg_render_ms": round(self.render_time_total / rendered * 1000, 2),
+        }
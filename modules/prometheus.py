@@ -0,0 +1,215 @@
+import math
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.metrics import LatencyHistogram, MetricsRegistry, TriggerLatencyTracker, process_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class MetricsWriter:
+    """Builds a Prometheus text exposition.
+
+    Samples may be added in any order; they are grouped per metric family on
+    output, as the format requires.
+    """
+
+    def __init__(self, prefix: str = "emotestream"):
+        self.prefix = prefix
+        self._families: Dict[str, List[str]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        lines = self._families.get(name)
+        if lines is None:
+            lines = self._families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        return lines
+
+    def sample(self, name: str, kind: str, help_text: str, value,
+               labels: Optional[Dict[str, str]] = None, prefixed: bool = True):
+        name = f"{self.prefix}_{name}" if prefixed else name
+        self._family(name, kind, help_text).append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def counter(self, name: str, help_text: str, value, labels: Optional[Dict[str, str]] = None):
+        self.sample(f"{name}_total", "counter", help_text, value, labels)
+
+    def gauge(self, name: str, help_text: str, value, labels: Optional[Dict[str, str]] = None):
+        self.sample(name, "gauge", help_text, value, labels)
+
+    def histogram(self, name: str, help_text: str, histogram: LatencyHistogram,
+                  labels: Optional[Dict[str, str]] = None):
+        name = f"{self.prefix}_{name}"
+        lines = self._family(name, "histogram", help_text)
+        labels = labels or {}
+        buckets: List[Tuple[float, int]] = histogram.cumulative_buckets()
+        for bound, count in buckets:
+            le = "+Inf" if math.isinf(bound) else f"{bound:.6g}"
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.total_sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {buckets[-1][1]}")
+
+    def text(self) -> str:
+        return "\n".join(line for lines in self._families.values() for line in lines) + "\n"
+
+
+def render_metrics(stats: dict, metrics: MetricsRegistry,
+                   trigger_latency: Optional[TriggerLatencyTracker] = None) -> str:
+    """Prometheus text for a stats dict (EmoteStreamApp._collect_stats) plus the histograms."""
+    out = MetricsWriter()
+
+    out.counter("frames_processed", "Frames handled by the frame loop.", stats.get("frames", 0))
+    stages = stats.get("pipeline", {}).get("stages", {})
+    if "capture" in stages:
+        out.counter("frames_captured", "Camera reads by the capture stage.", stages["capture"]["processed"])
+    for name, stage in stages.items():
+        out.counter("stage_errors", "Exceptions raised in a pipeline stage.", stage["errors"], {"stage": name})
+    for name, queue in stats.get("pipeline", {}).get("queues", {}).items():
+        out.counter("queue_dropped", "Items discarded by a full stage queue.", queue["dropped"], {"queue": name})
+        out.gauge("queue_depth", "Items waiting in a stage queue.", queue["depth"], {"queue": name})
+
+    pacer = stats.get("pacer")
+    if pacer:
+        out.counter("frames_sent", "Frames delivered by the output pacer.", pacer["sent"])
+        out.counter("frames_repeated", "Output ticks that resent the previous frame.", pacer["repeated"])
+        out.counter("frames_dropped", "Composed frames replaced before they were sent.", pacer["dropped"])
+        out.counter("frames_late", "Output ticks that missed their deadline.", pacer["late"])
+        out.counter("send_errors", "Output sends that failed.", pacer["send_errors"])
+    for name, sink in stats.get("sinks", {}).items():
+        out.counter("sink_frames_sent", "Frames written by an output sink.", sink["sent"], {"sink": name})
+        out.counter("sink_frames_dropped", "Frames a slow output sink skipped.", sink["dropped"], {"sink": name})
+
+    for emote, detections in stats.get("detections_by_emote", {}).items():
+        out.counter("detections", "Satisfied gesture holds.", detections["count"],
+                    {"emote": emote, "gesture": detections["gesture"]})
+    for event, count in stats.get("scheduler", {}).get("events", {}).items():
+        out.counter("clip_events", "Clip lifecycle events from the scheduler.", count, {"event": event})
+
+    for name, cache in stats.get("caches", {}).items():
+        out.counter("cache_hits", "Lookups served from a cache.", cache["hits"], {"cache": name})
+        out.counter("cache_misses", "Lookups that had to load or render.", cache["misses"], {"cache": name})
+
+    for name, rate in stats.get("metrics", {}).get("rates", {}).items():
+        out.gauge("rate_fps", "EWMA event rate.", rate, {"meter": name})
+    for name, histogram in list(metrics.histograms.items()):
+        out.histogram("stage_latency_seconds", "Time spent per pipeline stage.", histogram, {"stage": name})
+    if trigger_latency:
+        for emote, histograms in list(trigger_latency.histograms.items()):
+            for segment, histogram in histograms.items():
+                if histogram.total_count:
+                    out.histogram("trigger_latency_seconds", "Gesture-to-glass latency per segment.",
+                                  histogram, {"emote": emote, "segment": segment})
+
+    process = process_stats()
+    out.sample("process_cpu_seconds_total", "counter", "User and system CPU time spent.",
+               process["cpu_seconds"], prefixed=False)
+    out.sample("process_resident_memory_bytes", "gauge", "Resident memory size.",
+               process["rss_bytes"], prefixed=False)
+    out.sample("process_threads", "gauge", "Number of OS threads.", process["threads"], prefixed=False)
+    resources = stats.get("resources")
+    if resources:
+        for name, thread in resources["by_thread"].items():
+            out.counter("thread_cpu_seconds", "CPU time spent by a named thread.", thread["cpu_seconds"],
+                        {"thread": name})
+        for group, count in resources["thread_groups"].items():
+            out.gauge("threads", "OS threads by owner (python, mediapipe, opencv, native).", count, {"group": group})
+        if resources["drop_rate"] is not None:
+            out.gauge("frame_drop_ratio", "Fraction of captured frames dropped over the last sample.",
+                      resources["drop_rate"])
+        out.gauge("resource_alerts", "Resource alerts currently raised.", len(resources["active_alerts"]))
+    if stats.get("runtime_s") is not None:
+        out.gauge("uptime_seconds", "Seconds since the frame loop started.", stats["runtime_s"])
+    return out.text()
+
+
+class PrometheusServer:
+    """Serves /metrics in Prometheus text format from a background HTTP thread.
+
+    Binds to localhost by default. A scrape only reads counters and histograms
+    the stages already maintain (via the collect callback); it never posts to
+    the frame loop or waits for it, so scraping cannot stall frame delivery.
+    """
+
+    def __init__(self, collect: Callable[[], str], port: int = 9464, host: str = "127.0.0.1",
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.collect = collect
+        self.port = port
+        self.host = host
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.scrapes = 0
+        self.scrape_time_total = 0.0
+
+    def start(self) -> bool:
+        """Start listening; returns False if the port could not be bound."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                start = time.perf_counter()
+                try:
+                    body = server.collect().encode()
+                except Exception as e:
+                    server.logger.error(f"Metrics scrape failed: {e}")
+                    self.send_error(500)
+                    return
+                server.scrapes += 1
+                server.scrape_time_total += time.perf_counter() - start
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # One line per scrape would flood the log
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"Metrics endpoint failed to start: {e}")
+            return False
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="PrometheusServer", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self, timeout: float = 2.0):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_stats(self) -> dict:
+        return {
+            "address": f"http://{self.host}:{self.port}/metrics" if self._httpd else None,
+            "scrapes": self.scrapes,
+            "avg_scrape_ms": round(self.scrape_time_total / max(self.scrapes, 1) * 1000, 2),
+        }
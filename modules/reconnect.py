@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+import logging
+from enum import Enum
+from typing import Optional
+
+
+class SupervisorState(Enum):
+    STOPPED = "stopped"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+
+
+class ReconnectSupervisor:
+    """Reopens a dropped output from a background thread with exponential backoff.
+
+    The target needs a `healthy` property and a `reconnect()` method returning
+    True on success (see VirtualCameraSink). The supervisor polls `healthy`
+    every check_interval seconds when auto is on; request_reconnect() forces an
+    attempt at any time. Retries wait initial_delay * multiplier**n seconds,
+    capped at max_delay and spread by +/- jitter so several instances don't
+    retry in lockstep. Nothing here ever runs on the frame loop.
+    """
+
+    def __init__(self, target, auto: bool = True, check_interval: float = 1.0,
+                 initial_delay: float = 0.5, max_delay: float = 30.0, multiplier: float = 2.0,
+                 jitter: float = 0.2, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.target = target
+        self.auto = auto
+        self.check_interval = check_interval
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+        self.state = SupervisorState.STOPPED
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._wakeup = threading.Event()
+        self._requested = False
+
+        # Counters
+        self.attempts = 0
+        self.reconnects = 0
+        self.outages = 0
+        self.last_error: Optional[str] = None
+        self._outage_started: Optional[float] = None
+        self._next_retry: Optional[float] = None
+        self.last_outage_duration = 0.0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.state = SupervisorState.CONNECTED
+        self._thread = threading.Thread(target=self._run, name="ReconnectSupervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.state = SupervisorState.STOPPED
+
+    def request_reconnect(self):
+        """Ask for a reconnect attempt as soon as possible. Never blocks."""
+        self._requested = True
+        self._wakeup.set()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based), with jitter applied."""
+        delay = min(self.initial_delay * (self.multiplier ** attempt), self.max_delay)
+        return max(0.0, delay * (1.0 + random.uniform(-self.jitter, self.jitter)))
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.check_interval)
+            self._wakeup.clear()
+            if not self._running:
+                return
+
+            if self._requested or (self.auto and not self.target.healthy):
+                self._requested = False
+                self._recover()
+
+    def _recover(self):
+        """Retry until the target is back or the supervisor is stopped."""
+        self.state = SupervisorState.RECONNECTING
+        self.outages += 1
+        self._outage_started = time.monotonic()
+        self.logger.warning("Output lost, reconnecting in the background")  # NO EMOJI
+
+        attempt = 0
+        while self._running:
+            self.attempts += 1
+            try:
+                if self.target.reconnect():
+                    self.reconnects += 1
+                    self.last_outage_duration = time.monotonic() - self._outage_started
+                    self.logger.info(f"Output reconnected after {attempt + 1} attempt(s), "
+                                     f"{self.last_outage_duration:.1f}s outage")  # NO EMOJI
+                    break
+                self.last_error = "reconnect failed"
+            except Exception as e:
+                self.last_error = str(e)
+                self.logger.error(f"Reconnect attempt failed: {e}")  # NO EMOJI
+
+            delay = self.backoff_delay(attempt)
+            attempt += 1
+            self._next_retry = time.monotonic() + delay
+            self.logger.info(f"Next reconnect attempt in {delay:.1f}s")  # NO EMOJI
+            # A manual request cuts the wait short
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            self._requested = False
+
+        self._next_retry = None
+        self._outage_started = None
+        self.state = SupervisorState.CONNECTED if self._running else SupervisorState.STOPPED
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "state": self.state.value,
+            "outages": self.outages,
+            "attempts": self.attempts,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+            "outage_s": round(now - self._outage_started, 1) if self._outage_started else 0.0,
+            "next_retry_s": round(max(self._next_retry - now, 0.0), 1) if self._next_retry else None,
+            "last_outage_s": round(self.last_outage_duration, 1),
+        }
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from modules.metrics import process_stats
+
+# Native (non-Python) threads grouped by the name the library gives them (/proc/.../comm);
+# unnamed ones keep the process name and are counted as "native"
+THREAD_GROUPS = (
+    ("mediapipe", ("mediapipe", "mp_", "tflite", "xnnpack", "gl_")),
+    ("opencv", ("opencv", "cv_", "cvworker", "videoio", "ffmpeg", "avcodec")),
+)
+
+
+def read_threads() -> Dict[int, tuple]:
+    """{tid: (comm, cpu seconds)} for every thread of this process, from /proc/self/task.
+
+    Raises OSError where there is no /proc (Windows, macOS).
+    """
+    threads = {}
+    tids = os.listdir("/proc/self/task")
+    ticks = os.sysconf("SC_CLK_TCK")
+    for tid in tids:
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as f:
+                line = f.read()
+        except OSError:
+            continue  # Thread exited while listing
+        comm = line[line.index("(") + 1:line.rindex(")")]
+        fields = line.rsplit(")", 1)[1].split()
+        threads[int(tid)] = (comm, (int(fields[11]) + int(fields[12])) / ticks)
+    return threads
+
+
+def thread_group(comm: str) -> str:
+    name = comm.lower()
+    for group, prefixes in THREAD_GROUPS:
+        if name.startswith(prefixes):
+            return group
+    return "native"
+
+
+class ResourceMonitor:
+    """Samples process and per-thread CPU and memory from /proc on an interval.
+
+    One sample reads /proc/self/stat, /proc/self/status and one stat file per
+    thread (well under a millisecond for a few dozen threads). Python threads
+    are reported by their names (Stage-detect, OutputPacer, ...); native
+    threads started by OpenCV or MediaPipe are counted per group. CPU share is
+    the fraction of one core a thread used since the previous sample.
+
+    Alerts are edge triggered: on_alert gets one event when a thread's CPU
+    share or the frame-drop rate crosses its threshold and one when it recovers.
+    counters() must return running totals {"frames": offered, "dropped": lost}.
+    on_sample is called with the latest sample after each one.
+    """
+
+    def __init__(self, interval: float = 5.0, counters: Optional[Callable[[], dict]] = None,
+                 stage_cpu_threshold: float = 0.9, drop_rate_threshold: float = 0.1,
+                 on_alert: Optional[Callable[[dict], None]] = None,
+                 on_sample: Optional[Callable[[dict], None]] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.interval = interval
+        self.counters = counters
+        self.stage_cpu_threshold = stage_cpu_threshold
+        self.drop_rate_threshold = drop_rate_threshold
+        self.on_alert = on_alert
+        self.on_sample = on_sample
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._previous: Optional[dict] = None
+        self._active: Dict[str, dict] = {}  # alert key -> alert event
+
+        self.alerts: deque = deque(maxlen=50)
+        self.latest: dict = {}
+        self.samples = 0
+        self.sample_time_total = 0.0
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ResourceMonitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            self.sample()  # Reference point for the first CPU deltas
+        except Exception as e:
+            self.logger.error(f"Resource monitor error: {e}")
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+                if self.on_sample:
+                    self.on_sample(self.latest)
+            except Exception as e:
+                self.logger.error(f"Resource monitor error: {e}")
+
+    def sample(self) -> dict:
+        start = time.perf_counter()
+        now = time.monotonic()
+        process = process_stats()
+        try:
+            threads = read_threads()
+        except (OSError, AttributeError):
+            threads = {}  # No /proc or os.sysconf (not Linux): process totals only
+        names = {thread.native_id: thread.name for thread in threading.enumerate()}
+        counters = self.counters() if self.counters else {}
+
+        previous = self._previous
+        elapsed = now - previous["time"] if previous else 0.0
+        groups = {"python": 0, "native": 0}
+        thread_stats = {}
+        for tid, (comm, cpu) in threads.items():
+            name = names.get(tid)
+            if name is None:
+                group = thread_group(comm)
+                groups[group] = groups.get(group, 0) + 1
+                continue
+            groups["python"] += 1
+            previous_cpu = previous["cpu"].get(tid) if previous else None
+            share = (cpu - previous_cpu) / elapsed if previous_cpu is not None and elapsed > 0 else None
+            thread_stats[name] = {"cpu_seconds": round(cpu, 2),
+                                  "cpu_share": round(share, 3) if share is not None else None}
+        native_cpu = sum(cpu for tid, (_, cpu) in threads.items() if tid not in names)
+
+        drop_rate = None
+        if previous and previous["counters"] and counters:
+            offered = counters["frames"] - previous["counters"]["frames"]
+            dropped = counters["dropped"] - previous["counters"]["dropped"]
+            drop_rate = dropped / offered if offered > 0 else 0.0
+
+        cpu_share = None
+        if previous and elapsed > 0:
+            cpu_share = (process["cpu_seconds"] - previous["process_cpu"]) / elapsed
+        self.latest = {
+            "cpu_share": round(cpu_share, 3) if cpu_share is not None else None,
+            "cpu_seconds": round(process["cpu_seconds"], 2),
+            "rss_mb": round(process["rss_bytes"] / 2**20, 1),
+            "peak_rss_mb": round(process["peak_rss_bytes"] / 2**20, 1),
+            "threads": process["threads"],
+            "thread_groups": groups,
+            "native_cpu_seconds": round(native_cpu, 2),
+            "opencv_pool_size": cv2.getNumThreads(),
+            "drop_rate": round(drop_rate, 4) if drop_rate is not None else None,
+            "by_thread": thread_stats,
+        }
+        self._previous = {"time": now, "process_cpu": process["cpu_seconds"], "counters": counters,
+                          "cpu": {tid: cpu for tid, (_, cpu) in threads.items()}}
+
+        for name, stats in thread_stats.items():
+            self._check(f"cpu:{name}", stats["cpu_share"], self.stage_cpu_threshold,
+                        f"Thread {name} uses {{value:.0%}} of a core")
+        self._check("drop_rate", drop_rate, self.drop_rate_threshold, "Dropping {value:.1%} of frames")
+
+        self.samples += 1
+        self.sample_time_total += time.perf_counter() - start
+        return self.latest
+
+    def _check(self, key: str, value: Optional[float], threshold: float, message: str):
+        if value is None or not threshold:
+            return
+        active = key in self._active
+        if value > threshold and not active:
+            alert = {"event": "alert", "alert": key, "state": "raised", "value": value, "threshold": threshold,
+                     "message": message.format(value=value), "time": time.time()}
+            self._active[key] = alert
+            self.logger.warning(f"Resource alert: {alert['message']} (threshold {threshold})")
+        elif value <= threshold and active:
+            del self._active[key]
+            alert = {"event": "alert", "alert": key, "state": "cleared", "value": value, "threshold": threshold,
+                     "message": message.format(value=value), "time": time.time()}
+            self.logger.info(f"Resource alert cleared: {alert['message']}")
+        else:
+            return
+        self.alerts.append(alert)
+        if self.on_alert:
+            self.on_alert(alert)
+
+    @property
+    def active_alerts(self) -> List[dict]:
+        return list(self._active.values())
+
+    def get_stats(self) -> dict:
+        return dict(self.latest,
+                    samples=self.samples,
+                    avg_sample_ms=round(self.sample_time_total / max(self.samples, 1) * 1000, 3),
+                    active_alerts=[alert["message"] for alert in self.active_alerts])
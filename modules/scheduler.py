@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import logging
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+
+class SchedulerPolicy(Enum):
+    DROP = "drop"        # Ignore triggers while a clip is playing (old behaviour)
+    QUEUE = "queue"      # Queue triggers by priority, never interrupt a clip
+    PREEMPT = "preempt"  # Higher priority interrupts the clip, others are queued
+
+
+class ClipEvent(Enum):
+    QUEUED = "queued"
+    STARTED = "started"
+    PREEMPTED = "preempted"
+    FINISHED = "finished"
+    DROPPED = "dropped"
+
+
+class TriggerScheduler:
+    """Decides when detected emotes play: cooldowns, priorities, queueing and preemption.
+
+    This is the only place that applies cooldowns. The detector reports every
+    satisfied hold, submit() decides whether it plays now, waits or is dropped,
+    and step() is called once per frame to hand out the next clip to start.
+    The queue is bounded, so per-frame work is constant no matter how many
+    emotes are configured.
+    """
+
+    def __init__(self, cooldown_time: float = 2.0, policy: str = "preempt", max_queue: int = 2,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.cooldown_time = cooldown_time
+        self.policy = SchedulerPolicy(policy)
+        self.max_queue = max(int(max_queue), 0)
+
+        self.current: Optional[dict] = None
+        self._current_priority = 0
+        self._queue: List[tuple] = []  # heap of (-priority, seq, emote)
+        self._queued_names = set()
+        self._preempt_with: Optional[dict] = None
+        self._seq = itertools.count()
+
+        self._last_started: Dict[str, float] = {}
+        self._listeners: List[Callable[[dict], None]] = []
+        self.event_counts = {event.value: 0 for event in ClipEvent}
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """Register a callback receiving lifecycle event dicts (called on the frame thread)."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _publish(self, event: ClipEvent, emote: dict, now: float, **extra):
+        self.event_counts[event.value] += 1
+        payload = {"event": event.value, "emote": emote['name'], "time": now,
+                   "priority": self._priority(emote)}
+        payload.update(extra)
+        for callback in list(self._listeners):
+            try:
+                callback(payload)
+            except Exception as e:
+                self.logger.error(f"Scheduler event listener failed: {e}")
+
+    @staticmethod
+    def _priority(emote: dict) -> int:
+        return int(emote.get('priority', 0))
+
+    def _cooldown_for(self, emote: dict) -> float:
+        return float(emote.get('cooldown', self.cooldown_time))
+
+    def cooldown_remaining(self, emote: dict, now: float) -> float:
+        """Seconds until the emote may be triggered again."""
+        last = self._last_started.get(emote['name'])
+        if last is None:
+            return 0.0
+        return max(0.0, self._cooldown_for(emote) - (now - last))
+
+    @property
+    def is_busy(self) -> bool:
+        return self.current is not None
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._queue)
+
+    def submit(self, emote: dict, now: float) -> bool:
+        """Offer a detected emote. Returns True if it will play (now or later)."""
+        name = emote['name']
+        priority = self._priority(emote)
+
+        if self.cooldown_remaining(emote, now) > 0:
+            self._publish(ClipEvent.DROPPED, emote, now, reason="cooldown")
+            return False
+
+        if ((self.current and self.current['name'] == name) or name in self._queued_names
+                or (self._preempt_with and self._preempt_with['name'] == name)):
+            self._publish(ClipEvent.DROPPED, emote, now, reason="duplicate")
+            return False
+
+        if self.current is None:
+            self._push(emote, priority)
+            return True
+
+        if self.policy == SchedulerPolicy.PREEMPT and priority > self._current_priority:
+            if self._preempt_with is None or priority > self._priority(self._preempt_with):
+                displaced, self._preempt_with = self._preempt_with, emote
+                if displaced is not None:
+                    self._requeue(displaced, now)
+                return True
+
+        if self.policy == SchedulerPolicy.DROP or len(self._queue) >= self.max_queue:
+            self._publish(ClipEvent.DROPPED, emote, now, reason="busy")
+            return False
+
+        self._push(emote, priority)
+        self._publish(ClipEvent.QUEUED, emote, now, queue_length=len(self._queue))
+        return True
+
+    def _push(self, emote: dict, priority: int):
+        heapq.heappush(self._queue, (-priority, next(self._seq), emote))
+        self._queued_names.add(emote['name'])
+
+    def _requeue(self, emote: dict, now: float):
+        """Queue an emote that lost its pending preemption to a higher priority one, or drop it."""
+        if len(self._queue) >= self.max_queue:
+            self._publish(ClipEvent.DROPPED, emote, now, reason="preempted")
+            return
+        self._push(emote, self._priority(emote))
+        self._publish(ClipEvent.QUEUED, emote, now, queue_length=len(self._queue))
+
+    def step(self, now: float) -> Optional[dict]:
+        """Return the emote whose clip must start now (replacing any playing clip), or None."""
+        if self._preempt_with is not None:
+            emote = self._preempt_with
+            self._preempt_with = None
+            if self.current is not None:
+                self._publish(ClipEvent.PREEMPTED, self.current, now, by=emote['name'])
+            self._start(emote, now)
+            return emote
+
+        while self.current is None and self._queue:
+            _, _, emote = heapq.heappop(self._queue)
+            self._queued_names.discard(emote['name'])
+            # It may have started some other way while it waited
+            if self.cooldown_remaining(emote, now) > 0:
+                self._publish(ClipEvent.DROPPED, emote, now, reason="cooldown")
+                continue
+            self._start(emote, now)
+            return emote
+
+        return None
+
+    def _start(self, emote: dict, now: float):
+        self.current = emote
+        self._current_priority = self._priority(emote)
+        self._last_started[emote['name']] = now
+        self._publish(ClipEvent.STARTED, emote, now)
+
+    def finish(self, now: float, reason: str = "completed"):
+        """Mark the current clip as finished (completed, skipped or failed)."""
+        if self.current is not None:
+            self._publish(ClipEvent.FINISHED, self.current, now, reason=reason)
+        self.current = None
+        self._current_priority = 0
+
+    def clear(self, now: float):
+        """Drop everything queued and stop tracking the current clip."""
+        for _, _, emote in self._queue:
+            self._publish(ClipEvent.DROPPED, emote, now, reason="cleared")
+        if self._preempt_with is not None:
+            self._publish(ClipEvent.DROPPED, self._preempt_with, now, reason="cleared")
+            self._preempt_with = None
+        self._queue.clear()
+        self._queued_names.clear()
+        self.finish(now, reason="stopped")
+
+    def configure(self, cooldown_time: Optional[float] = None, policy: Optional[str] = None,
+                  max_queue: Optional[int] = None):
+        """Update scheduling settings at runtime."""
+        if cooldown_time is not None:
+            self.cooldown_time = float(cooldown_time)
+        if policy is not None:
+            self.policy = SchedulerPolicy(policy)
+        if max_queue is not None:
+            self.max_queue = max(int(max_queue), 0)
@@ -0,0 +1,470 @@
+import struct
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+class OutputSink:
+    """Base class for frame outputs fed by the output pacer.
+
+    Frames handed to send() are BGR uint8 and must be treated as read-only:
+    the same array is shared by every sink.
+    """
+
+    name = "sink"
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.errors = 0
+
+    def open(self) -> bool:
+        return True
+
+    def send(self, frame: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @property
+    def is_open(self) -> bool:
+        return True
+
+    def _count(self, frame: np.ndarray):
+        self.frames_sent += 1
+        self.bytes_sent += frame.nbytes
+
+    def get_stats(self) -> dict:
+        return {"sent": self.frames_sent, "bytes": self.bytes_sent, "errors": self.errors}
+
+
+class VirtualCameraSink(OutputSink):
+    """Sends frames to a VirtualCameraManager (OBS / UnityCapture / v4l2loopback).
+
+    send() never waits for a reconnect in progress. Frames arriving while the
+    camera is down are dropped, or with outage_policy="latest" the newest one is
+    held and pushed first when the camera comes back, so viewers go straight
+    from the outage to the live picture.
+    """
+
+    name = "virtualcam"
+    OUTAGE_POLICIES = ("drop", "latest")
+
+    def __init__(self, camera, outage_policy: str = "latest", max_consecutive_errors: int = 15,
+                 logger: Optional[logging.Logger] = None):
+        super().__init__(logger)
+        if outage_policy not in self.OUTAGE_POLICIES:
+            raise ValueError(f"Unknown outage policy: {outage_policy}")
+        self.camera = camera
+        self.outage_policy = outage_policy
+        self.max_consecutive_errors = max_consecutive_errors
+        self._lock = threading.Lock()
+        self._consecutive_errors = 0
+        self._held: Optional[np.ndarray] = None
+        self.frames_during_outage = 0
+
+    def open(self) -> bool:
+        with self._lock:
+            return self.camera.is_open or self.camera.open()
+
+    def _hold(self, frame: np.ndarray):
+        self.frames_during_outage += 1
+        if self.outage_policy == "latest":
+            self._held = frame
+
+    def send(self, frame: np.ndarray) -> bool:
+        if not self._lock.acquire(blocking=False):
+            # Reconnect (or a test pattern) holds the camera
+            self._hold(frame)
+            return False
+        try:
+            if not self.camera.is_open:
+                self._hold(frame)
+                return False
+            if self.camera.send_frame(frame, pace=False):
+                self._consecutive_errors = 0
+                self._count(frame)
+                return True
+            self.errors += 1
+            self._consecutive_errors += 1
+            return False
+        finally:
+            self._lock.release()
+
+    @property
+    def healthy(self) -> bool:
+        """False once the camera is closed or keeps rejecting frames."""
+        return self.camera.is_open and self._consecutive_errors < self.max_consecutive_errors
+
+    def reconnect(self) -> bool:
+        """Close and reopen the camera (blocking; call from a background thread)."""
+        with self._lock:
+            self.camera.close()
+            if not self.camera.open():
+                return False
+            self._consecutive_errors = 0
+            held, self._held = self._held, None
+            if held is not None and self.camera.send_frame(held, pace=False):
+                self._count(held)
+            return True
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the camera while doing something else with it (reconnect, test pattern)."""
+        with self._lock:
+            yield self.camera
+
+    def close(self):
+        with self._lock:
+            self.camera.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self.camera.is_open
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats.update(self.camera.get_stats())
+        stats["during_outage"] = self.frames_during_outage
+        return stats
+
+
+class NullSink(OutputSink):
+    """Discards frames, only counting them. For benchmarks and headless tests."""
+
+    name = "null"
+
+    def send(self, frame: np.ndarray) -> bool:
+        self._count(frame)
+        return True
+
+
+class FileRecorderSink(OutputSink):
+    """Records output to an MP4/AVI file, or to a raw BGR stream for any other extension."""
+
+    name = "file"
+
+    def __init__(self, path: str, width: int, height: int, fps: float,
+                 logger: Optional[logging.Logger] = None):
+        super().__init__(logger)
+        self.path = Path(path)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._writer = None
+        self._raw_file = None
+
+    def open(self) -> bool:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.suffix.lower() in ('.mp4', '.avi', '.mov'):
+                fourcc = cv2.VideoWriter_fourcc(*('mp4v' if self.path.suffix.lower() != '.avi' else 'MJPG'))
+                self._writer = cv2.VideoWriter(str(self.path), fourcc, self.fps, (self.width, self.height))
+                if not self._writer.isOpened():
+                    raise RuntimeError(f"Cannot open video writer for {self.path}")
+            else:
+                self._raw_file = open(self.path, 'wb')
+            self.logger.info(f"Recording output to {self.path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"File recorder failed to open: {e}")
+            self._writer = None
+            self._raw_file = None
+            return False
+
+    def send(self, frame: np.ndarray) -> bool:
+        try:
+            if frame.shape[:2] != (self.height, self.width):
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            if self._writer is not None:
+                self._writer.write(frame)
+            elif self._raw_file is not None:
+                self._raw_file.write(memoryview(np.ascontiguousarray(frame)))
+            else:
+                return False
+            self._count(frame)
+            return True
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f"File recorder error: {e}")
+            return False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+        if self._raw_file is not None:
+            self._raw_file.close()
+            self._raw_file = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None or self._raw_file is not None
+
+
+class SharedMemorySink(OutputSink):
+    """Publishes the latest frame in a named shared memory block for other processes.
+
+    Layout: a 32-byte header followed by the BGR frame. The header holds a
+    sequence number (odd while a frame is being written, seqlock style), width,
+    height, channels and the frame size in bytes.
+    """
+
+    name = "shm"
+    HEADER = struct.Struct('<QIIIIQ')
+
+    def __init__(self, shm_name: str, width: int, height: int, channels: int = 3,
+                 logger: Optional[logging.Logger] = None):
+        super().__init__(logger)
+        self.shm_name = shm_name
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.frame_bytes = width * height * channels
+        self._shm = None
+        self._view: Optional[np.ndarray] = None
+        self._seq = 0
+
+    def open(self) -> bool:
+        try:
+            from multiprocessing import shared_memory
+            size = self.HEADER.size + self.frame_bytes
+            try:
+                self._shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=size)
+            except FileExistsError:
+                # Left over from a previous run
+                self._shm = shared_memory.SharedMemory(name=self.shm_name)
+                if self._shm.size < size:
+                    raise RuntimeError(f"Existing shared memory '{self.shm_name}' is too small")
+            self._view = np.ndarray((self.height, self.width, self.channels), dtype=np.uint8,
+                                    buffer=self._shm.buf, offset=self.HEADER.size)
+            self._write_header()
+            self.logger.info(f"Publishing frames to shared memory '{self.shm_name}'")
+            return True
+        except Exception as e:
+            self.logger.error(f"Shared memory sink failed to open: {e}")
+            self._shm = None
+            return False
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._shm.buf, 0, self._seq, self.width, self.height,
+                              self.channels, self.frame_bytes, 0)
+
+    def send(self, frame: np.ndarray) -> bool:
+        if self._shm is None:
+            return False
+        try:
+            if frame.shape[:2] != (self.height, self.width):
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            self._seq += 1  # odd: write in progress
+            self._write_header()
+            np.copyto(self._view, frame)
+            self._seq += 1  # even: frame complete
+            self._write_header()
+            self._count(frame)
+            return True
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f"Shared memory sink error: {e}")
+            return False
+
+    def close(self):
+        if self._shm is not None:
+            self._view = None
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._shm is not None
+
+
+class SinkWorker:
+    """Feeds one sink from its own thread through a latest-only slot.
+
+    A slow sink only drops its own frames; it never back-pressures the pacer or
+    the other sinks.
+
+    With track_delivery the worker also owns the frames' delivery bookkeeping:
+    right after sink.send() succeeds it records "glass" latency from the
+    frame's capture time and calls its on_sent callbacks with the send time.
+    Callbacks of a frame replaced in the slot, or whose send failed, move on to
+    the next frame that is actually sent.
+    """
+
+    def __init__(self, sink: OutputSink, logger: Optional[logging.Logger] = None, metrics=None,
+                 track_delivery: bool = False):
+        self.logger = logger or logging.getLogger(__name__)
+        self.sink = sink
+        self.metrics = metrics
+        self.track_delivery = track_delivery
+        self._cond = threading.Condition()
+        self._pending: Optional[np.ndarray] = None
+        self._pending_captured: Optional[float] = None
+        self._pending_callbacks: List[Callable[[float], None]] = []
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.frames_dropped = 0
+        self.send_time_total = 0.0
+        self.send_time_max = 0.0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"Sink-{self.sink.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def offer(self, frame: np.ndarray, captured: Optional[float] = None,
+              on_sent: Optional[List[Callable[[float], None]]] = None):
+        """Queue a frame for this sink, replacing one that wasn't sent yet."""
+        with self._cond:
+            if self._pending is not None:
+                self.frames_dropped += 1
+            self._pending = frame
+            if self.track_delivery:
+                # A repeat (captured=None) of a frame still waiting keeps that frame's capture time
+                if captured is not None:
+                    self._pending_captured = captured
+                if on_sent:
+                    self._pending_callbacks.extend(on_sent)
+            self._cond.notify()
+
+    def _delivered(self, captured: Optional[float], callbacks: List[Callable[[float], None]]):
+        sent = time.monotonic()
+        if captured is not None and self.metrics:
+            self.metrics.record("glass", sent - captured)
+        for callback in callbacks:
+            try:
+                callback(sent)
+            except Exception as e:
+                self.logger.error(f"Output sent callback failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame = self._pending
+                captured, callbacks = self._pending_captured, self._pending_callbacks
+                self._pending = None
+                self._pending_captured, self._pending_callbacks = None, []
+
+            start = time.perf_counter()
+            sent = False
+            try:
+                sent = self.sink.send(frame)
+            except Exception as e:
+                self.sink.errors += 1
+                self.logger.error(f"Sink {self.sink.name} error: {e}")
+            end = time.perf_counter()
+            if sent:
+                if captured is not None or callbacks:
+                    self._delivered(captured, callbacks)
+            elif callbacks:
+                # Not delivered (camera down); wait for the next frame that is
+                with self._cond:
+                    self._pending_callbacks[:0] = callbacks
+            elapsed = end - start
+            self.send_time_total += elapsed
+            self.send_time_max = max(self.send_time_max, elapsed)
+            if self.metrics:
+                self.metrics.span(f"send_{self.sink.name}", start, end)
+
+    def get_stats(self) -> dict:
+        stats = self.sink.get_stats()
+        sent = max(self.sink.frames_sent, 1)
+        stats.update({
+            "dropped": self.frames_dropped,
+            "avg_send_ms": round(self.send_time_total / sent * 1000, 3),
+            "max_send_ms": round(self.send_time_max * 1000, 3),
+        })
+        return stats
+
+
+class SinkFanout:
+    """Fans the composed output out to several sinks, each on its own worker thread.
+
+    Delivery (glass latency, on_sent callbacks) is tracked on the delivery_sink,
+    the virtual camera by default, or on the first sink when there is none.
+    """
+
+    def __init__(self, sinks: List[OutputSink], logger: Optional[logging.Logger] = None, metrics=None,
+                 delivery_sink: str = "virtualcam"):
+        self.logger = logger or logging.getLogger(__name__)
+        names = [sink.name for sink in sinks]
+        delivery = names.index(delivery_sink) if delivery_sink in names else 0
+        self.workers: List[SinkWorker] = [SinkWorker(sink, self.logger, metrics, track_delivery=i == delivery)
+                                          for i, sink in enumerate(sinks)]
+        self._started = False
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self._started = True
+        self.logger.info(f"Output sinks: {', '.join(w.sink.name for w in self.workers) or 'none'}")
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self._started = False
+
+    def close(self):
+        """Stop workers and close all sinks."""
+        self.stop()
+        for worker in self.workers:
+            try:
+                worker.sink.close()
+            except Exception as e:
+                self.logger.error(f"Error closing sink {worker.sink.name}: {e}")
+
+    def send(self, frame: np.ndarray, captured: Optional[float] = None,
+             on_sent: Optional[List[Callable[[float], None]]] = None) -> bool:
+        """Offer a frame to every sink. Never blocks on a sink.
+
+        captured and on_sent go to the delivery sink's worker, which handles them
+        once the frame has actually been sent.
+        """
+        for worker in self.workers:
+            if worker.track_delivery:
+                worker.offer(frame, captured, on_sent)
+            else:
+                worker.offer(frame)
+        return bool(self.workers)
+
+    @property
+    def is_open(self) -> bool:
+        return any(worker.sink.is_open for worker in self.workers)
+
+    @property
+    def sinks(self) -> List[OutputSink]:
+        return [worker.sink for worker in self.workers]
+
+    def get_sink(self, name: str) -> Optional[OutputSink]:
+        for worker in self.workers:
+            if worker.sink.name == name:
+                return worker.sink
+        return None
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {worker.sink.name: worker.get_stats() for worker in self.workers}
@@ -0,0 +1,118 @@
+import itertools
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+
+class Tracer:
+    """Records timed spans into a preallocated ring buffer for a Perfetto timeline.
+
+    Spans are (name, category, start, end, thread) with perf_counter times; the
+    newest `capacity` spans are kept and older ones overwritten, so tracing can
+    stay on for a whole session at a fixed memory cost. Adding a span is a few
+    list stores and needs no lock: the slot index comes from an itertools
+    counter, whose next() is atomic in CPython. export() writes Chrome
+    trace-event JSON that chrome://tracing and ui.perfetto.dev open directly,
+    one track per thread.
+    """
+
+    def __init__(self, capacity: int = 65536, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.capacity = max(int(capacity), 1)
+        self._names = [None] * self.capacity
+        self._categories = [None] * self.capacity
+        self._starts = [0.0] * self.capacity
+        self._ends = [0.0] * self.capacity
+        self._threads = [0] * self.capacity
+        self._sequence = [-1] * self.capacity
+        self._counter = itertools.count()
+        self.recorded = 0
+        self._thread_names: Dict[int, str] = {}
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+        self.enabled = True
+        self.exports = 0
+
+    def add(self, name: str, start: float, end: float, category: str = "pipeline"):
+        """Record a finished span (perf_counter start and end). Safe from any thread."""
+        if not self.enabled:
+            return
+        tid = threading.get_native_id()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        sequence = next(self._counter)
+        slot = sequence % self.capacity
+        self._names[slot] = name
+        self._categories[slot] = category
+        self._starts[slot] = start
+        self._ends[slot] = end
+        self._threads[slot] = tid
+        self._sequence[slot] = sequence
+        self.recorded = sequence + 1
+
+    def span(self, name: str, category: str = "pipeline") -> "_Span":
+        """Context manager recording the enclosed block as a span."""
+        return _Span(self, name, category)
+
+    def events(self) -> list:
+        """Buffered spans as trace events, oldest first."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": "EmoteStream"}}]
+        for tid, thread_name in list(self._thread_names.items()):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": thread_name}})
+
+        slots = sorted((slot for slot in range(self.capacity) if self._sequence[slot] >= 0),
+                       key=self._sequence.__getitem__)
+        for slot in slots:
+            start = self._starts[slot]
+            events.append({
+                "name": self._names[slot],
+                "cat": self._categories[slot],
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(max(self._ends[slot] - start, 0.0) * 1e6, 1),
+                "pid": pid,
+                "tid": self._threads[slot],
+            })
+        return events
+
+    def export(self, path: str) -> int:
+        """Write the buffer as Chrome trace-event JSON. Returns the number of spans written."""
+        events = self.events()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"start_time": self._origin_wall}}, f)
+        os.replace(temp_path, path)
+        self.exports += 1
+        spans = sum(1 for event in events if event["ph"] == "X")
+        self.logger.info(f"Trace written: {path} ({spans} spans)")
+        return spans
+
+    def get_stats(self) -> dict:
+        return {"capacity": self.capacity, "recorded": self.recorded, "exports": self.exports}
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "start")
+
+    def __init__(self, tracer: Tracer, name: str, category: str):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.start, time.perf_counter(), self.category)
+        return False
@@ -3,11 +3,15 @@ import traceback
 import pygame
 import cv2
 import time
-from typing import Optional, Callable
+import threading
+from typing import Optional, Callable, Dict, Iterable
 from enum import Enum
 import logging
 from pathlib import Path
 
+# Mixer buffer size in samples; also used to estimate audio output latency
+AUDIO_BUFFER_SIZE = 512
+
 class PlayerState(Enum):
     IDLE = "idle"
     PLAYING = "playing"
@@ -15,6 +19,240 @@ class PlayerState(Enum):
     STOPPED = "stopped"
     ERROR = "error"
 
+
+class AudioCache:
+    """Decodes emote audio once and keeps it in memory as pygame Sounds."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._sounds: Dict[str, pygame.mixer.Sound] = {}
+        self._failed = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(audio_path: str) -> str:
+        return str(Path(audio_path).resolve())
+
+    def preload(self, audio_paths: Iterable[str]) -> int:
+        """Decode all given audio files up front. Returns number of cached sounds."""
+        loaded = 0
+        for audio_path in audio_paths:
+            if audio_path and self.get(audio_path) is not None:
+                loaded += 1
+        return loaded
+
+    def get(self, audio_path: str) -> Optional[pygame.mixer.Sound]:
+        """Return the cached Sound for a file, decoding it on first use."""
+        key = self._key(audio_path)
+        with self._lock:
+            sound = self._sounds.get(key)
+            if sound is not None or key in self._failed:
+                self.hits += 1
+                return sound
+
+            self.misses += 1
+            try:
+                if not pygame.mixer.get_init():
+                    raise RuntimeError("Audio mixer not initialized")
+                if not Path(audio_path).exists():
+                    raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+                sound = pygame.mixer.Sound(key)
+                self._sounds[key] = sound
+                self.logger.info(f"Audio cached: {audio_path} ({sound.get_length():.1f}s)")
+                return sound
+
+            except Exception as e:
+                # Remember failures so the trigger path never retries disk I/O
+                self._failed.add(key)
+                self.logger.warning(f"Failed to cache audio {audio_path}: {e}")
+                return None
+
+    def discard(self, audio_path: str):
+        """Forget one file (e.g. it changed on disk) so the next get() decodes it again."""
+        key = self._key(audio_path)
+        with self._lock:
+            self._sounds.pop(key, None)
+            self._failed.discard(key)
+
+    def clear(self):
+        """Drop all cached sounds (e.g. before the mixer is shut down)."""
+        with self._lock:
+            self._sounds.clear()
+            self._failed.clear()
+
+    def __len__(self) -> int:
+        return len(self._sounds)
+
+    def get_stats(self) -> dict:
+        return {"cached": len(self._sounds), "failed": len(self._failed),
+                "hits": self.hits, "misses": self.misses}
+
+
+class ClipClock:
+    """Schedules clip frames against the audio playback position.
+
+    pygame Sounds expose no play position, so the audio clock is anchored at the
+    moment the channel starts playing and corrected for the mixer output latency.
+    Video frames are then shown when due on that clock; when decoding falls behind,
+    late frames are skipped instead of letting video drift away from the audio.
+    """
+
+    def __init__(self, fps: float, channel: Optional[pygame.mixer.Channel] = None,
+                 output_latency: float = 0.0, max_lag_frames: int = 1):
+        self.fps = fps if fps and fps > 0 else 30
+        self.frame_delay = 1.0 / self.fps
+        self.channel = channel
+        self.output_latency = output_latency if channel is not None else 0.0
+        self.max_lag_frames = max_lag_frames
+        self.start_time = time.perf_counter()
+        self.frames_skipped = 0
+
+    def position(self) -> float:
+        """Current playback position in seconds."""
+        return max(0.0, time.perf_counter() - self.start_time - self.output_latency)
+
+    def due_index(self) -> int:
+        """Index of the frame that should be on screen right now."""
+        return int(self.position() * self.fps)
+
+    def frames_behind(self, frame_index: int) -> int:
+        """Number of frames to drop so that frame_index catches up with the clock."""
+        due_index = int(self.position() * self.fps)
+        lag = due_index - frame_index
+        return lag if lag > self.max_lag_frames else 0
+
+    def wait_for(self, frame_index: int):
+        """Sleep until frame_index is due on the clock."""
+        delay = frame_index * self.frame_delay - self.position()
+        if delay > 0:
+            time.sleep(delay)
+
+    def skip_frames(self, video_cap, frame_index: int) -> int:
+        """Drop late frames without decoding them. Returns the new frame index."""
+        behind = self.frames_behind(frame_index)
+        for _ in range(behind):
+            if not video_cap.grab():
+                break
+            frame_index += 1
+            self.frames_skipped += 1
+        return frame_index
+
+    @staticmethod
+    def mixer_latency() -> float:
+        """Estimated audio output latency of the initialized mixer, in seconds."""
+        mixer_info = pygame.mixer.get_init()
+        if not mixer_info:
+            return 0.0
+        return AUDIO_BUFFER_SIZE / float(mixer_info[0])
+
+
+class ClipPlayback:
+    """Non-blocking playback of one emote clip, stepped once per output frame.
+
+    Instead of running its own loop, the clip is polled from the main frame loop:
+    read_due() decodes whatever frame is due on the clip clock (dropping late
+    frames, repeating the last one when the next isn't due yet) and never sleeps.
+    """
+
+    def __init__(self, emote: dict, sound: Optional[pygame.mixer.Sound] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.emote = emote
+        self.name = emote['name']
+        self.video_path = emote.get('video_path')
+        self.sound = sound
+        self.video_cap = None
+        self.channel: Optional[pygame.mixer.Channel] = None
+        self.clock: Optional[ClipClock] = None
+        self.fps = 30.0
+        self.total_frames = 0
+        self.next_index = 0  # Index of the next frame to decode
+        self._frame = None
+        self.finished = False
+
+    def start(self) -> bool:
+        """Open the clip and start its audio. Returns False if the clip can't be played.
+
+        Emotes loaded through the clip index carry their metadata in 'media', so
+        the file is not stat'ed or probed again here.
+        """
+        media = self.emote.get('media')
+        if media is None and (not self.video_path or not Path(self.video_path).exists()):
+            self.logger.error(f"Video file not found: {self.video_path}")
+            return False
+
+        self.video_cap = cv2.VideoCapture(self.video_path)
+        if not self.video_cap.isOpened():
+            self.logger.error(f"Cannot open video: {self.video_path}")
+            return False
+
+        if media and media.get('fps'):
+            self.fps = media['fps']
+            self.total_frames = media['frame_count']
+        else:
+            self.fps = self.video_cap.get(cv2.CAP_PROP_FPS) or 30
+            self.total_frames = int(self.video_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Anchor the clock right after the audio channel starts
+        self.channel = self.sound.play() if self.sound else None
+        self.clock = ClipClock(self.fps, self.channel, ClipClock.mixer_latency())
+        return True
+
+    @property
+    def duration(self) -> float:
+        return self.total_frames / self.fps if self.fps > 0 else 0
+
+    @property
+    def frame_index(self) -> int:
+        """Index of the frame most recently returned by read_due()."""
+        return max(self.next_index - 1, 0)
+
+    @property
+    def frames_skipped(self) -> int:
+        return self.clock.frames_skipped if self.clock else 0
+
+    def read_due(self):
+        """Return the clip frame due now, or None once the clip has ended."""
+        if self.finished or self.video_cap is None:
+            return None
+
+        due = self.clock.due_index()
+        if self._frame is not None and due < self.next_index:
+            # Next frame not due yet: repeat the current one
+            return self._frame
+
+        # Drop frames we are late for without decoding them
+        while self.next_index < due:
+            if not self.video_cap.grab():
+                self.finished = True
+                return None
+            self.next_index += 1
+            self.clock.frames_skipped += 1
+
+        ret, frame = self.video_cap.read()
+        if not ret:
+            self.finished = True
+            return None
+
+        self.next_index += 1
+        self._frame = frame
+        return frame
+
+    def stop(self):
+        """Stop audio and release the decoder."""
+        if self.channel:
+            self.channel.stop()
+            self.channel = None
+        if self.video_cap:
+            self.video_cap.release()
+            self.video_cap = None
+        self._frame = None
+        self.finished = True
+
+
 class VideoAudioPlayer:
     """Handles synchronized video and audio playback."""
     
@@ -26,26 +264,36 @@ class VideoAudioPlayer:
         self.fps = 30
         self.frame_delay = 1.0 / self.fps
         self._error_callback: Optional[Callable] = None
+        self.audio_cache = AudioCache(self.logger)
+        self.sound: Optional[pygame.mixer.Sound] = None
+        self.channel: Optional[pygame.mixer.Channel] = None
         
     def initialize_audio(self):
         """Initialize pygame mixer for audio."""
         if not self.audio_initialized:
             try:
-                pygame.mixer.init()
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init(buffer=AUDIO_BUFFER_SIZE)
                 self.audio_initialized = True
                 self.logger.info("Audio system initialized")
             except Exception as e:
                 self.logger.error(f"Failed to initialize audio: {e}")
                 raise
     
-    def load_media(self, video_path: str, audio_path: str) -> bool:
-        """Load video and audio files."""
+    def preload_audio(self, emote_configs: dict) -> int:
+        """Decode the audio of all configured emotes into the in-memory cache."""
+        self.initialize_audio()
+        audio_paths = [cfg.get('audio_path') for cfg in emote_configs.values() if cfg.get('audio_path')]
+        loaded = self.audio_cache.preload(audio_paths)
+        self.logger.info(f"Preloaded audio for {loaded}/{len(audio_paths)} emotes")
+        return loaded
+
+    def load_media(self, video_path: str, audio_path: Optional[str] = None) -> bool:
+        """Load video file and look up its (cached) audio."""
         try:
             # Validate file paths
             if not Path(video_path).exists():
                 raise FileNotFoundError(f"Video file not found: {video_path}")
-            if not Path(audio_path).exists():
-                raise FileNotFoundError(f"Audio file not found: {audio_path}")
             
             # Load video
             self.video_cap = cv2.VideoCapture(video_path)
@@ -60,9 +308,9 @@ class VideoAudioPlayer:
             
             self.frame_delay = 1.0 / self.fps
             
-            # Load audio
+            # Audio comes from the in-memory cache, no disk I/O after the first load
             self.initialize_audio()
-            pygame.mixer.music.load(audio_path)
+            self.sound = self.audio_cache.get(audio_path) if audio_path else None
             
             self.logger.info(f"Media loaded: {video_path} ({self.fps} FPS)")
             return True
@@ -73,7 +321,7 @@ class VideoAudioPlayer:
             return False
     
     def play(self, vcam, frame_callback: Optional[Callable] = None) -> bool:
-        """Play video and audio synchronously."""
+        """Play video and audio synchronously on a VirtualCameraManager."""
         if not self.video_cap or not self.audio_initialized:
             self.logger.error("Media not loaded")
             return False
@@ -81,52 +329,41 @@ class VideoAudioPlayer:
         try:
             self.state = PlayerState.PLAYING
             
-            # Start audio
-            pygame.mixer.music.play()
-            self.logger.info("Starting playback")
-            
             # Reset video to beginning
             self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
             
+            # Start audio; the clock is anchored right after the channel starts
+            self.channel = self.sound.play() if self.sound else None
+            clock = ClipClock(self.fps, self.channel, ClipClock.mixer_latency())
+            self.logger.info("Starting playback")
+            
             frame_count = 0
-            start_time = time.time()
             
             while self.state == PlayerState.PLAYING:
+                # Drift correction: drop frames the decoder is late for
+                frame_count = clock.skip_frames(self.video_cap, frame_count)
+                
                 ret, frame = self.video_cap.read()
                 if not ret:
                     # End of video
                     break
                 
-                # Resize frame if needed
-                frame = cv2.resize(frame, (640, 480))
-                
                 # Apply frame callback if provided
                 if frame_callback:
                     frame = frame_callback(frame)
                 
-                # Send to virtual camera
-                try:
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    vcam.send(rgb_frame)
-                except Exception as e:
-                    self.logger.error(f"Error sending frame to virtual camera: {e}")
-                    break
+                # Show the frame when it is due on the audio clock
+                clock.wait_for(frame_count)
                 
-                # Check if audio is still playing
-                if not pygame.mixer.music.get_busy():
+                # Send to virtual camera; it resizes/converts only if its native format differs
+                if not vcam.send_frame(frame):
+                    self.logger.error("Error sending frame to virtual camera")
                     break
                 
-                # Frame timing
                 frame_count += 1
-                expected_time = frame_count * self.frame_delay
-                elapsed_time = time.time() - start_time
-                sleep_time = expected_time - elapsed_time
-                
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
             
             self.stop()
-            self.logger.info("Playback completed")
+            self.logger.info(f"Playback completed ({clock.frames_skipped} late frames skipped)")
             return True
             
         except Exception as e:
@@ -140,7 +377,9 @@ class VideoAudioPlayer:
         """Stop playback."""
         if self.state == PlayerState.PLAYING:
             try:
-                pygame.mixer.music.stop()
+                if self.channel:
+                    self.channel.stop()
+                    self.channel = None
                 if self.video_cap:
                     self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                 self.state = PlayerState.STOPPED
@@ -151,14 +390,16 @@ class VideoAudioPlayer:
     def pause(self):
         """Pause playback."""
         if self.state == PlayerState.PLAYING:
-            pygame.mixer.music.pause()
+            if self.channel:
+                self.channel.pause()
             self.state = PlayerState.PAUSED
             self.logger.info("Playback paused")
     
     def resume(self):
         """Resume playback."""
         if self.state == PlayerState.PAUSED:
-            pygame.mixer.music.unpause()
+            if self.channel:
+                self.channel.unpause()
             self.state = PlayerState.PLAYING
             self.logger.info("Playback resumed")
     
@@ -168,7 +409,9 @@ class VideoAudioPlayer:
         if self.video_cap:
             self.video_cap.release()
             self.video_cap = None
+        self.sound = None
         if self.audio_initialized:
+            self.audio_cache.clear()
             pygame.mixer.quit()
             self.audio_initialized = False
         self.state = PlayerState.IDLE
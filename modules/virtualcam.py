@@ -1,34 +1,111 @@
-import pyvirtualcam
 import cv2
 import numpy as np
-from typing import Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
 import logging
 from enum import Enum
 
+try:
+    import pyvirtualcam
+except ImportError:  # Headless boxes can still run with the other output sinks
+    pyvirtualcam = None
+
 class CameraState(Enum):
     CLOSED = "closed"
     OPEN = "open"
     ERROR = "error"
 
+# Output pixel formats to try per requested setting. The pipeline produces BGR,
+# so "auto" prefers it and only falls back to RGB if the backend refuses BGR.
+PIXEL_FORMAT_CANDIDATES = {
+    'auto': ['BGR', 'RGB'],
+    'bgr': ['BGR', 'RGB'],
+    'rgb': ['RGB'],
+    'i420': ['I420', 'BGR', 'RGB'],
+    'nv12': ['NV12', 'BGR', 'RGB'],
+}
+
+def _bgr_to_nv12(frame: np.ndarray, code: int) -> np.ndarray:
+    """Convert to NV12 via I420 (OpenCV has no direct BGR->NV12 conversion)."""
+    i420 = cv2.cvtColor(frame, code)
+    height = frame.shape[0]
+    width = frame.shape[1]
+    nv12 = np.empty_like(i420)
+    nv12[:height] = i420[:height]
+    quarter = (height // 2) * (width // 2)
+    uv = nv12[height:].reshape(-1)
+    uv[0::2] = i420[height:].reshape(-1)[:quarter]
+    uv[1::2] = i420[height:].reshape(-1)[quarter:]
+    return nv12
+
+# (source format, camera format) -> conversion; pairs not listed pass through untouched
+_CONVERSIONS = {
+    ('BGR', 'RGB'): lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB),
+    ('RGB', 'BGR'): lambda f: cv2.cvtColor(f, cv2.COLOR_RGB2BGR),
+    ('BGR', 'I420'): lambda f: cv2.cvtColor(f, cv2.COLOR_BGR2YUV_I420),
+    ('RGB', 'I420'): lambda f: cv2.cvtColor(f, cv2.COLOR_RGB2YUV_I420),
+    ('BGR', 'NV12'): lambda f: _bgr_to_nv12(f, cv2.COLOR_BGR2YUV_I420),
+    ('RGB', 'NV12'): lambda f: _bgr_to_nv12(f, cv2.COLOR_RGB2YUV_I420),
+}
+
+DEFAULT_BACKENDS = ['obs', 'unitycapture', 'dshow']
+
+class StubCamera:
+    """Stand-in for pyvirtualcam.Camera on machines without a virtual camera driver."""
+    
+    def __init__(self, width: int, height: int, fps: float, fmt: str = 'BGR'):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fmt = fmt
+        self.device = "EmoteStream stub camera"
+        self.frames_sent = 0
+        self._next_frame = time.perf_counter()
+    
+    def send(self, frame: np.ndarray):
+        self.frames_sent += 1
+    
+    def sleep_until_next_frame(self):
+        self._next_frame = max(self._next_frame + 1.0 / self.fps, time.perf_counter())
+        time.sleep(max(self._next_frame - time.perf_counter(), 0))
+    
+    def close(self):
+        pass
+
 class VirtualCameraManager:
     """Independent virtual camera management for Discord/streaming apps."""
     
     def __init__(self, width: int = 1280, height: int = 720, fps: int = 30, 
-                 device_name: str = None, logger: Optional[logging.Logger] = None):
+                 device_name: str = None, logger: Optional[logging.Logger] = None,
+                 pixel_format: str = "auto", backends: Optional[List[str]] = None,
+                 preferred_backend: Optional[str] = None, probe_timeout: float = 3.0):
         self.width = width
         self.height = height
         self.fps = fps
         self.device_name = device_name or "EmoteStream Virtual Camera"
         self.logger = logger or logging.getLogger(__name__)
         
-        self.cam: Optional[pyvirtualcam.Camera] = None
+        self.cam: Optional["pyvirtualcam.Camera"] = None
         self.state = CameraState.CLOSED
         self._frame_count = 0
         
-        # Try different backends for virtual camera
-        self.backends = ['obs', 'unitycapture', 'dshow']
+        # Try different backends for virtual camera; the one that worked last time goes first
+        self.backends = list(backends or DEFAULT_BACKENDS)
+        self.preferred_backend = preferred_backend
+        self.probe_timeout = probe_timeout
+        self.probe_results: List[dict] = []
         self.active_backend = None
         
+        # Requested and actual pixel format of the camera
+        self.requested_format = pixel_format.lower()
+        if self.requested_format not in PIXEL_FORMAT_CANDIDATES:
+            self.logger.warning(f"Unknown pixel format '{pixel_format}', using auto")
+            self.requested_format = 'auto'
+        self.pixel_format: Optional[str] = None
+        self._passthrough_frames = 0
+        self._converted_frames = 0
+        
     def __enter__(self):
         self.open()
         return self
@@ -37,60 +114,27 @@ class VirtualCameraManager:
         self.close()
     
     def open(self) -> bool:
-        """Open virtual camera with fallback backends."""
+        """Open virtual camera with fallback backends.
+        
+        The preferred (last working) backend is tried alone first. If it fails,
+        the remaining backends are probed concurrently, each bounded by
+        probe_timeout, and the first one in list order that opened is kept.
+        """
         try:
             if self.state == CameraState.OPEN:
                 self.logger.warning("Camera already open")
                 return True
             
-            # Try different backends until one works
-            for backend in self.backends:
-                try:
-                    self.logger.info(f"Trying backend: {backend}")
-                    
-                    if backend == 'obs':
-                        # Try OBS Virtual Camera (default)
-                        self.cam = pyvirtualcam.Camera(
-                            width=self.width, 
-                            height=self.height, 
-                            fps=self.fps
-                        )
-                    elif backend == 'unitycapture':
-                        # Try Unity Capture (Windows DirectShow)
-                        self.cam = pyvirtualcam.Camera(
-                            width=self.width, 
-                            height=self.height, 
-                            fps=self.fps,
-                            backend='unitycapture'
-                        )
-                    elif backend == 'dshow':
-                        # Try DirectShow backend
-                        self.cam = pyvirtualcam.Camera(
-                            width=self.width, 
-                            height=self.height, 
-                            fps=self.fps,
-                            backend='dshow'
-                        )
-                    
-                    # Test if camera works
-                    test_frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-                    self.cam.send(test_frame)
-                    
-                    self.active_backend = backend
-                    self.state = CameraState.OPEN
-                    self._frame_count = 0
-                    
-                    device_info = getattr(self.cam, 'device', f'{backend} virtual camera')
-                    self.logger.info(f"Virtual camera opened with {backend}: {device_info} ({self.width}x{self.height} @ {self.fps}fps)")
-                    
-                    # Send initialization frame
-                    self._send_init_frame()
-                    
+            self.probe_results = []
+            candidates = list(self.backends)
+            
+            if self.preferred_backend in candidates:
+                candidates.remove(self.preferred_backend)
+                if self._open_first_working([self.preferred_backend]):
                     return True
-                    
-                except Exception as e:
-                    self.logger.warning(f"Backend {backend} failed: {e}")
-                    continue
+            
+            if candidates and self._open_first_working(candidates):
+                return True
             
             # If all backends failed
             raise RuntimeError("All virtual camera backends failed")
@@ -100,16 +144,129 @@ class VirtualCameraManager:
             self.state = CameraState.ERROR
             return False
     
+    def _open_first_working(self, backends: List[str]) -> bool:
+        """Probe backends concurrently and activate the first working one in list order."""
+        probed = self._probe_backends(backends)
+        winner = next((entry for entry in probed if entry[1] is not None), None)
+        
+        # Release every camera except the one we keep
+        for result, cam in probed:
+            if cam is not None and (winner is None or cam is not winner[1]):
+                self._close_quietly(cam)
+        
+        if winner is None:
+            return False
+        
+        result, cam = winner
+        self.cam = cam
+        self.pixel_format = result['pixel_format']
+        self.active_backend = result['backend']
+        self.preferred_backend = result['backend']
+        self.state = CameraState.OPEN
+        self._frame_count = 0
+        self._passthrough_frames = 0
+        self._converted_frames = 0
+        
+        self.logger.info(f"Virtual camera opened with {self.active_backend}: {self.device_info} "
+                         f"({self.width}x{self.height} @ {self.fps}fps, {self.pixel_format}, "
+                         f"probe {result['latency_ms']} ms)")
+        
+        # Send initialization frame
+        self._send_init_frame()
+        return True
+    
+    def _probe_backends(self, backends: List[str]) -> List[Tuple[dict, Optional["pyvirtualcam.Camera"]]]:
+        """Open every backend in parallel; returns (result, camera or None) in list order."""
+        executor = ThreadPoolExecutor(max_workers=len(backends), thread_name_prefix="CameraProbe")
+        futures = [executor.submit(self._probe_backend, backend) for backend in backends]
+        wait(futures, timeout=self.probe_timeout)
+        
+        probed = []
+        for backend, future in zip(backends, futures):
+            if future.done():
+                probed.append(future.result())
+            else:
+                # Can't cancel a driver call; close the camera if it opens after all
+                future.add_done_callback(self._close_late_probe)
+                probed.append(({'backend': backend, 'ok': False, 'pixel_format': None,
+                                'latency_ms': round(self.probe_timeout * 1000, 1),
+                                'error': 'timeout'}, None))
+        executor.shutdown(wait=False)
+        
+        for result, _ in probed:
+            self.probe_results.append(result)
+            if result['ok']:
+                self.logger.info(f"Backend {result['backend']}: ok in {result['latency_ms']} ms")
+            else:
+                self.logger.warning(f"Backend {result['backend']} failed after "
+                                    f"{result['latency_ms']} ms: {result['error']}")
+        return probed
+    
+    def _probe_backend(self, backend: str) -> Tuple[dict, Optional["pyvirtualcam.Camera"]]:
+        """Open one backend and push a blank frame through it (runs on a probe thread)."""
+        start = time.perf_counter()
+        cam = None
+        try:
+            cam, fmt = self._create_camera(backend)
+            cam.send(self._blank_camera_frame(fmt))
+            result = {'backend': backend, 'ok': True, 'pixel_format': fmt, 'error': None}
+        except Exception as e:
+            if cam is not None:
+                self._close_quietly(cam)
+                cam = None
+            result = {'backend': backend, 'ok': False, 'pixel_format': None, 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result, cam
+    
+    def _close_late_probe(self, future):
+        _, cam = future.result()
+        if cam is not None:
+            self._close_quietly(cam)
+    
+    def _close_quietly(self, cam):
+        try:
+            cam.close()
+        except Exception as e:
+            self.logger.debug(f"Error closing probe camera: {e}")
+    
+    def _blank_camera_frame(self, fmt: str) -> np.ndarray:
+        """Black frame already in the camera's pixel format."""
+        if fmt in ('I420', 'NV12'):
+            frame = np.full((self.height * 3 // 2, self.width), 128, dtype=np.uint8)
+            frame[:self.height] = 16
+            return frame
+        return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+    
+    def _create_camera(self, backend: str) -> Tuple["pyvirtualcam.Camera", str]:
+        """Open a camera on a backend with the first pixel format it accepts."""
+        if backend == 'stub':
+            return StubCamera(self.width, self.height, self.fps, 'BGR'), 'BGR'
+        if pyvirtualcam is None:
+            raise RuntimeError("pyvirtualcam is not installed")
+        
+        last_error = None
+        for fmt in PIXEL_FORMAT_CANDIDATES[self.requested_format]:
+            kwargs = {'fmt': getattr(pyvirtualcam.PixelFormat, fmt)}
+            if backend != 'obs':
+                # OBS Virtual Camera is the pyvirtualcam default
+                kwargs['backend'] = backend
+            try:
+                cam = pyvirtualcam.Camera(width=self.width, height=self.height, fps=self.fps, **kwargs)
+                return cam, fmt
+            except Exception as e:
+                last_error = e
+                self.logger.info(f"Backend {backend} does not accept {fmt}: {e}")
+        raise last_error or RuntimeError(f"No usable pixel format for {backend}")
+    
     def _send_init_frame(self):
         """Send initialization frame to make camera visible in apps."""
         try:
             # Create a branded init frame
             init_frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
             
-            # Background gradient
-            for y in range(self.height):
-                color_value = int(30 + (y / self.height) * 50)
-                init_frame[y, :] = [color_value, color_value//2, color_value//3]
+            # Background gradient, one color per row broadcast across the width
+            values = (30 + np.arange(self.height) * 50 // self.height).astype(np.uint8)
+            init_frame[:] = np.stack([values, values // 2, values // 3], axis=1)[:, None, :]
             
             # Main text
             text = "EmoteStream Camera"
@@ -142,8 +299,12 @@ class VirtualCameraManager:
         except Exception as e:
             self.logger.warning(f"Failed to send init frame: {e}")
     
-    def send_frame(self, frame: np.ndarray, auto_convert: bool = True) -> bool:
-        """Send frame to virtual camera."""
+    def send_frame(self, frame: np.ndarray, auto_convert: bool = True, pace: bool = True) -> bool:
+        """Send frame to virtual camera.
+        
+        With pace=True this blocks until the next frame slot of the camera clock;
+        the OutputPacer passes pace=False because it keeps its own schedule.
+        """
         if self.state != CameraState.OPEN or not self.cam:
             self.logger.error("Camera not open")
             return False
@@ -156,7 +317,8 @@ class VirtualCameraManager:
             
             # Send frame
             self.cam.send(processed_frame)
-            self.cam.sleep_until_next_frame()
+            if pace:
+                self.cam.sleep_until_next_frame()
             
             self._frame_count += 1
             return True
@@ -166,30 +328,36 @@ class VirtualCameraManager:
             return False
     
     def _prepare_frame(self, frame: np.ndarray, auto_convert: bool) -> Optional[np.ndarray]:
-        """Prepare frame for virtual camera."""
+        """Prepare frame for virtual camera.
+        
+        auto_convert=True means the frame is BGR (OpenCV), False means it is RGB.
+        A uint8 frame at output size that already matches the camera pixel format
+        is passed through without any copy or conversion.
+        """
         try:
             # Check if frame is valid
             if frame is None or frame.size == 0:
                 self.logger.warning("Empty frame received")
                 return None
             
-            # Resize if necessary (high quality interpolation)
-            if frame.shape[:2] != (self.height, self.width):
-                frame = cv2.resize(frame, (self.width, self.height), 
-                                 interpolation=cv2.INTER_LANCZOS4)
-            
-            # Convert color space if needed
-            if auto_convert and len(frame.shape) == 3 and frame.shape[2] == 3:
-                # Convert BGR to RGB for virtual camera
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Only non-uint8 frames need clamping and casting
+            if frame.dtype != np.uint8:
+                frame = np.clip(frame, 0, 255).astype(np.uint8)
             
-            # Ensure proper data type
-            frame = frame.astype(np.uint8)
+            # Resize if necessary
+            if frame.shape[:2] != (self.height, self.width):
+                interpolation = cv2.INTER_AREA if frame.shape[0] > self.height else cv2.INTER_LINEAR
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=interpolation)
             
-            # Clamp values to valid range
-            frame = np.clip(frame, 0, 255)
+            # Convert color space only if the camera doesn't take the source format
+            source_format = 'BGR' if auto_convert else 'RGB'
+            conversion = _CONVERSIONS.get((source_format, self.pixel_format or 'RGB'))
+            if conversion is None:
+                self._passthrough_frames += 1
+                return frame
             
-            return frame
+            self._converted_frames += 1
+            return conversion(frame)
             
         except Exception as e:
             self.logger.error(f"Error preparing frame: {e}")
@@ -217,10 +385,12 @@ class VirtualCameraManager:
         """Close virtual camera."""
         if self.cam:
             try:
-                # Send a final frame
-                self.send_blank_frame((0, 0, 0))
+                # Send a final frame (not to a camera that already failed)
+                if self.state == CameraState.OPEN:
+                    self.send_blank_frame((0, 0, 0))
                 
                 # Close camera
+                self.cam.close()
                 self.cam = None
                 self.state = CameraState.CLOSED
                 self.logger.info(f"Virtual camera closed after {self._frame_count} frames")
@@ -251,7 +421,12 @@ class VirtualCameraManager:
             "resolution": f"{self.width}x{self.height}",
             "fps": self.fps,
             "frames_sent": self._frame_count,
-            "device": self.device_info
+            "device": self.device_info,
+            "pixel_format": self.pixel_format,
+            "requested_format": self.requested_format,
+            "passthrough_frames": self._passthrough_frames,
+            "converted_frames": self._converted_frames,
+            "probe": self.probe_results
         }
     
     def test_camera(self) -> bool: